@@ -1,14 +1,57 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-from pymongo import MongoClient
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, make_response, Response, stream_with_context, g, copy_current_request_context
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
+import hashlib
+import base64
+import gzip
+import json
+import csv
+import io
 import pytz
 import logging
 import os
-from flask_login import LoginManager, login_user, logout_user, login_required
-from models import User
-from config import SPORTS, GEMINI_API_KEY
+import threading
+import itertools
+from functools import wraps
+from itsdangerous import URLSafeSerializer, BadSignature
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from models import User, ensure_user_indexes
+from archive import moneylines as moneylines_collection
+from matchups import get_matchups, pair_key, team_record
+from team_form import get_forms, get_form
+from calibration import get_report
+from ratings import card_view
+from slates import get_slate, win_stats_as_of
+from query_log import top_shapes, recent_slow_queries
+from profiling import init_profiling, send_profile
+from fragments import init_fragments, fragment_cache
+from parallel import gather, gather_each
+from disk_cache import DiskCache
+from db import set_client_options
+from circuit_breaker import CircuitBreaker, LastGoodCache, DATABASE_UNAVAILABLE
+from invalidation import (
+    InvalidatedCache, init_invalidation, bus, team_tags,
+    GAME_CHANGED, TEAM_STATS_CHANGED, TEAM_LIST_CHANGED
+)
+from normalize import team_key, consensus_moneyline
+from config import (
+    SPORTS, GEMINI_API_KEY, WARM_UP_TIMEZONES,
+    WEB_MONGO_SERVER_SELECTION_TIMEOUT_MS, WEB_MONGO_SOCKET_TIMEOUT_MS
+)
 from mongo_query_generator import MongoQueryGenerator
+from bson import ObjectId, json_util
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY')
@@ -22,6 +65,22 @@ login_manager.login_view = 'login'
 def load_user(username):
     return User.get(username)
 
+def admin_required(view):
+    """Like login_required, but also 404s for users who aren't admins."""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if not getattr(current_user, 'is_admin', False):
+            return render_template('404.html', message="Page not found."), 404
+        return view(*args, **kwargs)
+    return wrapper
+
+# Admins can append ?_profile=1 to any page to profile that request
+init_profiling(app, lambda: current_user.is_authenticated and getattr(current_user, 'is_admin', False))
+
+# Game cards are rendered once per data version and timezone (see fragments.py)
+init_fragments(app)
+
 # --------------------- Logging Configuration ---------------------
 logging.basicConfig(
     level=logging.INFO,
@@ -31,118 +90,150 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # --------------------- MongoDB Configuration ---------------------
-MONGO_URI = os.getenv('MONGO_URI')
-if not MONGO_URI:
-    logger.error("MONGO_URI not found in environment variables.")
-    raise EnvironmentError("MONGO_URI not found in environment variables.")
-
-try:
-    client = MongoClient(MONGO_URI)
-    db = client.sports_odds
-    moneylines_collection = db.moneylines
-    logger.info("Connected to MongoDB successfully.")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {e}")
-    raise e
+# Pages fail fast and fall back to their last good data rather than waiting
+# out the driver's default timeouts (see circuit_breaker.py)
+set_client_options(
+    serverSelectionTimeoutMS=WEB_MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    socketTimeoutMS=WEB_MONGO_SOCKET_TIMEOUT_MS
+)
+db_breaker = CircuitBreaker('MongoDB')
 
-# --------------------- Helper Functions ---------------------
-def get_team_stats(team):
+def ensure_indexes():
+    """
+    Creates the indexes used by the conditional-request validators and the
+    JSON API. Validator lookups walk the last_updated indexes newest-first and
+    stop at the first match; API pages seek on (event_date, _id) and rating
+    restamps on (team key, event_date).
+    """
     try:
-        team = team.strip().lower()
-        logger.info(f"Calculating stats for team: {team}")
-        
-        # Fetch completed games where the team participated
-        completed_games = list(moneylines_collection.find({
-            '$or': [
-                {'teams.home.name': {'$regex': f'^{team}$', '$options': 'i'}},
-                {'teams.away.name': {'$regex': f'^{team}$', '$options': 'i'}}
-            ],
-            'status': 'Completed'
-        }))
-        
-        logger.info(f"Found {len(completed_games)} completed games for {team}")
-        
-        # Initialize counters
-        favored_wins = 0
-        underdog_wins = 0
-        total_favored = 0
-        total_underdog = 0
-        
-        # Process each game
-        for game in completed_games:
-            home_team = game.get('teams', {}).get('home', {}).get('name', '').strip()
-            away_team = game.get('teams', {}).get('away', {}).get('name', '').strip()
-            home_ml = game.get('teams', {}).get('home', {}).get('moneyline')
-            away_ml = game.get('teams', {}).get('away', {}).get('moneyline')
-            winner = game.get('result', {}).get('winner', '').strip()
-            
-            # Normalize team names
-            home_team_lower = home_team.lower()
-            away_team_lower = away_team.lower()
-            winner_lower = winner.lower()
-            
-            # Ensure moneyline values are numbers
-            try:
-                home_ml = float(home_ml)
-            except (TypeError, ValueError):
-                home_ml = None
-            try:
-                away_ml = float(away_ml)
-            except (TypeError, ValueError):
-                away_ml = None
-            
-            # Skip game if moneylines are missing or invalid
-            if home_ml is None or away_ml is None:
-                logger.warning(f"Skipping game due to invalid moneylines: {home_team} vs {away_team}")
-                continue
-            
-            # Determine if the team is home or away
-            if home_team_lower == team:
-                is_home = True
-            elif away_team_lower == team:
-                is_home = False
-            else:
-                logger.warning(f"{team} not found in game teams: {home_team} vs {away_team}")
-                continue
-            
-            team_ml = home_ml if is_home else away_ml
-            opp_ml = away_ml if is_home else home_ml
-            
-            # Compare moneylines to determine if team was favored or underdog
-            if team_ml < opp_ml:
-                total_favored += 1
-                if winner_lower == team:
-                    favored_wins += 1
-                logger.info(f"{team} was favored - Result: {'Win' if winner_lower == team else 'Loss'}")
-            elif team_ml > opp_ml:
-                total_underdog += 1
-                if winner_lower == team:
-                    underdog_wins += 1
-                logger.info(f"{team} was underdog - Result: {'Win' if winner_lower == team else 'Loss'}")
-            else:
-                # Moneylines are equal, skip or count as neither favored nor underdog
-                logger.info(f"{team} had equal moneyline with opponent - Skipping this game")
-        
-        # Log final counts
-        logger.info(f"Favored wins: {favored_wins} out of {total_favored}")
-        logger.info(f"Underdog wins: {underdog_wins} out of {total_underdog}")
-        
-        # Calculate percentages, avoid division by zero
-        stats = {
-            'favored_win_rate': (favored_wins / total_favored * 100) if total_favored > 0 else 0,
-            'underdog_win_rate': (underdog_wins / total_underdog * 100) if total_underdog > 0 else 0
-        }
-        
-        logger.info(f"Calculated stats for {team}: {stats}")
-        return stats
-        
+        moneylines_collection.create_index([('last_updated', DESCENDING)])
+        moneylines_collection.create_index([
+            ('sport', ASCENDING),
+            ('last_updated', DESCENDING),
+            ('event_date', ASCENDING)
+        ])
+        moneylines_collection.create_index([
+            ('sport', ASCENDING),
+            ('status', ASCENDING),
+            ('last_updated', DESCENDING)
+        ])
+        moneylines_collection.create_index([
+            ('sport', ASCENDING),
+            ('event_date', ASCENDING),
+            ('_id', ASCENDING)
+        ])
+        moneylines_collection.create_index([
+            ('teams.home.key', ASCENDING),
+            ('event_date', ASCENDING)
+        ])
+        moneylines_collection.create_index([
+            ('teams.away.key', ASCENDING),
+            ('event_date', ASCENDING)
+        ])
+        moneylines_collection.create_index([
+            ('teams.home.name', ASCENDING),
+            ('event_date', DESCENDING),
+            ('_id', DESCENDING)
+        ])
+        moneylines_collection.create_index([
+            ('teams.away.name', ASCENDING),
+            ('event_date', DESCENDING),
+            ('_id', DESCENDING)
+        ])
     except Exception as e:
-        logger.error(f"Error calculating team stats for {team}: {e}", exc_info=True)
-        return {'favored_win_rate': 0, 'underdog_win_rate': 0}
+        logger.error(f"Error creating indexes: {e}")
+
+# --------------------- Caches ---------------------
+# Kept for DATA_CACHE_TTL, but dropped as soon as the invalidation watcher sees
+# the games behind them change (e.g. update_game_results running elsewhere).
+# Misses fall through to the disk tier, which only serves entries computed at
+# the current data watermark
+disk_tier = DiskCache(lambda: get_last_updated(strict=True))
+bus.subscribe(GAME_CHANGED, disk_tier.mark_stale)
+
+slate_cache = InvalidatedCache('slates', max_entries=500, backing=disk_tier).subscribe(GAME_CHANGED)
+win_stats_cache = InvalidatedCache('win_stats', backing=disk_tier).subscribe(TEAM_STATS_CHANGED, team_tags)
+team_list_cache = InvalidatedCache('team_list', max_entries=1, backing=disk_tier)
+
+def on_team_list_changed(event):
+    # Most changes are to games between teams already listed
+    teams = team_list_cache.get('teams')
+    if teams is None or event.teams is None or not all(name in teams for name in event.teams):
+        team_list_cache.clear()
+
+bus.subscribe(TEAM_LIST_CHANGED, on_team_list_changed)
+init_invalidation(app)
+
+# --------------------- Stale-While-Revalidate ---------------------
+last_good = LastGoodCache()
+_refreshing = set()
+_refreshing_lock = threading.Lock()
 
+def load_with_fallback(key, loader):
+    """
+    Loads a page's data through the database circuit breaker, keeping the
+    result as the page's last good copy. While the breaker is open, or if the
+    load fails because the database is unavailable, the last good copy is
+    returned instead and g.data_as_of is set to when it was loaded. Once the
+    breaker's cooldown has passed, the copy is refreshed on a background thread
+    (the half-open trial) while this request is still served from it.
+    :param key: Identifies the page's data, e.g. ('today', timezone, sports, day).
+    :param loader: Zero-argument function returning the data; it must raise
+                   (not swallow) DATABASE_UNAVAILABLE errors.
+    :raises DATABASE_UNAVAILABLE: When the database is unavailable and there is no copy.
+    """
+    stale = last_good.get(key)
+    if stale is not None and not db_breaker.closed:
+        if db_breaker.ready_for_trial():
+            refresh_in_background(key, loader)
+        return serve_stale(key, stale)
+    try:
+        value = db_breaker.call(loader)
+    except DATABASE_UNAVAILABLE as e:
+        if stale is None:
+            raise
+        logger.warning(f"Database unavailable for {key}: {e}")
+        return serve_stale(key, stale)
+    last_good.set(key, value, datetime.now(pytz.UTC))
+    return value
+
+def serve_stale(key, stale):
+    value, as_of = stale
+    g.data_as_of = min(as_of, g.get('data_as_of') or as_of)
+    logger.info(f"Serving {key} as of {as_of.isoformat()}")
+    return value
+
+def refresh_in_background(key, loader):
+    """Runs one refresh per key at a time, in the current request's context."""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    @copy_current_request_context
+    def refresh():
+        try:
+            last_good.set(key, db_breaker.call(loader), datetime.now(pytz.UTC))
+            logger.info(f"Refreshed {key} in the background")
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=refresh, name='stale-refresh', daemon=True).start()
+
+@app.context_processor
+def inject_data_as_of():
+    return {'data_as_of': g.get('data_as_of')}
+
+# --------------------- Helper Functions ---------------------
 def calculate_win_stats(team, up_to_date=None):
     try:
         team = team.strip().lower()
+        cached = win_stats_cache.get((team, up_to_date))
+        if cached is not None:
+            return dict(cached)
         logger.info(f"Calculating win stats for team: {team} up to date: {up_to_date}")
         
         # Prepare the date filter if a date is provided
@@ -170,8 +261,8 @@ def calculate_win_stats(team, up_to_date=None):
         for game in completed_games:
             home_team = game.get('teams', {}).get('home', {}).get('name', '').strip()
             away_team = game.get('teams', {}).get('away', {}).get('name', '').strip()
-            home_moneyline = game.get('teams', {}).get('home', {}).get('moneyline')
-            away_moneyline = game.get('teams', {}).get('away', {}).get('moneyline')
+            home_moneyline = consensus_moneyline(game.get('teams', {}).get('home', {}))
+            away_moneyline = consensus_moneyline(game.get('teams', {}).get('away', {}))
             winner = game.get('result', {}).get('winner', '').strip()
 
             # Normalize team names
@@ -236,8 +327,11 @@ def calculate_win_stats(team, up_to_date=None):
         }
 
         logger.info(f"Calculated win stats for {team}: {stats}")
-        return stats
+        win_stats_cache.set((team, up_to_date), stats, tags=[team])
+        return dict(stats)
 
+    except DATABASE_UNAVAILABLE:
+        raise
     except Exception as e:
         logger.error(f"Error in calculate_win_stats for {team}: {e}", exc_info=True)
         return {
@@ -251,23 +345,31 @@ def calculate_win_stats(team, up_to_date=None):
             'total_favored_games': 0
         }
 
+def get_day_bounds_utc(target_date):
+    """
+    Returns the UTC start and end of the calendar day target_date falls on,
+    in target_date's own timezone.
+    """
+    start_of_day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_day = target_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return start_of_day.astimezone(pytz.UTC), end_of_day.astimezone(pytz.UTC)
+
 def fetch_games(target_date, timezone=None, sports=None):
     try:
         timezone = timezone or session.get('timezone', 'UTC')
         user_timezone = pytz.timezone(timezone)
-        utc = pytz.UTC
         
         # Make sure target_date is timezone aware in user's timezone
         if target_date.tzinfo is None:
             target_date = user_timezone.localize(target_date)
         
-        # Get start and end of day in user's timezone
-        start_of_day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = target_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Convert to UTC for MongoDB query
-        start_of_day_utc = start_of_day.astimezone(utc)
-        end_of_day_utc = end_of_day.astimezone(utc)
+        # Get start and end of day in user's timezone, converted to UTC for MongoDB
+        start_of_day_utc, end_of_day_utc = get_day_bounds_utc(target_date)
+
+        cache_key = (start_of_day_utc, timezone, tuple(sorted(sports)) if sports and isinstance(sports, list) else None)
+        cached = slate_cache.get(cache_key)
+        if cached is not None:
+            return list(cached), len(cached)
         
         # Build query with strict date range
         base_query = {
@@ -295,58 +397,194 @@ def fetch_games(target_date, timezone=None, sports=None):
         logger.info(f"Sports filter: {sports}")
         logger.info(f"Final query: {query}")
 
-        # Execute query
-        total_games = moneylines_collection.count_documents(query)
-        logger.info(f"Found {total_games} games matching query")
-        
-        # Use proper sorting and pagination
+        # Execute query; the length of the result is the count, so no count_documents
         games_cursor = moneylines_collection.find(query).sort('event_date', 1)
         
+        games = [format_game(game, user_timezone, include_stats=False) for game in games_cursor]
+        add_game_details(games)
+        logger.info(f"Found {len(games)} games matching query")
+
+        slate_cache.set(cache_key, games)
+        return list(games), len(games)
+    except DATABASE_UNAVAILABLE:
+        raise  # Not an empty result; let the caller fall back
+    except Exception as e:
+        logger.error(f"Error in fetch_games function: {e}")
+        return [], 0
+
+def fetch_slate(target_date, timezone, sports, last_updated=None):
+    """
+    Serves one local day's games from the slate precomputed at ingest (see
+    slates.py): one document read, then the day's games converted to the
+    viewer's timezone. Falls back to fetch_games when there is no slate or it
+    is older than the data.
+    :param last_updated: The slate's current watermark (get_slate_last_updated).
+    """
+    try:
+        user_timezone = pytz.timezone(timezone)
+        if target_date.tzinfo is None:
+            target_date = user_timezone.localize(target_date)
+        slate = get_slate(target_date.date(), sports)
+        watermark = slate.get('watermark') if slate else None
+        if watermark is not None and watermark.tzinfo is None:
+            watermark = pytz.utc.localize(watermark)
+        if slate is None or (last_updated and (watermark is None or watermark < last_updated)):
+            logger.info(f"No current slate for {target_date.date()} {sports}; querying live")
+            return fetch_games(target_date, timezone=timezone, sports=sports)
+
+        start_of_day_utc, end_of_day_utc = get_day_bounds_utc(target_date)
         games = []
-        for game in games_cursor:
-            event_date_utc = game.get('event_date')
-            if isinstance(event_date_utc, str):
-                event_date_utc = datetime.fromisoformat(event_date_utc)
-            if event_date_utc.tzinfo is None:
-                event_date_utc = pytz.utc.localize(event_date_utc)
-            event_date_local = event_date_utc.astimezone(user_timezone)
+        for payload in slate['games']:
+            event_date_utc = pytz.utc.localize(payload['event_date'])
+            if start_of_day_utc <= event_date_utc <= end_of_day_utc and payload['sport'] in sports:
+                games.append(dict(payload, event_date=event_date_utc.astimezone(user_timezone), event_date_utc=event_date_utc))
+        return games, len(games)
+    except DATABASE_UNAVAILABLE:
+        raise
+    except Exception as e:
+        logger.error(f"Error in fetch_slate function: {e}")
+        return fetch_games(target_date, timezone=timezone, sports=sports)
 
-            # Add team stats for in-progress games
-            home_team_stats = None
-            away_team_stats = None
-            if game.get('status') == 'In Progress':
-                home_team = game.get('teams', {}).get('home', {}).get('name')
-                away_team = game.get('teams', {}).get('away', {}).get('name')
-                home_team_stats = get_team_stats(home_team)
-                away_team_stats = get_team_stats(away_team)
+def get_event_date_utc(game):
+    """Returns a game's event_date as a timezone-aware UTC datetime."""
+    event_date_utc = game.get('event_date')
+    if isinstance(event_date_utc, str):
+        event_date_utc = datetime.fromisoformat(event_date_utc)
+    if event_date_utc.tzinfo is None:
+        event_date_utc = pytz.utc.localize(event_date_utc)
+    return event_date_utc
 
-            home_team = game.get('teams', {}).get('home', {}).get('name', 'Unknown')
-            away_team = game.get('teams', {}).get('away', {}).get('name', 'Unknown')
-            # Fetch win stats for home and away teams
-            home_team_stats = calculate_win_stats(home_team, up_to_date=event_date_utc)
-            away_team_stats = calculate_win_stats(away_team, up_to_date=event_date_utc)
+def format_game(game, user_timezone, include_stats=True):
+    """
+    Shapes a stored game for game_view.html.
+    :param include_stats: When False, the as-of win stats are left as None so
+                          callers can fill them in later with add_game_stats.
+    """
+    event_date_utc = get_event_date_utc(game)
+    view = {
+        'game_id': game.get('game_id'),
+        'event_date': event_date_utc.astimezone(user_timezone),
+        'event_date_utc': event_date_utc,
+        'home_team': game.get('teams', {}).get('home', {}).get('name', 'Unknown'),
+        'home_moneyline': game.get('teams', {}).get('home', {}).get('moneyline', 'N/A'),
+        'away_team': game.get('teams', {}).get('away', {}).get('name', 'Unknown'),
+        'away_moneyline': game.get('teams', {}).get('away', {}).get('moneyline', 'N/A'),
+        'home_best': game.get('teams', {}).get('home', {}).get('best'),
+        'away_best': game.get('teams', {}).get('away', {}).get('best'),
+        'elo': card_view(game),
+        'winner': game.get('result', {}).get('winner', 'N/A'),
+        'status': game.get('status', 'In Progress'),
+        'result': {  # Add scores to the game data
+            'home_score': game.get('result', {}).get('home_score', 'N/A'),
+            'away_score': game.get('result', {}).get('away_score', 'N/A')
+        },
+        'home_team_stats': None,
+        'away_team_stats': None,
+        'head_to_head': None,
+        'home_form': None,
+        'away_form': None
+    }
+    if include_stats:
+        add_game_stats(view)
+    return view
 
-            games.append({
-                'event_date': event_date_local,
-                'home_team': game.get('teams', {}).get('home', {}).get('name', 'Unknown'),
-                'home_moneyline': game.get('teams', {}).get('home', {}).get('moneyline', 'N/A'),
-                'away_team': game.get('teams', {}).get('away', {}).get('name', 'Unknown'),
-                'away_moneyline': game.get('teams', {}).get('away', {}).get('moneyline', 'N/A'),
-                'winner': game.get('result', {}).get('winner', 'N/A'),
-                'status': game.get('status', 'In Progress'),
-                'result': {  # Add scores to the game data
-                    'home_score': game.get('result', {}).get('home_score', 'N/A'),
-                    'away_score': game.get('result', {}).get('away_score', 'N/A')
-                },
-                'home_team_stats': home_team_stats,
-                'away_team_stats': away_team_stats
-            })
+def add_game_stats(view):
+    """Fills in both teams' win stats as of the game's start time."""
+    view['home_team_stats'] = calculate_win_stats(view['home_team'], up_to_date=view['event_date_utc'])
+    view['away_team_stats'] = calculate_win_stats(view['away_team'], up_to_date=view['event_date_utc'])
+    return view
 
-        games = sorted(games, key=lambda x: x['event_date'])
-        return games, len(games)
+def add_game_details(views, with_stats=None):
+    """
+    Fills in as-of win stats, head-to-head records and form, running the
+    independent reads concurrently (see parallel.py).
+    :param with_stats: Views that get win stats; defaults to all of them.
+    """
+    with_stats = views if with_stats is None else with_stats
+    gather(
+        lambda: gather_each(add_game_stats, with_stats),
+        lambda: add_head_to_head(views),
+        lambda: add_team_form(views)
+    )
+    return views
+
+def add_head_to_head(views):
+    """
+    Attaches each pair's head-to-head record to date (not as of the game) for
+    both teams, with a single matchups lookup for the whole list.
+    """
+    matchups = get_matchups((view['home_team'], view['away_team']) for view in views)
+    for view in views:
+        matchup = matchups.get(pair_key(view['home_team'], view['away_team']))
+        view['head_to_head'] = {
+            'games': matchup.get('games', 0) if matchup else 0,
+            'home': team_record(matchup, view['home_team']),
+            'away': team_record(matchup, view['away_team'])
+        }
+    return views
+
+def add_team_form(views):
+    """Attaches both teams' current form (not as of the game) to each game with one team_form lookup."""
+    forms = get_forms(name for view in views for name in (view['home_team'], view['away_team']))
+    for view in views:
+        view['home_form'] = forms.get(team_key(view['home_team']))
+        view['away_form'] = forms.get(team_key(view['away_team']))
+    return views
+
+def fetch_games_range(start_date, end_date, timezone=None, sports=None, visible_days=None):
+    """
+    Fetches every game between two local calendar days (inclusive) with one query
+    and buckets them by local day in a single pass.
+    :param start_date: First local date (datetime.date).
+    :param end_date: Last local date (datetime.date).
+    :param visible_days: Dates whose games get as-of win stats; defaults to all.
+                         Other days carry their games without stats.
+    :return: List of {'date', 'games', 'has_stats'} dicts, one per day in order.
+    """
+    try:
+        timezone = timezone or session.get('timezone', 'UTC')
+        user_timezone = pytz.timezone(timezone)
+
+        # localize() each boundary separately so DST changes inside the window are honored
+        start_utc = user_timezone.localize(datetime.combine(start_date, datetime.min.time())).astimezone(pytz.UTC)
+        end_utc = user_timezone.localize(
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        ).astimezone(pytz.UTC)
+
+        query = {'event_date': {'$gte': start_utc, '$lt': end_utc}}
+        if sports and isinstance(sports, list):
+            query['sport'] = {'$in': sports}
+
+        logger.info(f"Range query: {start_utc} to {end_utc}, sports: {sports}, timezone: {timezone}")
+
+        buckets = {}
+        day = start_date
+        while day <= end_date:
+            buckets[day] = []
+            day += timedelta(days=1)
+
+        for game in moneylines_collection.find(query).sort('event_date', 1):
+            view = format_game(game, user_timezone, include_stats=False)
+            local_day = view['event_date'].date()
+            if local_day in buckets:
+                buckets[local_day].append(view)
+
+        days = []
+        visible = []
+        for day, games in buckets.items():
+            has_stats = visible_days is None or day in visible_days
+            if has_stats:
+                visible.extend(games)
+            days.append({'date': day, 'games': games, 'has_stats': has_stats})
+        add_game_details(visible)
+
+        logger.info(f"Found {sum(len(day['games']) for day in days)} games across {len(days)} days")
+        return days
+    except DATABASE_UNAVAILABLE:
+        raise
     except Exception as e:
-        logger.error(f"Error in fetch_games function: {e}")
-        return [], 0
+        logger.error(f"Error in fetch_games_range function: {e}")
+        return []
 
 def fetch_team_games(team):
     try:
@@ -361,12 +599,7 @@ def fetch_team_games(team):
             ]
         }
 
-        # Pagination setup
-        total_games = moneylines_collection.count_documents(query)
-        if total_games == 0:
-            return [], 0
-
-        # Add sort parameter to find() call
+        # Add sort parameter to find() call; the length of the result is the count
         games_cursor = moneylines_collection.find(query).sort('event_date', -1)
 
         # Process games
@@ -379,34 +612,35 @@ def fetch_team_games(team):
                 event_date_utc = pytz.utc.localize(event_date_utc)
             event_date_local = event_date_utc.astimezone(user_timezone)
 
-            # Add team stats for in-progress games
             home_team = game.get('teams', {}).get('home', {}).get('name', 'Unknown')
             away_team = game.get('teams', {}).get('away', {}).get('name', 'Unknown')
-            home_team_stats = get_team_stats(home_team) if game.get('status') == 'In Progress' else None
-            away_team_stats = get_team_stats(away_team) if game.get('status') == 'In Progress' else None
-
-            # Fetch win stats as of the game date
-            home_team_stats = calculate_win_stats(home_team, up_to_date=event_date_utc)
-            away_team_stats = calculate_win_stats(away_team, up_to_date=event_date_utc)
 
             games.append({
+                'game_id': game.get('game_id'),
                 'event_date': event_date_local,
+                'event_date_utc': event_date_utc,
                 'home_team': home_team,
                 'home_moneyline': game.get('teams', {}).get('home', {}).get('moneyline', 'N/A'),
                 'away_team': away_team,
                 'away_moneyline': game.get('teams', {}).get('away', {}).get('moneyline', 'N/A'),
+                'home_best': game.get('teams', {}).get('home', {}).get('best'),
+                'away_best': game.get('teams', {}).get('away', {}).get('best'),
+                'elo': card_view(game),
                 'winner': game.get('result', {}).get('winner', 'N/A'),
                 'status': game.get('status', 'In Progress'),
                 'result': {  # Add scores to the game data
                     'home_score': game.get('result', {}).get('home_score', 'N/A'),
                     'away_score': game.get('result', {}).get('away_score', 'N/A')
                 },
-                'home_team_stats': home_team_stats,
-                'away_team_stats': away_team_stats
+                'home_team_stats': None,  # Win stats as of the game date, filled in below
+                'away_team_stats': None
             })
 
+        add_game_details(games)
         return games, len(games)
         
+    except DATABASE_UNAVAILABLE:
+        raise
     except Exception as e:
         logger.error(f"Error in fetch_team_games function: {e}")
         return [], 0
@@ -417,15 +651,166 @@ def get_unique_teams():
     :return: List of team names.
     """
     try:
+        cached = team_list_cache.get('teams')
+        if cached is not None:
+            return list(cached)
         home_teams = moneylines_collection.distinct('teams.home.name')
         away_teams = moneylines_collection.distinct('teams.away.name')
         unique_teams = sorted(set(home_teams + away_teams))
         logger.info(f"Unique teams retrieved: {unique_teams}")
-        return unique_teams
+        team_list_cache.set('teams', unique_teams)
+        return list(unique_teams)
+    except DATABASE_UNAVAILABLE:
+        raise
     except Exception as e:
         logger.error(f"Error fetching unique teams: {e}")
         return []
 
+# --------------------- Cache Warm-up ---------------------
+def warm_caches(timezones=None, sports=None, days_back=1, days_ahead=5):
+    """
+    Loads everything still valid from the disk tier into this worker's caches,
+    then computes any default slates for this week that are still missing.
+    Run before the worker takes traffic (see wsgi.py).
+    :return: Dict of counts loaded and computed.
+    """
+    try:
+        started = datetime.now()
+        today = datetime.now(pytz.UTC)
+        week_start, week_end = today - timedelta(days=days_back + 1), today + timedelta(days=days_ahead + 1)
+        counts = {
+            'slates': slate_cache.load(lambda key: week_start <= key[0] <= week_end),
+            'win_stats': win_stats_cache.load(),
+            'team_list': team_list_cache.load(),
+            'computed': 0
+        }
+
+        with app.test_request_context():
+            for timezone in timezones or WARM_UP_TIMEZONES:
+                local_now = datetime.now(pytz.timezone(timezone))
+                for offset in range(-days_back, days_ahead + 1):
+                    target_date = local_now + timedelta(days=offset)
+                    start_of_day_utc, _ = get_day_bounds_utc(target_date)
+                    if slate_cache.get((start_of_day_utc, timezone, tuple(sorted(sports or ['NBA'])))) is None:
+                        fetch_games(target_date, timezone=timezone, sports=sports or ['NBA'])
+                        counts['computed'] += 1
+            get_unique_teams()
+
+        logger.info(f"Warmed caches in {(datetime.now() - started).total_seconds():.2f}s: {counts}")
+        return counts
+    except Exception as e:
+        logger.error(f"Error warming caches: {e}")
+        return {}
+
+# --------------------- Conditional Requests ---------------------
+def get_last_updated(query=None, strict=False):
+    """
+    Returns the newest last_updated among games matching the query.
+    Runs as one find_one sorted on last_updated (see ensure_indexes). With no
+    filter, or sport and status filters, it reads the first index entry (per
+    sport). An event_date bound is checked against the (sport, last_updated,
+    event_date) keys on the way down, so newer entries for later games (the
+    coming days' odds updates) are skipped without fetching their documents,
+    but how many are walked depends on how many such games were updated since.
+    :param strict: Raise DATABASE_UNAVAILABLE errors rather than returning None
+                   (for callers that would remember the None, like the disk tier).
+    :return: Timezone-aware UTC datetime, or None if nothing matches.
+    """
+    if not strict and not db_breaker.closed:
+        return None  # Pages are being served from their last good data
+    try:
+        latest = db_breaker.call(
+            moneylines_collection.find_one,
+            query or {},
+            {'last_updated': 1, '_id': 0},
+            sort=[('last_updated', DESCENDING)]
+        )
+        last_updated = (latest or {}).get('last_updated')
+        if not isinstance(last_updated, datetime):
+            return None
+        if last_updated.tzinfo is None:
+            last_updated = pytz.utc.localize(last_updated)
+        return last_updated
+    except DATABASE_UNAVAILABLE as e:
+        if strict:
+            raise
+        logger.error(f"Error fetching last_updated watermark: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching last_updated watermark: {e}")
+        return None
+
+def get_slate_last_updated(end_of_day_utc, sports):
+    """
+    Stats on a slate cover every completed game up to the end of that day, so its
+    watermark spans all games of the selected sports up to end_of_day_utc.
+    Cards also show head-to-head records and form as they stand now, so a day
+    that has already ended also moves with the newest completed game.
+    """
+    query = {'event_date': {'$lte': end_of_day_utc}}
+    if sports:
+        query['sport'] = {'$in': sports}
+    last_updated = get_last_updated(query)
+    if end_of_day_utc >= datetime.now(pytz.UTC):
+        return last_updated  # Every game that can have completed is already in the query
+    completed = {'status': 'Completed'}
+    if sports:
+        completed['sport'] = {'$in': sports}
+    completed_last_updated = get_last_updated(completed)
+    if last_updated is None or completed_last_updated is None:
+        return last_updated or completed_last_updated
+    return max(last_updated, completed_last_updated)
+
+def get_slate_validator(end_of_day_utc, timezone, sports, *extra, last_updated=None):
+    """
+    Builds the (etag, last_modified) pair for a one-day slate.
+    :param last_updated: The slate's watermark, if the caller already has it.
+    """
+    if last_updated is None:
+        last_updated = get_slate_last_updated(end_of_day_utc, sports)
+    return build_validator(last_updated, end_of_day_utc.isoformat(), timezone, *sorted(sports or []), *extra)
+
+def build_validator(last_updated, *parts):
+    """
+    Hashes the data watermark together with everything else that shapes the page.
+    The logged-in user is included because the navbar is rendered per user.
+    """
+    user_id = current_user.get_id() if current_user.is_authenticated else ''
+    watermark = last_updated.isoformat() if last_updated else 'none'
+    key = '|'.join([request.path, user_id, watermark] + [str(part) for part in parts])
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    last_modified = last_updated.replace(microsecond=0) if last_updated else None
+    return etag, last_modified
+
+def is_not_modified(etag, last_modified):
+    """
+    Checks the request's If-None-Match / If-Modified-Since headers.
+    If-None-Match wins when both are sent, as per RFC 9110.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+def conditional_response(body, etag, last_modified, status=200):
+    """
+    Wraps a rendered page (or an empty 304 body) with its validators.
+    """
+    response = make_response(body, status)
+    if g.get('data_as_of'):
+        # Served from last good data while the database is unavailable; never revalidate against it
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified_response(etag, last_modified):
+    return conditional_response('', etag, last_modified, status=304)
+
 # Add this after the app initialization, before the routes
 
 @app.template_filter('format_datetime')
@@ -442,6 +827,282 @@ def format_datetime(value, timezone=None):
     # Format as mm/dd/yyyy hh:mm AM/PM
     return local_dt.strftime('%m/%d/%Y %I:%M %p')
 
+# --------------------- JSON API Helpers ---------------------
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 500
+API_MIN_COMPRESS_BYTES = 1024
+API_STATUS_CODES = {'Scheduled': 0, 'In Progress': 1, 'Completed': 2, 'No Result': 3}
+
+def to_epoch(value):
+    """Converts a stored datetime (naive values are UTC) to integer epoch seconds."""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = pytz.utc.localize(value)
+    return int(value.timestamp())
+
+def parse_api_date(value, default):
+    """Accepts epoch seconds or YYYY-MM-DD (UTC midnight) query values."""
+    if not value:
+        return default
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value), tz=pytz.UTC)
+    return pytz.UTC.localize(datetime.strptime(value, '%Y-%m-%d'))
+
+def encode_cursor(game):
+    event_date = game.get('event_date')
+    if event_date.tzinfo is None:
+        event_date = pytz.utc.localize(event_date)
+    # Milliseconds, matching BSON date precision, so the seek resumes exactly
+    raw = dumps_json([int(event_date.timestamp() * 1000), str(game['_id'])])
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decodes an opaque cursor back into the (event_date, _id) of the last row sent.
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        epoch_ms, object_id = json.loads(base64.urlsafe_b64decode(padded))
+        event_date = datetime(1970, 1, 1, tzinfo=pytz.UTC) + timedelta(milliseconds=int(epoch_ms))
+        return event_date, ObjectId(object_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def seek_filter(cursor, descending=False):
+    """Keyset condition that resumes strictly after the cursor row in (event_date, _id) order."""
+    event_date, object_id = decode_cursor(cursor)
+    op = '$lt' if descending else '$gt'
+    return {'$or': [
+        {'event_date': {op: event_date}},
+        {'event_date': event_date, '_id': {op: object_id}}
+    ]}
+
+def compact_game(game):
+    """
+    Flattens a stored game into the API row format:
+    id, s(port), t(ime), st(atus: 0 scheduled, 1 in progress, 2 completed),
+    h/a = [name, moneyline, score], w(inner: 'h', 'a' or null), u(pdated).
+    """
+    teams = game.get('teams', {})
+    home = teams.get('home', {})
+    away = teams.get('away', {})
+    result = game.get('result') or {}
+    winner = result.get('winner')
+    return {
+        'id': game.get('game_id'),
+        's': game.get('sport'),
+        't': to_epoch(game.get('event_date')),
+        'st': API_STATUS_CODES.get(game.get('status'), 1),
+        'h': [home.get('name'), home.get('moneyline'), result.get('home_score')],
+        'a': [away.get('name'), away.get('moneyline'), result.get('away_score')],
+        'w': 'h' if winner and winner == home.get('name') else 'a' if winner else None,
+        'u': to_epoch(game.get('last_updated'))
+    }
+
+def compact_team_stats(teams):
+    """
+    Builds one stats entry per distinct team on the page instead of one per row,
+    from a single query for all of them:
+    [favored_wins, favored_games, underdog_wins, underdog_games].
+    """
+    teams = list(dict.fromkeys(team for team in teams if team))
+    now = datetime.now(pytz.UTC).replace(tzinfo=None)
+    all_stats = win_stats_as_of((team, now) for team in teams)
+    stats = {}
+    for team in teams:
+        win_stats = all_stats[(team.strip().lower(), now)]
+        stats[team] = [
+            win_stats['favored_wins'],
+            win_stats['total_completed_favored_games'],
+            win_stats['underdog_wins'],
+            win_stats['total_completed_underdog_games']
+        ]
+    return stats
+
+def compact_head_to_head(rows):
+    """
+    Head-to-head records for every pairing on the page, from one matchups lookup:
+    {pair_key: {'n': games, team: [wins, favored_wins, favored_games, underdog_wins, underdog_games]}}.
+    """
+    pairs = [(row['h'][0], row['a'][0]) for row in rows]
+    matchups = get_matchups(pairs)
+    compact = {}
+    for home_team, away_team in pairs:
+        key = pair_key(home_team, away_team)
+        if not key or key in compact:
+            continue
+        matchup = matchups.get(key)
+        compact[key] = {'n': matchup.get('games', 0) if matchup else 0}
+        for team in (home_team, away_team):
+            record = team_record(matchup, team)
+            compact[key][team] = [
+                record['wins'], record['favored_wins'], record['favored_games'],
+                record['underdog_wins'], record['underdog_games']
+            ]
+    return compact
+
+def dumps_json(payload):
+    if orjson:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def api_response(payload, status=200):
+    """
+    Serializes the payload and compresses it with the best encoding the client
+    accepts (br, then gzip). Small bodies are sent as-is.
+    """
+    body = dumps_json(payload)
+    encoding = None
+    if len(body) >= API_MIN_COMPRESS_BYTES:
+        accepted = request.accept_encodings
+        if brotli and accepted['br']:
+            body, encoding = brotli.compress(body), 'br'
+        elif accepted['gzip']:
+            body, encoding = gzip.compress(body, compresslevel=5), 'gzip'
+
+    response = make_response(body, status)
+    response.mimetype = 'application/json'
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def api_error(message, status=400):
+    return api_response({'error': message}, status)
+
+def get_api_limit():
+    limit = request.args.get('limit', API_DEFAULT_LIMIT, type=int)
+    return max(1, min(limit or API_DEFAULT_LIMIT, API_MAX_LIMIT))
+
+def fetch_api_page(query, sort_direction, limit):
+    """
+    Reads one keyset page plus a single look-ahead row to decide whether a next
+    cursor is needed, so no count query is issued.
+    """
+    games = list(
+        moneylines_collection.find(query)
+        .sort([('event_date', sort_direction), ('_id', sort_direction)])
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(games[limit - 1]) if len(games) > limit else None
+    return games[:limit], next_cursor
+
+# --------------------- Export Helpers ---------------------
+EXPORT_BATCH_SIZE = 500  # Documents per cursor batch and rows per streamed chunk
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_FIELDS = [
+    'event_date', 'sport', 'home_team', 'away_team', 'home_moneyline', 'away_moneyline',
+    'status', 'home_score', 'away_score', 'winner'
+]
+
+def export_row(game, user_timezone):
+    """Flattens a moneylines document into one export row in the user's timezone."""
+    teams = game.get('teams', {})
+    result = game.get('result') or {}
+    event_date = get_event_date_utc(game)
+    return {
+        'event_date': event_date.astimezone(user_timezone).isoformat() if event_date else None,
+        'sport': game.get('sport'),
+        'home_team': teams.get('home', {}).get('name'),
+        'away_team': teams.get('away', {}).get('name'),
+        'home_moneyline': teams.get('home', {}).get('moneyline'),
+        'away_moneyline': teams.get('away', {}).get('moneyline'),
+        'status': game.get('status'),
+        'home_score': result.get('home_score'),
+        'away_score': result.get('away_score'),
+        'winner': result.get('winner'),
+    }
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: export_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [export_value(item) for item in value]
+    return value
+
+def stream_rows(rows, export_format, fields=None):
+    """
+    Encodes rows lazily, yielding one chunk per EXPORT_BATCH_SIZE rows so
+    only a single batch is ever buffered. CSV columns default to the keys of
+    the first row; nested values are written as JSON.
+    """
+    buffer = io.StringIO()
+    writer = None
+    pending = 0
+    for row in rows:
+        row = export_value(row)
+        if export_format == 'ndjson':
+            buffer.write(dumps_json(row).decode('utf-8'))
+            buffer.write('\n')
+        else:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=fields or list(row), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow({
+                key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                for key, value in row.items()
+            })
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if writer is None and export_format == 'csv' and fields:
+        csv.DictWriter(buffer, fieldnames=fields).writeheader()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def start_cursor(cursor):
+    """
+    Fetches a cursor's first batch now, so query errors are raised before the
+    response starts streaming.
+    :return: Iterator over every document.
+    """
+    documents = iter(cursor)
+    first = next(documents, None)
+    return iter(()) if first is None else itertools.chain([first], documents)
+
+def search_export_serializer():
+    return URLSafeSerializer(app.secret_key, salt='search-export')
+
+def search_export_token(natural_query, mongo_query, is_aggregation):
+    """Signs the query a results page ran, so its export runs exactly that query."""
+    return search_export_serializer().dumps({
+        'prompt': natural_query,
+        'query': json_util.dumps(mongo_query),
+        'is_aggregation': is_aggregation
+    })
+
+def read_search_export_token(token):
+    """:return: (prompt, query, is_aggregation), or None if the token is missing or was tampered with."""
+    try:
+        payload = search_export_serializer().loads(token or '')
+        return payload['prompt'], json_util.loads(payload['query']), payload['is_aggregation']
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+def export_response(rows, export_format, filename, fields=None):
+    """Streams rows as a download; the cursor is read as the client consumes the body."""
+    response = Response(stream_with_context(stream_rows(rows, export_format, fields)),
+                        mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+def get_export_format():
+    export_format = request.args.get('format', 'csv').lower()
+    return export_format if export_format in EXPORT_FORMATS else None
+
+def export_filename(text):
+    return ''.join(c if c.isalnum() else '_' for c in text).strip('_').lower()[:60] or 'export'
+
 # --------------------- Routes ---------------------
 @app.route('/')
 @login_required
@@ -460,18 +1121,24 @@ def index():
         selected_sports = [sport for sport in selected_sports if sport in SPORTS.values()]
         if not selected_sports:
             selected_sports = ['NBA']
+
+        _, end_of_day_utc = get_day_bounds_utc(now_user_tz)
+        last_updated = get_slate_last_updated(end_of_day_utc, selected_sports)
+        etag, last_modified = get_slate_validator(end_of_day_utc, timezone, selected_sports, last_updated=last_updated)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
             
-        games_today, _ = fetch_games(
-            target_date=now_user_tz, 
-            timezone=timezone,
-            sports=selected_sports
+        games_today, _ = load_with_fallback(
+            ('today', timezone, tuple(selected_sports), end_of_day_utc),
+            lambda: fetch_slate(now_user_tz, timezone, selected_sports, last_updated)
         )
 
-        return render_template('today.html', 
+        return conditional_response(render_template('today.html', 
                             games=games_today, 
                             page_title="Today's Games",
                             timezone=timezone,
-                            selected_sports=selected_sports)
+                            selected_sports=selected_sports,
+                            data_version=last_updated), etag, last_modified)
     except Exception as e:
         logger.error(f"Error in index route: {e}")
         return render_template('error.html', message="An error occurred while fetching today's games.")
@@ -497,22 +1164,28 @@ def tomorrow():
         
         # Debug log
         logger.info(f"Selected sports: {selected_sports}")
+
+        _, end_of_day_utc = get_day_bounds_utc(next_day_date)
+        last_updated = get_slate_last_updated(end_of_day_utc, selected_sports)
+        etag, last_modified = get_slate_validator(end_of_day_utc, timezone, selected_sports, last_updated=last_updated)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
         
-        games_next_day, _ = fetch_games(
-            target_date=next_day_date,
-            timezone=timezone,
-            sports=selected_sports
+        games_next_day, _ = load_with_fallback(
+            ('tomorrow', timezone, tuple(selected_sports), end_of_day_utc),
+            lambda: fetch_slate(next_day_date, timezone, selected_sports, last_updated)
         )
         
         # Log results
         logger.info(f"Found games for tomorrow")
         logger.info(f"Returning games for current page")
 
-        return render_template('tomorrow.html',
+        return conditional_response(render_template('tomorrow.html',
                             games=games_next_day, 
                             page_title="Tomorrow's Games",
                             timezone=timezone,
-                            selected_sports=selected_sports)
+                            selected_sports=selected_sports,
+                            data_version=last_updated), etag, last_modified)
     except Exception as e:
         logger.error(f"Error in tomorrow route: {e}")
         return render_template('error.html', message="An error occurred while fetching tomorrow's games.")
@@ -535,22 +1208,87 @@ def yesterday():  # Changed from 'previous_games' to 'yesterday'
         selected_sports = [sport for sport in selected_sports if sport in SPORTS.values()]
         if not selected_sports:
             selected_sports = ['NBA']
+
+        _, end_of_day_utc = get_day_bounds_utc(previous_day_date)
+        last_updated = get_slate_last_updated(end_of_day_utc, selected_sports)
+        etag, last_modified = get_slate_validator(end_of_day_utc, timezone, selected_sports, last_updated=last_updated)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
         
-        games_previous_day, _ = fetch_games(
-            target_date=previous_day_date,
-            timezone=timezone,
-            sports=selected_sports
+        games_previous_day, _ = load_with_fallback(
+            ('yesterday', timezone, tuple(selected_sports), end_of_day_utc),
+            lambda: fetch_slate(previous_day_date, timezone, selected_sports, last_updated)
         )
 
-        return render_template('yesterday.html',  # Changed from 'previous_games.html' to 'yesterday.html'
+        return conditional_response(render_template('yesterday.html',  # Changed from 'previous_games.html' to 'yesterday.html'
                             games=games_previous_day, 
                             page_title="Yesterday's Games",
                             timezone=timezone,
-                            selected_sports=selected_sports)
+                            selected_sports=selected_sports,
+                            data_version=last_updated), etag, last_modified)
     except Exception as e:
         logger.error(f"Error in yesterday route: {e}")  # Updated error message
         return render_template('error.html', message="An error occurred while fetching yesterday's games.")
 
+RANGE_DEFAULT_DAYS = 7
+RANGE_MAX_DAYS = 31
+
+@app.route('/games')
+@login_required
+def games_range():
+    try:
+        timezone = session.get('timezone', 'UTC')
+        user_tz = pytz.timezone(timezone)
+        today = datetime.now(user_tz).date()
+
+        try:
+            start_date = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else today
+            end_date = (datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to')
+                        else start_date + timedelta(days=RANGE_DEFAULT_DAYS - 1))
+        except ValueError:
+            return render_template('error.html', message="Dates must be in YYYY-MM-DD format.")
+        if end_date < start_date:
+            start_date, end_date = end_date, start_date
+        end_date = min(end_date, start_date + timedelta(days=RANGE_MAX_DAYS - 1))
+
+        selected_sports = [sport for sport in request.args.getlist('sports') if sport in SPORTS.values()] or ['NBA']
+
+        # Only expanded days pay for win stats; default to today when it is in range
+        visible_days = set()
+        for value in request.args.getlist('day'):
+            try:
+                visible_days.add(datetime.strptime(value, '%Y-%m-%d').date())
+            except ValueError:
+                continue
+        if not visible_days:
+            visible_days = {today if start_date <= today <= end_date else start_date}
+
+        end_utc = user_tz.localize(
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        ).astimezone(pytz.UTC)
+        etag, last_modified = get_slate_validator(
+            end_utc, timezone, selected_sports, start_date.isoformat(), *sorted(day.isoformat() for day in visible_days)
+        )
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        days = load_with_fallback(
+            ('games', timezone, tuple(selected_sports), start_date, end_date, tuple(sorted(visible_days))),
+            lambda: fetch_games_range(start_date, end_date, timezone=timezone,
+                                      sports=selected_sports, visible_days=visible_days)
+        )
+
+        return conditional_response(render_template('games.html',
+                            days=days,
+                            start_date=start_date,
+                            end_date=end_date,
+                            page_title="Games",
+                            timezone=timezone,
+                            selected_sports=selected_sports), etag, last_modified)
+    except Exception as e:
+        logger.error(f"Error in games_range route: {e}")
+        return render_template('error.html', message="An error occurred while fetching games.")
+
 @app.route('/team_stats', methods=['GET', 'POST'])
 @login_required
 def team_stats():
@@ -566,24 +1304,40 @@ def team_stats():
 
         team = request.args.get('team')
 
-        # Fetch games for the selected team
-        games, _ = fetch_team_games(team) if team else ([], 0)
+        # Per-game badges include opponents' histories and the team picker lists
+        # every team, so the page depends on the newest update anywhere.
+        last_updated = get_last_updated()
+        etag, last_modified = build_validator(last_updated, timezone, team or '')
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
 
         if team:
-            # Calculate win statistics
-            win_stats = calculate_win_stats(team)
+            def load_team_page():
+                # The team's games, its win statistics, the picker and its form are independent reads
+                (games, _), win_stats, teams, form = gather(
+                    lambda: fetch_team_games(team),
+                    lambda: calculate_win_stats(team),
+                    get_unique_teams,
+                    lambda: get_form(team)
+                )
+                return games, win_stats, teams, form
 
-            return render_template(
+            games, win_stats, teams, form = load_with_fallback(('team_stats', timezone, team), load_team_page)
+
+            return conditional_response(render_template(
                 'team_stats.html',
                 games=games,
                 selected_team=team,
-                teams=get_unique_teams(),
+                teams=teams,
                 page_title=f"Stats for {team}",
                 timezone=timezone,
+                form=form,
+                data_version=last_updated,
                 **win_stats  # Unpack the win_stats dictionary
-            )
+            ), etag, last_modified)
         else:
-            return render_template('team_stats.html', teams=get_unique_teams())
+            teams = load_with_fallback(('teams',), get_unique_teams)
+            return conditional_response(render_template('team_stats.html', teams=teams), etag, last_modified)
     except Exception as e:
         logger.error(f"Error in team_stats route: {e}")
         return render_template('error.html', message="An error occurred while fetching team stats.")
@@ -620,7 +1374,8 @@ def search():
                 'search.html',
                 results=results,
                 query=natural_query,
-                is_aggregation=is_aggregation
+                is_aggregation=is_aggregation,
+                export_token=search_export_token(natural_query, mongo_query, is_aggregation)
             )
 
         return render_template('search.html')
@@ -628,6 +1383,81 @@ def search():
         logger.error(f"Error in search route: {e}")
         return render_template('error.html', message="An error occurred during search.")
 
+@app.route('/team_stats/export')
+@login_required
+def team_stats_export():
+    team = request.args.get('team')
+    export_format = get_export_format()
+    if not team or not export_format:
+        return render_template('error.html', message="Choose a team and a format (csv or ndjson) to export.")
+    user_timezone = pytz.timezone(session.get('timezone', 'UTC'))
+
+    # Each $or branch walks its (team, event_date) index, so the sort merges instead of buffering
+    try:
+        cursor = start_cursor(moneylines_collection.find(
+            {'$or': [{'teams.home.name': team}, {'teams.away.name': team}]}
+        ).sort('event_date', DESCENDING).batch_size(EXPORT_BATCH_SIZE))
+    except Exception as e:
+        logger.error(f"Error exporting team games: {e}")
+        return render_template('error.html', message="An error occurred while exporting team games.")
+    rows = (export_row(game, user_timezone) for game in cursor)
+    return export_response(rows, export_format, export_filename(f"{team}_games"), EXPORT_FIELDS)
+
+@app.route('/search/export')
+@login_required
+def search_export():
+    # The query the results page ran, signed into its export links; generating
+    # it again could give a different query
+    search = read_search_export_token(request.args.get('token'))
+    export_format = get_export_format()
+    if search is None or not export_format:
+        return render_template('error.html', message="Run a search, then export it as csv or ndjson from the results.")
+    natural_query, mongo_query, is_aggregation = search
+    filename = export_filename(f"search_{natural_query}")
+
+    # Unlike the results page, exports aren't capped at 20 rows. The first
+    # batch is fetched here so a bad query fails before the download starts
+    try:
+        if is_aggregation:
+            cursor = start_cursor(moneylines_collection.aggregate(mongo_query, batchSize=EXPORT_BATCH_SIZE))
+            return export_response(cursor, export_format, filename)
+        user_timezone = pytz.timezone(session.get('timezone', 'UTC'))
+        # No sort: an arbitrary filter would force an in-memory sort of the whole result
+        cursor = start_cursor(moneylines_collection.find(mongo_query).batch_size(EXPORT_BATCH_SIZE))
+        rows = (export_row(game, user_timezone) for game in cursor)
+        return export_response(rows, export_format, filename, EXPORT_FIELDS)
+    except Exception as e:
+        logger.error(f"Error exporting search results: {e}")
+        logger.error(f"Generated Query: {mongo_query}")
+        return render_template('error.html', message="Invalid query generated. Please try a different search.")
+
+@app.route('/calibration')
+@login_required
+def calibration():
+    try:
+        sport = request.args.get('sport') or None
+        season = request.args.get('season', type=int)
+        report = get_report(sport=sport, season=season)
+        return render_template('calibration.html', report=report, selected_sport=sport, selected_season=season)
+    except Exception as e:
+        logger.error(f"Error in calibration route: {e}")
+        return render_template('error.html', message="An error occurred while loading the calibration report.")
+
+@app.route('/admin/slow_queries')
+@admin_required
+def admin_slow_queries():
+    try:
+        return render_template('admin_slow_queries.html', shapes=top_shapes(), recent=recent_slow_queries(),
+                               fragments=fragment_cache.stats())
+    except Exception as e:
+        logger.error(f"Error in admin_slow_queries route: {e}")
+        return render_template('error.html', message="An error occurred while loading the slow query log.")
+
+@app.route('/admin/profiles/<filename>')
+@admin_required
+def admin_profile(filename):
+    return send_profile(filename)
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -656,7 +1486,11 @@ def register():
         
         user = User(username=username, email=email)
         user.set_password(password)
-        user.save()
+        try:
+            user.save()
+        except DuplicateKeyError:
+            # Lost a race with a concurrent registration of the same name
+            return render_template('register.html', error="Username already exists")
         
         login_user(user)
         return redirect(url_for('index'))
@@ -676,6 +1510,85 @@ def set_timezone():
     session['timezone'] = timezone
     return jsonify({'status': 'success'})
 
+# --------------------- JSON API ---------------------
+@app.route('/api/v1/games')
+@login_required
+def api_games():
+    """
+    Games between `from` and `to` (epoch seconds or YYYY-MM-DD, default: today UTC),
+    optionally filtered by repeated `sports`, in ascending start time.
+    """
+    try:
+        today = datetime.now(pytz.UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = parse_api_date(request.args.get('from'), today)
+        end = parse_api_date(request.args.get('to'), start + timedelta(days=1))
+        sports = [sport for sport in request.args.getlist('sports') if sport in SPORTS.values()]
+
+        conditions = [{'event_date': {'$gte': start, '$lt': end}}]
+        if sports:
+            conditions.append({'sport': {'$in': sports}})
+        cursor = request.args.get('cursor')
+        if cursor:
+            conditions.append(seek_filter(cursor))
+
+        games, next_cursor = fetch_api_page({'$and': conditions}, ASCENDING, get_api_limit())
+        rows = [compact_game(game) for game in games]
+        payload = {'v': 1, 'games': rows, 'next': next_cursor}
+        if request.args.get('stats', '1') != '0':
+            payload['teams'] = compact_team_stats(name for row in rows for name in (row['h'][0], row['a'][0]))
+        if request.args.get('h2h') == '1':
+            payload['h2h'] = compact_head_to_head(rows)
+        return api_response(payload)
+    except ValueError as e:
+        return api_error(str(e))
+    except Exception as e:
+        logger.error(f"Error in api_games route: {e}")
+        return api_error("An error occurred while fetching games.", 500)
+
+@app.route('/api/v1/teams/<team>/games')
+@login_required
+def api_team_games(team):
+    """
+    A team's full game history, newest first, with the team's all-time stats
+    sent once alongside the rows.
+    """
+    try:
+        conditions = [{'$or': [{'teams.home.name': team}, {'teams.away.name': team}]}]
+        cursor = request.args.get('cursor')
+        if cursor:
+            conditions.append(seek_filter(cursor, descending=True))
+
+        games, next_cursor = fetch_api_page({'$and': conditions}, DESCENDING, get_api_limit())
+        payload = {'v': 1, 'team': team, 'games': [compact_game(game) for game in games], 'next': next_cursor}
+        if request.args.get('stats', '1') != '0':
+            payload['teams'] = compact_team_stats([team])
+        return api_response(payload)
+    except ValueError as e:
+        return api_error(str(e))
+    except Exception as e:
+        logger.error(f"Error in api_team_games route: {e}")
+        return api_error("An error occurred while fetching team games.", 500)
+
+@app.route('/api/v1/matchups/<team>/<opponent>')
+@login_required
+def api_matchup(team, opponent):
+    """Head-to-head record between two teams, from each team's side."""
+    try:
+        key = pair_key(team, opponent)
+        if not key:
+            return api_error("Two team names are required.")
+        matchup = get_matchups([(team, opponent)]).get(key)
+        return api_response({
+            'v': 1,
+            'teams': [team, opponent],
+            'games': matchup.get('games', 0) if matchup else 0,
+            'last_game': to_epoch(matchup.get('last_game_date')) if matchup else None,
+            'records': {team: team_record(matchup, team), opponent: team_record(matchup, opponent)}
+        })
+    except Exception as e:
+        logger.error(f"Error in api_matchup route: {e}")
+        return api_error("An error occurred while fetching the matchup.", 500)
+
 # --------------------- Error Handling ---------------------
 @app.errorhandler(404)
 def page_not_found(e):
@@ -687,4 +1600,7 @@ def internal_server_error(e):
 
 # --------------------- Run the App ---------------------
 if __name__ == '__main__':
+    ensure_indexes()
+    ensure_user_indexes()
+    warm_caches()
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 5000)), debug=False)
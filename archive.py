@@ -0,0 +1,408 @@
+"""
+Hot/cold partitioning of `moneylines` by season.
+
+Games from seasons that have finished (completed or not, once no result can
+still arrive) are moved out of the hot `moneylines` collection into one
+zstd-compressed collection per season (`moneylines_2023`, ...), so the hot
+collection's indexes and working set only cover the current season.
+`archive_catalog` lists the archive collections with the fixed date range each
+can hold.
+
+Readers that may need past seasons import `moneylines`, a RoutedCollection, in
+place of the plain collection. Its find(), count_documents(), distinct() and
+aggregate() look at the filter's event_date bounds and only fan out to the
+archives that range overlaps. Queries with no date bounds (all-time team
+history and stats) read every archive, so reads that only concern the current
+season (upcoming games, validators, pending results) use `moneylines.hot`
+instead. find_one() reads the hot collection, falling back to the archives for
+a game_id lookup. Sorted finds are merged across collections with a streaming
+k-way merge, so results come back in order without being buffered; unsorted
+finds over several tiers are merged in _id order. Writes go to the hot
+collection, except that writers upserting games by game_id (the live ingest
+and backfills) use write_games(), which updates a game already archived in its
+archive instead of inserting a second copy into the hot collection.
+
+    python archive.py --dry-run       # show what would move
+    python archive.py                 # archive finished seasons
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+
+from config import SEASON_START_MONTHS
+from db import get_collection, get_database, close_client
+from normalize import season_of, canonical_sport
+
+logger = logging.getLogger('Archive')
+
+HOT_COLLECTION = 'moneylines'
+ARCHIVE_PREFIX = 'moneylines_'
+catalog_collection = get_collection('archive_catalog')
+
+CATALOG_TTL = 60  # Seconds routers may use a cached catalog
+DEFAULT_START_MONTH = 1
+RESULTS_GRACE = timedelta(days=7)  # Past the scores endpoint's look-back, so no result can still arrive
+
+# --------------------- Catalog ---------------------
+def season_range(season):
+    """
+    The widest date range any sport's season `season` can span; fixed, so a
+    router holding a cached catalog never routes around newly archived games.
+    """
+    months = set(SEASON_START_MONTHS.values()) | {DEFAULT_START_MONTH}
+    return datetime(season, min(months), 1), datetime(season + 1, max(months), 1)
+
+_catalog = {'entries': None, 'loaded_at': 0.0}
+
+def get_catalog(refresh=False):
+    """:return: List of catalog entries ({'_id': collection, 'season', 'start', 'end', 'count'})."""
+    if refresh or _catalog['entries'] is None or time.monotonic() - _catalog['loaded_at'] > CATALOG_TTL:
+        _catalog['entries'] = list(catalog_collection.find().sort('season', pymongo.DESCENDING))
+        _catalog['loaded_at'] = time.monotonic()
+    return _catalog['entries']
+
+def date_bounds(query):
+    """
+    Lower and upper event_date bounds a filter implies, from top-level
+    conditions and $and clauses; None where unbounded.
+    """
+    start = end = None
+    clauses = [query or {}]
+    while clauses:
+        clause = clauses.pop()
+        clauses.extend(item for item in clause.get('$and', []) if isinstance(item, dict))
+        condition = clause.get('event_date')
+        if isinstance(condition, datetime):
+            condition = {'$gte': condition, '$lte': condition}
+        if not isinstance(condition, dict):
+            continue
+        for operator in ('$gte', '$gt'):
+            if isinstance(condition.get(operator), datetime):
+                start = naive_utc(condition[operator]) if start is None else max(start, naive_utc(condition[operator]))
+        for operator in ('$lte', '$lt'):
+            if isinstance(condition.get(operator), datetime):
+                end = naive_utc(condition[operator]) if end is None else min(end, naive_utc(condition[operator]))
+    return start, end
+
+def naive_utc(value):
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def archives_for(query):
+    """Names of the archive collections a filter's date range overlaps, newest first."""
+    start, end = date_bounds(query)
+    return [
+        entry['_id'] for entry in get_catalog()
+        if (start is None or entry['end'] > start) and (end is None or entry['start'] <= end)
+    ]
+
+# --------------------- Merging ---------------------
+class Descending:
+    """Inverts comparisons so heapq.merge can merge descending streams."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+def field_value(document, path):
+    for part in path.split('.'):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+def sort_key(sort):
+    """Builds a merge key matching a MongoDB sort spec; missing values sort first."""
+    def key(document):
+        parts = []
+        for field, direction in sort:
+            value = field_value(document, field)
+            value = (0, 0) if value is None else (1, value)
+            parts.append(value if direction == pymongo.ASCENDING else Descending(value))
+        return tuple(parts)
+    return key
+
+def merge_sorted(streams, sort):
+    """
+    Lazily k-way merges cursors already sorted by `sort`, dropping documents
+    seen twice (a game is briefly in both tiers while it is being archived).
+    Both copies have the same sort key, so only the _ids within the current
+    run of equal keys are remembered.
+    """
+    if len(streams) == 1:
+        yield from streams[0]
+        return
+    key = sort_key(sort or [('_id', pymongo.ASCENDING)])
+    run_key, seen = None, set()
+    for document in heapq.merge(*streams, key=key):
+        document_key = key(document)
+        if run_key is None or not document_key == run_key:
+            run_key, seen = document_key, set()
+        document_id = document.get('_id')
+        if document_id is not None:
+            if document_id in seen:
+                continue
+            seen.add(document_id)
+        yield document
+
+# --------------------- Router ---------------------
+class RoutedCursor:
+    """The subset of pymongo's Cursor the app uses, across the routed collections."""
+
+    def __init__(self, routed, query, projection):
+        self.routed = routed
+        self.query = query or {}
+        self.projection = projection
+        self._sort = []
+        self._limit = 0
+        self._batch_size = 0
+
+    def sort(self, key_or_list, direction=None):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or pymongo.ASCENDING)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size):
+        self._batch_size = batch_size
+        return self
+
+    def projection_with_sort_fields(self):
+        # An inclusion projection must still return the fields the merge compares
+        if not self.projection or not any(self.projection.values()):
+            return self.projection
+        return dict(self.projection, **{field: 1 for field, _ in self._sort})
+
+    def __iter__(self):
+        streams = []
+        collections = self.routed.collections_for(self.query)
+        # Unsorted reads over several tiers are merged by _id so duplicates meet
+        sort = self._sort or ([('_id', pymongo.ASCENDING)] if len(collections) > 1 else [])
+        for collection in collections:
+            cursor = collection.find(self.query, self.projection_with_sort_fields())
+            if sort:
+                cursor = cursor.sort(sort)
+            if self._limit:
+                cursor = cursor.limit(self._limit)  # Each tier's top N is enough for the merged top N
+            if self._batch_size:
+                cursor = cursor.batch_size(self._batch_size)
+            streams.append(cursor)
+        merged = merge_sorted(streams, sort)
+        return itertools.islice(merged, self._limit) if self._limit else merged
+
+class RoutedCollection:
+    """
+    Stands in for the hot collection in read paths; see the module docstring.
+    Anything it doesn't route (writes, indexes) goes to the hot collection.
+    """
+
+    def __init__(self, collection_name=HOT_COLLECTION):
+        self.hot = get_collection(collection_name)
+
+    def collections_for(self, query):
+        database = get_database()
+        return [self.hot] + [database[name] for name in archives_for(query)]
+
+    def find(self, filter=None, projection=None):
+        return RoutedCursor(self, filter, projection)
+
+    def find_one(self, filter=None, *args, **kwargs):
+        """
+        Reads the hot collection, and for a game_id lookup that misses there,
+        the archives its dates allow, newest first.
+        """
+        document = self.hot.find_one(filter, *args, **kwargs)
+        if document is not None or 'game_id' not in (filter or {}):
+            return document
+        database = get_database()
+        for name in archives_for(filter):
+            document = database[name].find_one(filter, *args, **kwargs)
+            if document is not None:
+                return document
+        return None
+
+    def count_documents(self, filter):
+        return sum(collection.count_documents(filter) for collection in self.collections_for(filter))
+
+    def distinct(self, key, filter=None):
+        values = []
+        for collection in self.collections_for(filter):
+            values.extend(value for value in collection.distinct(key, filter) if value not in values)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        """
+        Runs the pipeline over the hot collection unioned with the archives its
+        leading $match stages need; those stages are also applied inside each union.
+        """
+        leading = list(itertools.takewhile(lambda stage: '$match' in stage, pipeline))
+        query = {'$and': [stage['$match'] for stage in leading]} if leading else {}
+        archives = archives_for(query)
+        if not archives:
+            return self.hot.aggregate(pipeline, **kwargs)
+        unions = [{'$unionWith': {'coll': name, 'pipeline': leading}} for name in archives]
+        return self.hot.aggregate(leading + unions + pipeline[len(leading):], **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.hot, name)
+
+moneylines = RoutedCollection()
+
+# --------------------- Writes ---------------------
+def archived_games(docs):
+    """
+    Finds which of the given game documents already live in an archive, with
+    one game_id lookup per archive their dates overlap.
+    :return: Dict of game_id -> archive collection name.
+    """
+    dates = [naive_utc(doc['event_date']) for doc in docs if isinstance(doc.get('event_date'), datetime)]
+    game_ids = [doc['game_id'] for doc in docs if doc.get('game_id')]
+    if not dates or not game_ids:
+        return {}
+    database = get_database()
+    located = {}
+    for name in archives_for({'event_date': {'$gte': min(dates), '$lte': max(dates)}}):
+        for game in database[name].find({'game_id': {'$in': game_ids}}, {'game_id': 1}):
+            located[game['game_id']] = name
+    return located
+
+def write_games(docs, operation, hot=None):
+    """
+    Writes game documents keyed by game_id to the tier that holds each game:
+    archived games in their archive, everything else in the hot collection.
+    :param operation: Builds one document's write (an upsert by game_id).
+    :param hot: The hot collection; defaults to `moneylines`.
+    :return: (inserted, modified) counts.
+    """
+    hot = hot if hot is not None else get_collection(HOT_COLLECTION)
+    located = archived_games(docs)
+    by_collection = {}
+    for doc in docs:
+        by_collection.setdefault(located.get(doc.get('game_id')), []).append(operation(doc))
+    inserted = modified = 0
+    database = get_database()
+    for name, operations in by_collection.items():
+        result = (hot if name is None else database[name]).bulk_write(operations, ordered=False)
+        inserted += result.upserted_count
+        modified += result.modified_count
+    return inserted, modified
+
+# --------------------- Archiving ---------------------
+def ensure_archive(season):
+    """Creates a season's compressed collection and catalog entry; True if it is new."""
+    name = f"{ARCHIVE_PREFIX}{season}"
+    database = get_database()
+    if catalog_collection.find_one({'_id': name}):
+        return False
+    if name not in database.list_collection_names():
+        try:
+            database.create_collection(name, storageEngine={'wiredTiger': {'configString': 'block_compressor=zstd'}})
+        except pymongo.errors.CollectionInvalid:
+            pass  # Created by a concurrent run
+    archive = database[name]
+    archive.create_index([('event_date', pymongo.ASCENDING)])
+    archive.create_index([('game_id', pymongo.ASCENDING)])
+    archive.create_index([('sport', pymongo.ASCENDING), ('event_date', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)])
+    archive.create_index([('teams.home.name', pymongo.ASCENDING), ('event_date', pymongo.DESCENDING), ('_id', pymongo.DESCENDING)])
+    archive.create_index([('teams.away.name', pymongo.ASCENDING), ('event_date', pymongo.DESCENDING), ('_id', pymongo.DESCENDING)])
+    start, end = season_range(season)
+    catalog_collection.update_one(
+        {'_id': name},
+        {'$setOnInsert': {'season': season, 'start': start, 'end': end, 'count': 0, 'created': datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return True
+
+def archivable_query(sport, now):
+    """
+    Every game of a sport from before its current season started, whatever its
+    status ('Completed', 'No Result' or never resolved), once its result could
+    no longer arrive.
+    """
+    current_season = season_of(sport, now)
+    cutoff = datetime(current_season, SEASON_START_MONTHS.get(canonical_sport(sport), DEFAULT_START_MONTH), 1)
+    return {'sport': sport, 'event_date': {'$lt': min(cutoff, now - RESULTS_GRACE)}}
+
+def archive_seasons(batch_size=1000, throttle_ms=50, dry_run=False):
+    """
+    Moves the games of finished seasons into their season archives.
+    Each batch is copied (idempotent upserts) before it is deleted from the
+    hot collection, so an interrupted run can simply be rerun.
+    :return: Number of games moved (or that would be, for a dry run).
+    """
+    hot = get_collection(HOT_COLLECTION)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    queries = [archivable_query(sport, now) for sport in hot.distinct('sport') if sport]
+
+    if dry_run:
+        total = 0
+        for query in queries:
+            count = hot.count_documents(query)
+            logger.info(f"Would archive {count} {query['sport']} games before {query['event_date']['$lt']:%Y-%m-%d}")
+            total += count
+        return total
+
+    # Register every season first and let routers pick the new ones up before
+    # games start disappearing from the hot collection
+    seasons = {
+        season_of(game['sport'], game['event_date'])
+        for query in queries
+        for game in hot.find(query, {'sport': 1, 'event_date': 1})
+    }
+    if any([ensure_archive(season) for season in sorted(seasons)]):
+        logger.info(f"Registered new archives; waiting {CATALOG_TTL}s for routers to see them")
+        time.sleep(CATALOG_TTL + 1)
+
+    moved = 0
+    database = get_database()
+    for query in queries:
+        while True:
+            batch = list(hot.find(query).sort('_id', pymongo.ASCENDING).limit(batch_size))
+            if not batch:
+                break
+            by_season = {}
+            for game in batch:
+                by_season.setdefault(season_of(game['sport'], game['event_date']), []).append(game)
+            for season, games in by_season.items():
+                name = f"{ARCHIVE_PREFIX}{season}"
+                result = database[name].bulk_write(
+                    [pymongo.ReplaceOne({'_id': game['_id']}, game, upsert=True) for game in games], ordered=False
+                )
+                catalog_collection.update_one({'_id': name}, {'$inc': {'count': result.upserted_count}})
+            hot.delete_many({'_id': {'$in': [game['_id'] for game in batch]}})
+            moved += len(batch)
+            logger.info(f"Archived {moved} games")
+            time.sleep(throttle_ms / 1000)
+    get_catalog(refresh=True)
+    return moved
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive the games of finished seasons")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would move without moving it")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--throttle-ms', type=int, default=50, help="Pause between batches")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        archive_seasons(batch_size=args.batch_size, throttle_ms=args.throttle_ms, dry_run=args.dry_run)
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Streams historical odds and results into the moneylines collection.
+
+    python backfill_history.py history/nba_2019.ndjson history/nfl_2019.csv
+    python backfill_history.py --historical basketball_nba --from 2021-10-01 --to 2022-04-30
+
+Files are read line by line, normalized through the same validation as
+fetch_moneylines.process_and_store_odds, and written as unordered bulk upserts
+(to the season archive for games that have already been archived).
+Progress is checkpointed after every batch, so rerunning the same command
+resumes where an interrupted run stopped.
+
+Accepted records:
+- NDJSON lines shaped like Odds API events (`id`, `sport_key`, `commence_time`,
+  `home_team`, `away_team`, `bookmakers`), optionally with `completed` and a
+  /scores-style `scores` list.
+- CSV rows (or flat NDJSON objects) with columns game_id, sport_key,
+  commence_time, home_team, away_team, home_moneyline, away_moneyline and
+  optionally home_score, away_score. CSV fields must not contain newlines.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone, timedelta
+
+import pymongo
+import requests
+
+from config import (
+    ODDS_API_KEY,
+    API_BASE_URL,
+    SPORTS,
+    REGION,
+    MARKET,
+    ODDS_FORMAT,
+    DATE_FORMAT,
+    INGEST_BATCH_SIZE
+)
+from db import get_collection, close_client
+from fetch_moneylines import build_moneyline_doc
+from archive import write_games
+from quota_planner import MAX_DAYS_FROM, reset_season_calendars
+
+# --------------------- Logging Configuration ---------------------
+logger = logging.getLogger('BackfillHistory')
+logger.setLevel(logging.INFO)
+
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+ch.setFormatter(formatter)
+
+logger.addHandler(ch)
+
+# --------------------- MongoDB Setup ---------------------
+moneylines_collection = get_collection('moneylines')
+checkpoints_collection = get_collection('backfill_checkpoints')
+
+HISTORICAL_BASE_URL = API_BASE_URL.replace('/v4/sports/', '/v4/historical/sports/')
+CSV_FIELDS = ['game_id', 'sport_key', 'commence_time', 'home_team', 'away_team',
+              'home_moneyline', 'away_moneyline', 'home_score', 'away_score']
+
+# --------------------- Checkpoints ---------------------
+def load_checkpoint(source_id):
+    return checkpoints_collection.find_one({'_id': source_id}) or {
+        '_id': source_id, 'offset': 0, 'records': 0, 'written': 0, 'skipped': 0, 'completed': False
+    }
+
+def save_checkpoint(checkpoint):
+    checkpoint['updated_at'] = datetime.now(timezone.utc)
+    checkpoints_collection.replace_one({'_id': checkpoint['_id']}, checkpoint, upsert=True)
+
+# --------------------- Record Sources ---------------------
+def read_lines(path, offset):
+    """
+    Yields (offset after line, raw line) from a byte offset. Only one line is
+    held at a time, so memory stays flat regardless of file size.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            offset += len(raw)
+            yield offset, raw
+
+def read_ndjson(path, offset):
+    for line_end, raw in read_lines(path, offset):
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            yield line_end, json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed JSON line ending at byte {line_end}: {e}")
+            yield line_end, None
+
+def read_csv(path, offset):
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+    fieldnames = next(csv.reader(io.StringIO(header_line.decode('utf-8-sig'))))
+    if offset == 0:
+        offset = len(header_line)
+
+    for line_end, raw in read_lines(path, offset):
+        text = raw.decode('utf-8').strip()
+        if not text:
+            continue
+        values = next(csv.reader(io.StringIO(text)))
+        yield line_end, dict(zip(fieldnames, values))
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+def fetch_historical_snapshots(sport_key, start, end, step_hours, resume_epoch=0):
+    """
+    Walks The Odds API historical odds snapshots from start to end.
+    Yields (snapshot epoch, event) so the checkpoint can record the last
+    completed snapshot.
+    """
+    # Re-fetch the checkpointed snapshot itself: it may have been only partly written
+    snapshot = datetime.fromtimestamp(resume_epoch, tz=timezone.utc) if resume_epoch else start
+    while snapshot <= end:
+        params = {
+            'apiKey': ODDS_API_KEY,
+            'regions': REGION,
+            'markets': MARKET,
+            'oddsFormat': ODDS_FORMAT,
+            'dateFormat': DATE_FORMAT,
+            'date': snapshot.strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+        response = requests.get(f"{HISTORICAL_BASE_URL}{sport_key}/odds", params=params)
+        response.raise_for_status()
+        events = response.json().get('data', [])
+        logger.info(f"Fetched {len(events)} historical events for {sport_key} at {params['date']}")
+
+        epoch = int(snapshot.timestamp())
+        for event in events:
+            yield epoch, event
+        # An empty snapshot still needs to advance the checkpoint
+        yield epoch, None
+        snapshot += timedelta(hours=step_hours)
+
+# --------------------- Normalization ---------------------
+def flat_to_event(record):
+    """Turns a flat CSV/NDJSON record into an Odds API-shaped event."""
+    prices = {}
+    for side in ('home', 'away'):
+        raw_price = record.get(f'{side}_moneyline')
+        prices[side] = int(float(raw_price)) if raw_price not in (None, '') else None
+    return {
+        'id': record.get('game_id'),
+        'sport_key': record.get('sport_key'),
+        'commence_time': record.get('commence_time'),
+        'home_team': record.get('home_team'),
+        'away_team': record.get('away_team'),
+        'bookmakers': [{
+            'key': 'draftkings',
+            'markets': [{
+                'key': 'h2h',
+                'outcomes': [
+                    {'name': record.get('home_team'), 'price': prices['home']},
+                    {'name': record.get('away_team'), 'price': prices['away']},
+                ] if None not in prices.values() else []
+            }]
+        }],
+        'home_score': record.get('home_score'),
+        'away_score': record.get('away_score'),
+    }
+
+def extract_scores(event, home_team, away_team):
+    """Returns (home_score, away_score) as ints, or (None, None) if the game has no final score."""
+    home_score = event.get('home_score')
+    away_score = event.get('away_score')
+    if event.get('scores'):
+        home_score = next((s.get('score') for s in event['scores'] if s.get('name') == home_team), None)
+        away_score = next((s.get('score') for s in event['scores'] if s.get('name') == away_team), None)
+    if home_score in (None, '') or away_score in (None, ''):
+        return None, None
+    return int(home_score), int(away_score)
+
+def normalize_record(record, default_sport_key, current_time):
+    """
+    Validates and normalizes one record into a moneylines document.
+    :return: The document, or None if the record is unusable.
+    """
+    if not record:
+        return None
+    try:
+        event = record if 'bookmakers' in record else flat_to_event(record)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Skipping record {record.get('game_id', 'Unknown')} with invalid moneylines: {e}")
+        return None
+
+    sport_key = event.get('sport_key') or default_sport_key
+    if sport_key not in SPORTS:
+        logger.warning(f"Skipping event {event.get('id', 'Unknown')} with unknown sport {sport_key}")
+        return None
+
+    doc = build_moneyline_doc(event, sport_key, current_time)
+    if doc is None:
+        return None
+
+    if event.get('completed', True):
+        try:
+            home_team, away_team = doc['teams']['home']['name'], doc['teams']['away']['name']
+            home_score, away_score = extract_scores(event, home_team, away_team)
+        except (TypeError, ValueError):
+            home_score = away_score = None
+        if home_score is not None and home_score != away_score:
+            doc['result'] = {
+                'home_score': home_score,
+                'away_score': away_score,
+                'winner': home_team if home_score > away_score else away_team
+            }
+            doc['status'] = 'Completed'
+    if doc['status'] != 'Completed' and doc['event_date'] < current_time - timedelta(days=MAX_DAYS_FROM):
+        # Past the scores endpoint's reach, so no result will ever arrive; don't
+        # leave it for update_game_results to look for on every run
+        doc['status'] = 'No Result'
+    return doc
+
+# --------------------- Pipeline ---------------------
+def upsert_operation(doc, overwrite):
+    # By default never touch games the live pipeline already wrote
+    update = {'$set': doc} if overwrite else {'$setOnInsert': doc}
+    return pymongo.UpdateOne({'game_id': doc['game_id']}, update, upsert=True)
+
+def run_pipeline(source_id, records, default_sport_key=None, batch_size=INGEST_BATCH_SIZE, overwrite=False):
+    """
+    Drains a (position, record) generator into MongoDB in batches, saving the
+    position of the last record of each written batch as the checkpoint.
+    :return: The final checkpoint.
+    """
+    checkpoint = load_checkpoint(source_id)
+    current_time = datetime.now(timezone.utc)
+    batch = []
+    position = checkpoint['offset']
+    started = time.monotonic()
+
+    def flush():
+        if batch:
+            # Games of archived seasons are updated in their archive, not duplicated here
+            inserted, modified = write_games(batch, lambda doc: upsert_operation(doc, overwrite), moneylines_collection)
+            checkpoint['written'] += inserted + modified
+            batch.clear()
+        checkpoint['offset'] = position
+        save_checkpoint(checkpoint)
+
+    for position, record in records:
+        if record is None:
+            continue
+        checkpoint['records'] += 1
+        doc = normalize_record(record, default_sport_key, current_time)
+        if doc is None:
+            checkpoint['skipped'] += 1
+            continue
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+            rate = checkpoint['records'] / max(time.monotonic() - started, 1e-9)
+            logger.info(f"{source_id}: {checkpoint['records']} records, {checkpoint['written']} written ({rate:.0f}/s)")
+
+    flush()
+    checkpoint['completed'] = True
+    save_checkpoint(checkpoint)
+    logger.info(f"{source_id}: done - {checkpoint['records']} records, "
+                f"{checkpoint['written']} written, {checkpoint['skipped']} skipped")
+    return checkpoint
+
+def backfill_file(path, file_format=None, default_sport_key=None, batch_size=INGEST_BATCH_SIZE,
+                  overwrite=False, restart=False):
+    source_id = f"file:{os.path.abspath(path)}"
+    if restart:
+        checkpoints_collection.delete_one({'_id': source_id})
+    checkpoint = load_checkpoint(source_id)
+    if checkpoint['completed']:
+        logger.info(f"{source_id} was already imported; pass --restart to import it again.")
+        return checkpoint
+    if checkpoint['offset']:
+        logger.info(f"Resuming {source_id} at byte {checkpoint['offset']}")
+
+    reader = read_csv if (file_format or detect_format(path)) == 'csv' else read_ndjson
+    return run_pipeline(source_id, reader(path, checkpoint['offset']), default_sport_key, batch_size, overwrite)
+
+def backfill_historical(sport_key, start, end, step_hours=24, batch_size=INGEST_BATCH_SIZE,
+                        overwrite=False, restart=False):
+    source_id = f"historical:{sport_key}:{start.date()}:{end.date()}:{step_hours}"
+    if restart:
+        checkpoints_collection.delete_one({'_id': source_id})
+    checkpoint = load_checkpoint(source_id)
+    if checkpoint['completed']:
+        logger.info(f"{source_id} was already imported; pass --restart to import it again.")
+        return checkpoint
+
+    snapshots = fetch_historical_snapshots(sport_key, start, end, step_hours, checkpoint['offset'])
+    return run_pipeline(source_id, snapshots, sport_key, batch_size, overwrite)
+
+# --------------------- Main Execution Flow ---------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill historical odds and results")
+    parser.add_argument('files', nargs='*', help="NDJSON or CSV files to import")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], help="Override format detection by extension")
+    parser.add_argument('--sport', choices=list(SPORTS), help="Sport key for records that don't carry one")
+    parser.add_argument('--historical', choices=list(SPORTS), help="Replay Odds API historical snapshots for a sport")
+    parser.add_argument('--from', dest='start', help="Historical start date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end', help="Historical end date (YYYY-MM-DD)")
+    parser.add_argument('--step-hours', type=int, default=24)
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument('--overwrite', action='store_true', help="Replace games that already exist")
+    parser.add_argument('--restart', action='store_true', help="Ignore saved checkpoints")
+    args = parser.parse_args(argv)
+
+    try:
+        for path in args.files:
+            backfill_file(path, args.format, args.sport, args.batch_size, args.overwrite, args.restart)
+
+        if args.historical:
+            if not (args.start and args.end):
+                parser.error("--historical needs --from and --to")
+            start = datetime.strptime(args.start, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            end = datetime.strptime(args.end, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            backfill_historical(args.historical, start, end, args.step_hours,
+                                args.batch_size, args.overwrite, args.restart)
+
+        if args.files or args.historical:
+            # Past games were added behind the quota planner's stored calendars
+            reset_season_calendars()
+    finally:
+        close_client()
+        logger.info("MongoDB connection closed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for PickRecorder's hot paths against synthetic seasons,
+backed by a local mongod or mongomock. See `python -m benchmarks --help`.
+"""
@@ -0,0 +1,99 @@
+"""
+Runs the hot-path benchmarks offline and optionally gates on a stored baseline.
+
+    python -m benchmarks --seasons 2 --save benchmarks/baseline.json
+    python -m benchmarks --seasons 2 --compare benchmarks/baseline.json
+    python -m benchmarks --mongo-uri mongodb://localhost:27017 --cases fetch_games
+"""
+import argparse
+import json
+import logging
+import sys
+
+from benchmarks.loader import connect, load_seasons
+from benchmarks.metrics import measure
+
+logger = logging.getLogger('Benchmarks')
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a message per regression against the baseline.
+    Latency and peak memory may grow by `tolerance` (a fraction); round trips
+    are deterministic for a given dataset, so any increase is a regression.
+    """
+    regressions = []
+    for result in results:
+        expected = baseline.get(result['name'])
+        if not expected:
+            continue
+        if result['median_ms'] > expected['median_ms'] * (1 + tolerance):
+            regressions.append(f"{result['name']}: median {result['median_ms']}ms > baseline {expected['median_ms']}ms")
+        if result['round_trips'] > expected['round_trips']:
+            regressions.append(f"{result['name']}: {result['round_trips']} round trips > baseline {expected['round_trips']}")
+        if result['peak_kib'] > expected['peak_kib'] * (1 + tolerance):
+            regressions.append(f"{result['name']}: peak {result['peak_kib']}KiB > baseline {expected['peak_kib']}KiB")
+    return regressions
+
+def print_table(results):
+    header = f"{'case':<24}{'median ms':>12}{'p95 ms':>10}{'min ms':>10}{'trips':>8}{'peak KiB':>11}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['name']:<24}{r['median_ms']:>12.2f}{r['p95_ms']:>10.2f}{r['min_ms']:>10.2f}{r['round_trips']:>8}{r['peak_kib']:>11.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PickRecorder hot-path benchmarks")
+    parser.add_argument('--seasons', type=int, default=1, help="Synthetic seasons per sport")
+    parser.add_argument('--scale', type=float, default=0.25, help="Fraction of a full schedule per season")
+    parser.add_argument('--sports', nargs='*', help="Odds API sport keys (default: all six)")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--mongo-uri', help="Local mongod to use instead of mongomock")
+    parser.add_argument('--allow-remote', action='store_true', help="Permit a non-local --mongo-uri")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--cases', nargs='*', help="Only run these cases")
+    parser.add_argument('--save', help="Write results to this baseline file")
+    parser.add_argument('--compare', help="Fail if results regress against this baseline file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed latency/memory growth (fraction)")
+    parser.add_argument('--app-logging', action='store_true', help="Keep the app's INFO logging enabled")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    client = connect(args.mongo_uri, allow_remote=args.allow_remote)
+    load_seasons(client, seasons=args.seasons, sports=args.sports, scale=args.scale, seed=args.seed)
+
+    from benchmarks.cases import BenchmarkContext
+    context = BenchmarkContext(seasons=args.seasons, sports=args.sports, scale=args.scale, seed=args.seed)
+    context.app.ensure_indexes()
+
+    if not args.app_logging:
+        # The hot paths log per game at INFO; keep the output readable
+        logging.disable(logging.INFO)
+
+    results = []
+    for name, func, setup in context.cases():
+        if args.cases and name not in args.cases:
+            continue
+        results.append(measure(name, func, setup=setup, rounds=args.rounds))
+
+    logging.disable(logging.NOTSET)
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({r['name']: r for r in results}, f, indent=2, sort_keys=True)
+        logger.info(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            logger.error(f"Regression: {message}")
+        if regressions:
+            return 1
+        logger.info("No regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from benchmarks.synthetic import SPORT_PROFILES, generate_games, to_odds_event, to_score_event
+
+UPDATE_BATCH = 200    # Completed games re-opened before each update_game_status round
+INGEST_EVENTS = 500   # Odds events fed to each process_and_store_odds round
+
+class BenchmarkContext:
+    """
+    Everything the cases need, derived once from the loaded synthetic data:
+    the busiest slate, the team with the longest history, and API payloads for
+    the ingest paths.
+    """
+
+    def __init__(self, seasons=1, sports=None, scale=0.25, seed=1234, timezone='America/New_York'):
+        # Imported late so loader.configure_environment() runs first
+        import app
+        import fetch_moneylines
+        import update_game_results
+
+        self.app = app
+        self.fetch_moneylines = fetch_moneylines
+        self.update_game_results = update_game_results
+        self.timezone = timezone
+
+        games = list(generate_games(seasons=seasons, sports=sports, scale=scale, seed=seed))
+        nba_days = Counter(game['event_date'].date() for game in games if game['sport'] == 'NBA')
+        self.slate_sport = 'NBA' if nba_days else games[0]['sport']
+        busiest_day = (nba_days or Counter(game['event_date'].date() for game in games)).most_common(1)[0][0]
+        self.slate_date = app.pytz.timezone(timezone).localize(
+            app.datetime.combine(busiest_day, app.datetime.min.time()) + timedelta(hours=12)
+        )
+
+        appearances = Counter()
+        for game in games:
+            appearances[game['home_team']] += 1
+            appearances[game['away_team']] += 1
+        self.team = appearances.most_common(1)[0][0]
+
+        completed = [game for game in games if game['completed']]
+        self.reopened = completed[-UPDATE_BATCH:]
+        self.scores_by_sport = defaultdict(list)
+        for game in self.reopened:
+            self.scores_by_sport[game['sport_key']].append(to_score_event(game))
+
+        self.ingest_sport = 'basketball_nba' if 'basketball_nba' in (sports or SPORT_PROFILES) else games[0]['sport_key']
+        self.odds_events = [
+            to_odds_event(game) for game in games if game['sport_key'] == self.ingest_sport
+        ][-INGEST_EVENTS:]
+
+    # --------------------- Cases ---------------------
+    def fetch_games(self):
+        with self.app.app.test_request_context():
+            return self.app.fetch_games(self.slate_date, timezone=self.timezone, sports=[self.slate_sport])
+
+    def fetch_team_games(self):
+        with self.app.app.test_request_context():
+            return self.app.fetch_team_games(self.team)
+
+    def calculate_win_stats(self):
+        return self.app.calculate_win_stats(self.team)
+
+    def get_unique_teams(self):
+        return self.app.get_unique_teams()
+
+    def reopen_games(self):
+        """Puts the reopened batch back to a pending state before each round."""
+        self.app.moneylines_collection.update_many(
+            {'game_id': {'$in': [game['game_id'] for game in self.reopened]}},
+            {'$set': {'status': 'In Progress', 'result.winner': None,
+                      'result.home_score': None, 'result.away_score': None}}
+        )
+
+    def update_game_status(self):
+        # Scores come from the synthetic season instead of the live API, for
+        # every sport with reopened games however old they are
+        planner = self.update_game_results.quota_planner
+        original_fetch, original_plan = self.update_game_results.fetch_scores, planner.plan_calls
+        self.update_game_results.fetch_scores = lambda sport='basketball_nba', days_from=3: self.scores_by_sport.get(sport, [])
+        planner.plan_calls = lambda kind, now=None, log=None: {'calls': [
+            {'sport_key': sport_key, 'params': {'daysFrom': 3}} for sport_key in self.scores_by_sport
+        ]}
+        try:
+            return self.update_game_results.update_game_status()
+        finally:
+            self.update_game_results.fetch_scores = original_fetch
+            planner.plan_calls = original_plan
+
+    def process_and_store_odds(self):
+        return self.fetch_moneylines.process_and_store_odds(self.odds_events, self.ingest_sport)
+
+    # Pages assembled from game card fragments, cold (setup empties the
+    # fragment cache) and warm; the difference is the rendering saved per hit
+    def render(self, template, games, **context):
+        with self.app.app.test_request_context():
+            return self.app.render_template(
+                template, games=games, timezone=self.timezone, data_version=self.data_version, **context
+            )
+
+    def prepare_renders(self):
+        if not hasattr(self, 'slate_games'):
+            self.slate_games, _ = self.fetch_games()
+            self.team_games, _ = self.fetch_team_games()
+            self.data_version = self.app.get_last_updated()
+
+    def render_slate(self):
+        return self.render('today.html', self.slate_games, page_title="Today's Games", selected_sports=[self.slate_sport])
+
+    def render_team_history(self):
+        return self.render('team_stats.html', self.team_games, selected_team=self.team, teams=[self.team],
+                           form=None, **self.calculate_win_stats())
+
+    def clear_fragments(self):
+        self.prepare_renders()
+        self.app.fragment_cache.clear()
+
+    def cases(self):
+        """Returns (name, func, setup) for every benchmark case."""
+        return [
+            ('fetch_games', self.fetch_games, None),
+            ('fetch_team_games', self.fetch_team_games, None),
+            ('calculate_win_stats', self.calculate_win_stats, None),
+            ('get_unique_teams', self.get_unique_teams, None),
+            ('update_game_status', self.update_game_status, self.reopen_games),
+            ('process_and_store_odds', self.process_and_store_odds, None),
+            ('render_slate', self.render_slate, self.clear_fragments),
+            ('render_slate_cached', self.render_slate, self.prepare_renders),
+            ('render_team_history', self.render_team_history, self.clear_fragments),
+            ('render_team_history_cached', self.render_team_history, self.prepare_renders),
+        ]
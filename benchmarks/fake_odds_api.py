@@ -0,0 +1,251 @@
+"""
+Local stand-in for The Odds API's /v4/sports/<key>/odds and /scores endpoints.
+
+    # Synthetic slates, 2000 events per sport, 50ms latency, a 429 every 10th call
+    python -m benchmarks.fake_odds_api --events 2000 --latency-ms 50 --throttle-every 10
+
+    # Capture real responses to fixtures (spends real quota), then replay them offline
+    python -m benchmarks.fake_odds_api --record benchmarks/fixtures
+    python -m benchmarks.fake_odds_api --replay benchmarks/fixtures
+
+Point the ingest scripts at it with ODDS_API_BASE_URL=http://127.0.0.1:8765/v4/sports/
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+from benchmarks.synthetic import SPORT_PROFILES, generate_slate, to_odds_event, to_score_event
+
+UPSTREAM_URL = 'https://api.the-odds-api.com/v4/sports/'
+PATH_PATTERN = re.compile(r'^/v4/sports/(?P<sport>[a-z_]+)/(?P<endpoint>odds|scores)/?$')
+
+logger = logging.getLogger('FakeOddsAPI')
+
+# --------------------- Malformed Events ---------------------
+def _missing_id(event):
+    event.pop('id', None)
+
+def _bad_commence_time(event):
+    event['commence_time'] = 'not-a-date'
+
+def _no_bookmakers(event):
+    event['bookmakers'] = []
+
+def _missing_outcome(event):
+    for bookmaker in event.get('bookmakers', []):
+        for market in bookmaker.get('markets', []):
+            market['outcomes'] = market.get('outcomes', [])[:1]
+
+def _string_price(event):
+    for bookmaker in event.get('bookmakers', []):
+        for market in bookmaker.get('markets', []):
+            for outcome in market.get('outcomes', []):
+                outcome['price'] = 'N/A'
+
+def _null_scores(event):
+    event['completed'] = True
+    event['scores'] = None
+
+ODDS_CORRUPTIONS = (_missing_id, _bad_commence_time, _no_bookmakers, _missing_outcome, _string_price)
+SCORE_CORRUPTIONS = (_missing_id, _null_scores)
+
+# --------------------- Server ---------------------
+class FakeOddsAPI:
+    """
+    Holds the scripted behavior shared by all request handler threads.
+    :param events: Events per sport in each synthetic slate.
+    :param days_back / days_ahead: Window the slate spans around now.
+    :param latency_ms: Delay added to every response.
+    :param throttle_every: Answer every Nth request with 429 (0 disables).
+    :param malformed_rate: Fraction of events corrupted in the ways the ingest code guards against.
+    :param quota: Starting x-requests-remaining; each successful call spends one.
+    :param record_dir / replay_dir: Capture upstream responses to, or serve them from, fixture files.
+    """
+
+    def __init__(self, events=200, days_back=3, days_ahead=7, latency_ms=0, throttle_every=0,
+                 malformed_rate=0.0, quota=500, seed=1234, record_dir=None, replay_dir=None,
+                 upstream=UPSTREAM_URL):
+        self.events = events
+        self.latency_ms = latency_ms
+        self.throttle_every = throttle_every
+        self.malformed_rate = malformed_rate
+        self.quota = quota
+        self.used = 0
+        self.seed = seed
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.upstream = upstream
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+        now = datetime.now(timezone.utc)
+        self.now = now
+        self.start = now - timedelta(days=days_back)
+        self.end = now + timedelta(days=days_ahead)
+        self._slates = {}
+
+    def slate(self, sport_key):
+        with self.lock:
+            if sport_key not in self._slates:
+                self._slates[sport_key] = generate_slate(
+                    sport_key, self.events, self.start, self.end, now=self.now, seed=self.seed
+                )
+            return self._slates[sport_key]
+
+    def next_request(self):
+        """Counts a request and returns whether it should be throttled."""
+        with self.lock:
+            self.request_count += 1
+            return bool(self.throttle_every) and self.request_count % self.throttle_every == 0
+
+    def spend(self):
+        with self.lock:
+            self.used += 1
+            self.quota = max(0, self.quota - 1)
+            return self.quota, self.used
+
+    def fixture_path(self, directory, sport_key, endpoint):
+        return os.path.join(directory, f"{sport_key}_{endpoint}.json")
+
+    def synthetic_body(self, sport_key, endpoint, params):
+        rng = random.Random(f"{self.seed}-{sport_key}-{endpoint}")
+        games = self.slate(sport_key)
+        if endpoint == 'odds':
+            # /odds only lists games that haven't finished
+            events = [to_odds_event(game) for game in games if not game['completed']]
+            corruptions = ODDS_CORRUPTIONS
+        else:
+            days_from = int(params.get('daysFrom', ['3'])[0])
+            cutoff = self.now - timedelta(days=days_from)
+            events = [to_score_event(game) for game in games if game['event_date'] >= cutoff]
+            corruptions = SCORE_CORRUPTIONS
+
+        for event in events:
+            if rng.random() < self.malformed_rate:
+                rng.choice(corruptions)(event)
+        return events
+
+    def recorded_body(self, sport_key, endpoint, query):
+        response = requests.get(f"{self.upstream}{sport_key}/{endpoint}", params=query, timeout=30)
+        response.raise_for_status()
+        body = response.json()
+        os.makedirs(self.record_dir, exist_ok=True)
+        with open(self.fixture_path(self.record_dir, sport_key, endpoint), 'w') as f:
+            json.dump(body, f)
+        logger.info(f"Recorded {len(body)} {endpoint} events for {sport_key}")
+        return body
+
+    def replayed_body(self, sport_key, endpoint):
+        path = self.fixture_path(self.replay_dir, sport_key, endpoint)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+def make_handler(api):
+    class OddsAPIHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def send_json(self, status, body, extra_headers=None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, str(value))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            match = PATH_PATTERN.match(url.path)
+            if not match:
+                return self.send_json(404, {'message': 'Unknown endpoint'})
+            sport_key, endpoint = match.group('sport'), match.group('endpoint')
+            params = parse_qs(url.query)
+
+            if api.latency_ms:
+                time.sleep(api.latency_ms / 1000)
+            if api.next_request():
+                return self.send_json(429, {'message': 'Rate limit exceeded'}, {'Retry-After': 1})
+
+            try:
+                if api.replay_dir:
+                    body = api.replayed_body(sport_key, endpoint)
+                    if body is None:
+                        return self.send_json(404, {'message': f'No fixture for {sport_key} {endpoint}'})
+                elif api.record_dir:
+                    query = {key: values[0] for key, values in params.items()}
+                    body = api.recorded_body(sport_key, endpoint, query)
+                elif sport_key in SPORT_PROFILES:
+                    body = api.synthetic_body(sport_key, endpoint, params)
+                else:
+                    return self.send_json(404, {'message': 'Unknown sport'})
+            except requests.exceptions.RequestException as e:
+                return self.send_json(502, {'message': f'Upstream error: {e}'})
+
+            remaining, used = api.spend()
+            self.send_json(200, body, {'x-requests-remaining': remaining, 'x-requests-used': used})
+
+    return OddsAPIHandler
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """
+    Starts the fake API on a background thread.
+    :return: (server, api, base_url) where base_url is suitable for ODDS_API_BASE_URL.
+    """
+    api = FakeOddsAPI(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/v4/sports/"
+    logger.info(f"Fake Odds API listening on {base_url}")
+    return server, api, base_url
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake of The Odds API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--events', type=int, default=200, help="Events per sport in the synthetic slate")
+    parser.add_argument('--days-back', type=int, default=3)
+    parser.add_argument('--days-ahead', type=int, default=7)
+    parser.add_argument('--latency-ms', type=int, default=0)
+    parser.add_argument('--throttle-every', type=int, default=0, help="Return 429 on every Nth request")
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--quota', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1234)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--record', metavar='DIR', help="Proxy to the real API and save responses here")
+    mode.add_argument('--replay', metavar='DIR', help="Serve previously recorded responses from here")
+    parser.add_argument('--upstream', default=UPSTREAM_URL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    api = FakeOddsAPI(
+        events=args.events, days_back=args.days_back, days_ahead=args.days_ahead,
+        latency_ms=args.latency_ms, throttle_every=args.throttle_every,
+        malformed_rate=args.malformed_rate, quota=args.quota, seed=args.seed,
+        record_dir=args.record, replay_dir=args.replay, upstream=args.upstream
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api))
+    logger.info(f"Fake Odds API listening on http://{args.host}:{args.port}/v4/sports/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
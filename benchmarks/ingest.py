@@ -0,0 +1,114 @@
+"""
+Ingest throughput harness: runs the real fetch_moneylines and
+update_game_results code against the fake Odds API for a sweep of bulk-write
+batch sizes, and reports events/sec and end-to-end run time.
+
+    python -m benchmarks.ingest --events 5000 --batch-sizes 100 500 2000
+    python -m benchmarks.ingest --replay benchmarks/fixtures --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from benchmarks.fake_odds_api import start_server
+from benchmarks.loader import connect, BENCH_DB
+
+logger = logging.getLogger('Benchmarks')
+
+def run_ingest(fetch_moneylines, update_game_results, collection, sports, batch_size):
+    """
+    One full ingest cycle into an empty collection.
+    :return: Dict of timings and counts.
+    """
+    collection.drop()
+    fetched = written = 0
+    fetch_seconds = process_seconds = 0.0
+    started = time.perf_counter()
+
+    for sport_key in sports:
+        t0 = time.perf_counter()
+        odds_data = fetch_moneylines.fetch_moneyline_odds(sport_key)
+        t1 = time.perf_counter()
+        written += fetch_moneylines.process_and_store_odds(odds_data, sport_key, batch_size=batch_size) or 0
+        t2 = time.perf_counter()
+        fetched += len(odds_data)
+        fetch_seconds += t1 - t0
+        process_seconds += t2 - t1
+
+    t3 = time.perf_counter()
+    update_game_results.update_game_status()
+    update_seconds = time.perf_counter() - t3
+    total_seconds = time.perf_counter() - started
+
+    return {
+        'batch_size': batch_size,
+        'events': fetched,
+        'written': written,
+        'fetch_s': fetch_seconds,
+        'process_s': process_seconds,
+        'process_events_per_s': written / process_seconds if process_seconds else 0.0,
+        'update_s': update_seconds,
+        'total_s': total_seconds,
+        'events_per_s': fetched / total_seconds if total_seconds else 0.0,
+    }
+
+def print_table(results):
+    header = (f"{'batch':>7}{'events':>9}{'written':>9}{'fetch s':>9}{'process s':>11}"
+              f"{'write ev/s':>12}{'update s':>10}{'total s':>9}{'ev/s':>10}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['batch_size']:>7}{r['events']:>9}{r['written']:>9}{r['fetch_s']:>9.2f}{r['process_s']:>11.2f}"
+              f"{r['process_events_per_s']:>12.0f}{r['update_s']:>10.2f}{r['total_s']:>9.2f}{r['events_per_s']:>10.0f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest throughput against the fake Odds API")
+    parser.add_argument('--events', type=int, default=1000, help="Events per sport in the synthetic slate")
+    parser.add_argument('--sports', nargs='*', help="Odds API sport keys (default: all configured)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--latency-ms', type=int, default=0)
+    parser.add_argument('--throttle-every', type=int, default=0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--replay', metavar='DIR', help="Serve recorded fixtures instead of synthetic slates")
+    parser.add_argument('--mongo-uri', help="Local mongod to use instead of mongomock")
+    parser.add_argument('--allow-remote', action='store_true')
+    parser.add_argument('--app-logging', action='store_true', help="Keep the scripts' INFO logging enabled")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    server, api, base_url = start_server(
+        events=args.events, latency_ms=args.latency_ms, throttle_every=args.throttle_every,
+        malformed_rate=args.malformed_rate, replay_dir=args.replay, quota=10 ** 9
+    )
+    # Must be set before config.py is imported by the ingest scripts
+    os.environ['ODDS_API_BASE_URL'] = base_url
+    client = connect(args.mongo_uri, allow_remote=args.allow_remote)
+
+    import fetch_moneylines
+    import update_game_results
+    from config import SPORTS
+
+    sports = args.sports or list(SPORTS)
+    collection = client[BENCH_DB]['moneylines']
+
+    if not args.app_logging:
+        # The scripts log every event (and whole API responses) at INFO
+        logging.disable(logging.INFO)
+
+    results = []
+    try:
+        for batch_size in args.batch_sizes:
+            results.append(run_ingest(fetch_moneylines, update_game_results, collection, sports, batch_size))
+    finally:
+        logging.disable(logging.NOTSET)
+        server.shutdown()
+
+    print_table(results)
+    logger.info(f"Fake API served {api.request_count} requests")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from benchmarks.metrics import ROUND_TRIPS
+from benchmarks.synthetic import SPORT_PROFILES, generate_games, generate_slate, to_document
+
+BENCH_DB = 'pickrecorder_bench'
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+logger = logging.getLogger('Benchmarks')
+
+def configure_environment():
+    """
+    Points the app modules at a scratch database before they are imported.
+    config.py insists on API keys being present; benchmarks never call out, so
+    placeholders are fine.
+    """
+    os.environ['MONGO_ODDS_DB'] = BENCH_DB
+    os.environ['MONGO_USERS_DB'] = f"{BENCH_DB}_users"
+    os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017')
+    os.environ.setdefault('ODDS_API_KEY', 'benchmark')
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    # Every fetch should reach the (fake) API rather than the on-disk response cache
+    os.environ['ODDS_CACHE_TTL_ODDS'] = '0'
+    os.environ['ODDS_CACHE_TTL_SCORES'] = '0'
+    # Cases time the queries themselves, not the per-worker data caches
+    os.environ['DATA_CACHE_TTL'] = '0'
+    os.environ['DISK_CACHE_TTL'] = '0'
+    os.environ['INVALIDATION_MODE'] = 'off'
+
+def connect(mongo_uri=None, allow_remote=False):
+    """
+    Installs the benchmark client as the shared client in db.py.
+    :param mongo_uri: A local mongod URI; mongomock is used when omitted.
+    :param allow_remote: Benchmarks drop and reload their database, so anything
+                         other than a local server must be opted into.
+    :return: The installed client.
+    """
+    configure_environment()
+    import db
+
+    if mongo_uri:
+        host = urlparse(mongo_uri).hostname
+        if host not in LOCAL_HOSTS and not allow_remote:
+            raise ValueError(f"Refusing to benchmark against non-local host {host}; pass allow_remote=True.")
+        import pymongo
+        client = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=2000, event_listeners=[ROUND_TRIPS])
+        client.admin.command('ping')
+    else:
+        try:
+            import mongomock
+        except ImportError as e:
+            raise ImportError("mongomock is required when no --mongo-uri is given.") from e
+        client = mongomock.MongoClient()
+        ROUND_TRIPS.instrument_mongomock()
+
+    db.set_client(client)
+    return client
+
+def load_seasons(client, seasons=1, sports=None, scale=0.25, seed=1234, batch_size=1000):
+    """
+    Drops and refills the benchmark moneylines collection with synthetic seasons.
+    :return: Number of documents inserted.
+    """
+    collection = client[BENCH_DB]['moneylines']
+    collection.drop()
+
+    batch = []
+    inserted = 0
+    for game in generate_games(seasons=seasons, sports=sports, scale=scale, seed=seed):
+        batch.append(to_document(game))
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+
+    logger.info(f"Loaded {inserted} synthetic games into {BENCH_DB}.moneylines")
+    return inserted
+
+def load_current_slates(client, events_per_sport=60, days_back=3, days_ahead=7, sports=None, seed=1234):
+    """
+    Adds games around today for every sport, so yesterday/today/tomorrow pages
+    have something to render whatever the calendar says.
+    :return: Number of documents inserted.
+    """
+    collection = client[BENCH_DB]['moneylines']
+    now = datetime.now(timezone.utc)
+    documents = []
+    for sport_key in sports or SPORT_PROFILES:
+        games = generate_slate(sport_key, events_per_sport, now - timedelta(days=days_back),
+                               now + timedelta(days=days_ahead), now=now, seed=seed)
+        documents.extend(to_document(game, last_updated=now) for game in games)
+    if documents:
+        collection.insert_many(documents, ordered=False)
+    logger.info(f"Loaded {len(documents)} current-slate games into {BENCH_DB}.moneylines")
+    return len(documents)
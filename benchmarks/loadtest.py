@@ -0,0 +1,364 @@
+"""
+Open-loop web load test with per-route latency percentiles, built on a small
+stdlib asyncio HTTP/1.1 client.
+
+    # Serve the app in-process against seeded mongomock (or --mongo-uri) and drive it
+    python -m benchmarks.loadtest --serve --rate 50 --duration 30 --users 20
+
+    # Drive an already running deployment
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --rate 100 --duration 60
+
+--revalidate replays each user's last ETag per URL, to measure conditional-request savings.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlparse
+
+from benchmarks.metrics import percentile
+from benchmarks.synthetic import SPORT_PROFILES, team_names
+
+TIMEZONES = ['UTC', 'America/New_York', 'America/Chicago', 'America/Denver',
+             'America/Los_Angeles', 'Europe/London', 'Australia/Sydney']
+SPORT_NAMES = [profile['name'] for profile in SPORT_PROFILES.values()]
+
+# Relative weight of each route in the traffic mix
+ROUTE_WEIGHTS = {
+    'today': 40,
+    'tomorrow': 20,
+    'yesterday': 15,
+    'team_stats': 20,
+    'search': 5,
+}
+
+logger = logging.getLogger('Benchmarks')
+
+# --------------------- Minimal Async HTTP Client ---------------------
+class HTTPError(Exception):
+    pass
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+class HTTPClient:
+    """
+    Keep-alive HTTP/1.1 client with a cookie jar, enough to log in once and
+    then issue GET/POST requests as that user.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self.etags = {}
+        self._idle = []
+
+    async def _connection(self):
+        if self._idle:
+            return self._idle.pop()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        return Connection(reader, writer)
+
+    async def request(self, method, path, body=None, content_type=None, headers=None):
+        """
+        :return: (status, headers dict with lower-cased names, body bytes)
+        """
+        connection = await self._connection()
+        try:
+            status, response_headers, response_body = await asyncio.wait_for(
+                self._exchange(connection, method, path, body, content_type, headers), self.timeout
+            )
+        except BaseException:
+            connection.close()
+            raise
+        if response_headers.get('connection', '').lower() == 'close':
+            connection.close()
+        else:
+            self._idle.append(connection)
+        return status, response_headers, response_body
+
+    async def _exchange(self, connection, method, path, body, content_type, headers):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Accept-Encoding: identity"]
+        if self.cookies:
+            lines.append("Cookie: " + '; '.join(f"{k}={v}" for k, v in self.cookies.items()))
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        payload = body or b''
+        if body is not None:
+            lines.append(f"Content-Type: {content_type}")
+            lines.append(f"Content-Length: {len(payload)}")
+        connection.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        await connection.writer.drain()
+
+        status_line = await connection.reader.readline()
+        if not status_line:
+            raise HTTPError("Connection closed before a response was received")
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await connection.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                cookie_name, _, rest = value.partition('=')
+                self.cookies[cookie_name] = rest.split(';', 1)[0]
+            response_headers[name] = value
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await connection.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await connection.reader.readline()
+                    break
+                chunks.append(await connection.reader.readexactly(size))
+                await connection.reader.readline()
+            response_body = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            response_body = await connection.reader.readexactly(int(response_headers['content-length']))
+        elif status in (204, 304) or method == 'HEAD':
+            response_body = b''
+        else:
+            response_body = await connection.reader.read()
+            response_headers['connection'] = 'close'
+        return status, response_headers, response_body
+
+    async def get(self, path, revalidate=False):
+        headers = {}
+        if revalidate and path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+        status, response_headers, body = await self.request('GET', path, headers=headers)
+        if 'etag' in response_headers:
+            self.etags[path] = response_headers['etag']
+        return status, response_headers, body
+
+    async def post_form(self, path, fields):
+        return await self.request('POST', path, urlencode(fields).encode('utf-8'),
+                                  'application/x-www-form-urlencoded')
+
+    async def post_json(self, path, payload):
+        return await self.request('POST', path, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def close(self):
+        for connection in self._idle:
+            connection.close()
+        self._idle = []
+
+# --------------------- Synthetic Users ---------------------
+class SyntheticUser:
+    def __init__(self, index, base_url, rng, teams):
+        self.username = f"loadtest_user_{index:04d}"
+        self.password = f"loadtest-{index}"
+        self.timezone = rng.choice(TIMEZONES)
+        self.sports = rng.sample(SPORT_NAMES, rng.randint(1, 2))
+        self.teams = teams
+        self.client = HTTPClient(base_url)
+
+    async def login(self):
+        await self.client.post_form('/register', {
+            'username': self.username, 'email': f"{self.username}@example.com", 'password': self.password
+        })
+        status, _, _ = await self.client.post_form('/login', {'username': self.username, 'password': self.password})
+        if status not in (200, 302):
+            raise HTTPError(f"Login failed for {self.username} with status {status}")
+        await self.client.post_json('/set_timezone', {'timezone': self.timezone})
+
+    def path_for(self, route, rng):
+        sports = urlencode([('sports', sport) for sport in self.sports])
+        if route == 'today':
+            return f"/?{sports}"
+        if route == 'tomorrow':
+            return f"/tomorrow?{sports}"
+        if route == 'yesterday':
+            return f"/yesterday?{sports}"
+        if route == 'team_stats':
+            return '/team_stats?' + urlencode({'team': rng.choice(self.teams)})
+        return '/search'
+
+# --------------------- Driver ---------------------
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.latencies = []
+        self.errors = 0
+        self.not_modified = 0
+
+def default_teams(sports=None):
+    teams = []
+    for sport_key in sports or SPORT_PROFILES:
+        teams.extend(team_names(sport_key, SPORT_PROFILES[sport_key]['teams']))
+    return teams
+
+async def run_load(base_url, users=10, rate=20.0, duration=30.0, max_in_flight=100,
+                   revalidate=False, seed=1234, teams=None):
+    """
+    Logs in `users` synthetic users, then starts requests at `rate` per second
+    for `duration` seconds regardless of how fast earlier ones finish (open loop),
+    capped at `max_in_flight` concurrent requests.
+    :return: (stats per route, elapsed seconds, dropped starts)
+    """
+    rng = random.Random(seed)
+    teams = teams or default_teams()
+    pool = [SyntheticUser(index, base_url, rng, teams) for index in range(users)]
+    await asyncio.gather(*(user.login() for user in pool))
+    logger.info(f"Logged in {len(pool)} synthetic users")
+
+    routes = list(ROUTE_WEIGHTS)
+    weights = [ROUTE_WEIGHTS[route] for route in routes]
+    stats = defaultdict(RouteStats)
+    in_flight = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+    dropped = 0
+
+    async def one_request(user, route, path):
+        try:
+            stats[route].requests += 1
+            started = time.perf_counter()
+            try:
+                status, _, _ = await user.client.get(path, revalidate=revalidate)
+            except Exception as e:
+                logger.debug(f"{route} request failed: {e}")
+                stats[route].errors += 1
+                return
+            stats[route].latencies.append((time.perf_counter() - started) * 1000)
+            if status == 304:
+                stats[route].not_modified += 1
+            elif status >= 400:
+                stats[route].errors += 1
+        finally:
+            in_flight.release()
+
+    started = time.perf_counter()
+    interval = 1.0 / rate
+    next_start = started
+    while next_start - started < duration:
+        delay = next_start - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        next_start += interval
+
+        if in_flight.locked():
+            # The system under test can't keep up; count it rather than queueing unboundedly
+            dropped += 1
+            continue
+        await in_flight.acquire()
+        user = rng.choice(pool)
+        route = rng.choices(routes, weights)[0]
+        task = asyncio.create_task(one_request(user, route, user.path_for(route, rng)))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    for user in pool:
+        user.client.close()
+    return stats, elapsed, dropped
+
+def summarize(stats, elapsed):
+    rows = []
+    for route in ROUTE_WEIGHTS:
+        route_stats = stats.get(route)
+        if not route_stats:
+            continue
+        latencies = route_stats.latencies
+        requests_sent = route_stats.requests
+        rows.append({
+            'route': route,
+            'requests': requests_sent,
+            'rps': requests_sent / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 0.50) if latencies else 0.0,
+            'p95_ms': percentile(latencies, 0.95) if latencies else 0.0,
+            'p99_ms': percentile(latencies, 0.99) if latencies else 0.0,
+            'error_rate': route_stats.errors / requests_sent if requests_sent else 0.0,
+            'not_modified': route_stats.not_modified,
+        })
+    return rows
+
+def print_table(rows, elapsed, dropped):
+    header = f"{'route':<12}{'requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}{'304s':>7}"
+    print(header)
+    print('-' * len(header))
+    for r in rows:
+        print(f"{r['route']:<12}{r['requests']:>10}{r['rps']:>9.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['error_rate']:>8.1%}{r['not_modified']:>7}")
+    total = sum(r['requests'] for r in rows)
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} req/s), "
+          f"{dropped} starts dropped at the in-flight cap")
+
+def serve_app(mongo_uri=None, allow_remote=False, seasons=1, scale=0.1, events_per_sport=60):
+    """
+    Seeds a scratch database and serves the app on a background thread.
+    :return: (server, base_url)
+    """
+    from benchmarks.loader import connect, load_seasons, load_current_slates
+    from werkzeug.serving import make_server
+
+    client = connect(mongo_uri, allow_remote=allow_remote)
+    load_seasons(client, seasons=seasons, scale=scale)
+    load_current_slates(client, events_per_sport=events_per_sport)
+
+    import app
+    app.ensure_indexes()
+    app.ensure_user_indexes()
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PickRecorder web load test")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="Base URL of a running app")
+    target.add_argument('--serve', action='store_true', help="Serve the app in-process on seeded data")
+    parser.add_argument('--mongo-uri', help="With --serve: local mongod instead of mongomock")
+    parser.add_argument('--allow-remote', action='store_true')
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--scale', type=float, default=0.1)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=20.0, help="Target requests per second")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds of load")
+    parser.add_argument('--max-in-flight', type=int, default=100)
+    parser.add_argument('--revalidate', action='store_true', help="Send If-None-Match with known ETags")
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    server = None
+    base_url = args.url
+    if args.serve:
+        server, base_url = serve_app(args.mongo_uri, args.allow_remote, args.seasons, args.scale)
+        # Per-request app logging would dominate an in-process run
+        logging.disable(logging.INFO)
+
+    try:
+        stats, elapsed, dropped = asyncio.run(run_load(
+            base_url, users=args.users, rate=args.rate, duration=args.duration,
+            max_in_flight=args.max_in_flight, revalidate=args.revalidate, seed=args.seed
+        ))
+    finally:
+        logging.disable(logging.NOTSET)
+        if server:
+            server.shutdown()
+
+    print_table(summarize(stats, elapsed), elapsed, dropped)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
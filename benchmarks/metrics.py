@@ -0,0 +1,112 @@
+import functools
+import statistics
+import threading
+import time
+import tracemalloc
+
+from pymongo import monitoring
+
+# Collection methods that cost one server round trip each under mongomock
+MONGOMOCK_OPERATIONS = (
+    'find', 'find_one', 'count_documents', 'distinct', 'aggregate',
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'bulk_write',
+    'delete_one', 'delete_many', 'replace_one', 'find_one_and_update',
+)
+
+class RoundTripCounter(monitoring.CommandListener):
+    """
+    Counts MongoDB commands sent by the process.
+    Against a real mongod every command (including getMore batches) is counted
+    through pymongo's command monitoring. mongomock has no wire protocol, so
+    there each collection operation counts as one round trip.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        with self._lock:
+            self._count += 1
+
+    def reset(self):
+        with self._lock:
+            self._count = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    def started(self, event):
+        self.increment()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def instrument_mongomock(self):
+        import mongomock.collection
+
+        for name in MONGOMOCK_OPERATIONS:
+            original = getattr(mongomock.collection.Collection, name)
+            if getattr(original, '_counted', False):
+                continue
+
+            @functools.wraps(original)
+            def counted(collection, *args, _original=original, **kwargs):
+                self.increment()
+                return _original(collection, *args, **kwargs)
+
+            counted._counted = True
+            setattr(mongomock.collection.Collection, name, counted)
+
+ROUND_TRIPS = RoundTripCounter()
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def measure(name, func, setup=None, rounds=5, warmup=1):
+    """
+    Runs a benchmark case and reports latency, round trips and peak memory.
+    Latency rounds run without tracemalloc (it slows allocation-heavy code
+    several-fold); one extra traced round supplies round trips and peak memory.
+
+    :param setup: Called before every round, outside the timed region.
+    :return: Dict of metrics for the case.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    samples = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    if setup:
+        setup()
+    ROUND_TRIPS.reset()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'name': name,
+        'rounds': rounds,
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'round_trips': ROUND_TRIPS.count,
+        'peak_kib': round(peak / 1024, 1),
+    }
@@ -0,0 +1,228 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+# --------------------- Sport Profiles ---------------------
+# teams: league size (college leagues trimmed to a representative slice)
+# games_per_team: regular-season games per team
+# season: (start month, length in days)
+# spread: std-dev of the underlying home win probability around the mean,
+#         i.e. how lopsided typical matchups are
+# home_edge: added to the home team's win probability
+SPORT_PROFILES = {
+    'basketball_nba': {'name': 'NBA', 'teams': 30, 'games_per_team': 82, 'season': (10, 180), 'spread': 0.17, 'home_edge': 0.06},
+    'americanfootball_nfl': {'name': 'NFL', 'teams': 32, 'games_per_team': 17, 'season': (9, 125), 'spread': 0.16, 'home_edge': 0.05},
+    'basketball_ncaab': {'name': 'NCAAB', 'teams': 64, 'games_per_team': 30, 'season': (11, 140), 'spread': 0.20, 'home_edge': 0.08},
+    'americanfootball_ncaaf': {'name': 'NCAAF', 'teams': 64, 'games_per_team': 12, 'season': (8, 130), 'spread': 0.22, 'home_edge': 0.07},
+    'icehockey_nhl': {'name': 'NHL', 'teams': 32, 'games_per_team': 82, 'season': (10, 185), 'spread': 0.09, 'home_edge': 0.04},
+    'baseball_mlb': {'name': 'MLB', 'teams': 30, 'games_per_team': 162, 'season': (3, 185), 'spread': 0.08, 'home_edge': 0.04},
+}
+
+VIG = 0.045  # Total bookmaker overround split across both sides
+
+# --------------------- Odds Math ---------------------
+def probability_to_american(probability):
+    """
+    Converts a (vig-inclusive) implied probability to an American moneyline,
+    rounded to the nearest 5 the way books quote them.
+    """
+    probability = min(max(probability, 0.02), 0.98)
+    if probability >= 0.5:
+        price = -100 * probability / (1 - probability)
+    else:
+        price = 100 * (1 - probability) / probability
+    price = int(5 * round(price / 5))
+    if -100 < price < 100:
+        price = -105 if probability >= 0.5 else 100
+    return price
+
+def quote_moneylines(home_probability, vig=VIG):
+    """Returns (home, away) American prices for a true home win probability."""
+    home_implied = home_probability * (1 + vig)
+    away_implied = (1 - home_probability) * (1 + vig)
+    return probability_to_american(home_implied), probability_to_american(away_implied)
+
+# --------------------- Season Generator ---------------------
+def team_names(sport_key, count):
+    name = SPORT_PROFILES[sport_key]['name']
+    return [f"{name} Team {index:03d}" for index in range(1, count + 1)]
+
+def generate_games(seasons=1, sports=None, scale=1.0, seed=1234, end_year=None, now=None):
+    """
+    Yields synthetic games in chronological order within each sport and season.
+    Each team carries a latent strength, so favorites win at a realistic rate and
+    prices are quoted from the same probabilities the results are drawn from.
+
+    :param seasons: Number of seasons per sport, ending with the season that
+                    starts in end_year.
+    :param sports: Iterable of Odds API sport keys; defaults to all six.
+    :param scale: Fraction of a full schedule to generate (0.1 = 10% of games).
+    :param now: Games after this instant are left Scheduled with no result.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    end_year = end_year or now.year
+    sports = list(sports or SPORT_PROFILES)
+
+    for sport_key in sports:
+        profile = SPORT_PROFILES[sport_key]
+        teams = team_names(sport_key, profile['teams'])
+        start_month, season_days = profile['season']
+        games_per_season = max(1, int(profile['teams'] * profile['games_per_team'] / 2 * scale))
+
+        for season_offset in range(seasons - 1, -1, -1):
+            year = end_year - season_offset
+            season_start = datetime(year, start_month, 1, tzinfo=timezone.utc)
+            strengths = {team: rng.gauss(0, profile['spread']) for team in teams}
+
+            offsets = sorted(rng.uniform(0, season_days) for _ in range(games_per_season))
+            for index, day_offset in enumerate(offsets):
+                home, away = rng.sample(teams, 2)
+                # Evening starts on the hour, in UTC
+                event_date = (season_start + timedelta(days=math.floor(day_offset))).replace(
+                    hour=rng.choice([17, 19, 23, 0, 1, 2])
+                )
+                home_probability = min(max(
+                    0.5 + profile['home_edge'] + strengths[home] - strengths[away], 0.05
+                ), 0.95)
+                home_moneyline, away_moneyline = quote_moneylines(home_probability)
+
+                game = {
+                    'game_id': f"{sport_key}-{year}-{index:05d}",
+                    'sport_key': sport_key,
+                    'sport': profile['name'],
+                    'event_date': event_date,
+                    'home_team': home,
+                    'away_team': away,
+                    'home_moneyline': home_moneyline,
+                    'away_moneyline': away_moneyline,
+                    'completed': event_date < now,
+                    'home_score': None,
+                    'away_score': None,
+                    'winner': None,
+                }
+                if game['completed']:
+                    home_wins = rng.random() < home_probability
+                    winning_score = rng.randint(80, 125) if profile['name'] in ('NBA', 'NCAAB') else rng.randint(2, 35)
+                    losing_score = winning_score - rng.randint(1, max(2, winning_score // 4))
+                    game['home_score'] = winning_score if home_wins else losing_score
+                    game['away_score'] = losing_score if home_wins else winning_score
+                    game['winner'] = home if home_wins else away
+                yield game
+
+def generate_slate(sport_key, count, start, end, now=None, seed=1234):
+    """
+    Returns `count` games for one sport spread evenly between start and end, in
+    the same shape as generate_games. Games that started over three hours
+    before `now` are completed; the rest are upcoming or live.
+    """
+    rng = random.Random(f"{seed}-{sport_key}")
+    now = now or datetime.now(timezone.utc)
+    profile = SPORT_PROFILES[sport_key]
+    teams = team_names(sport_key, profile['teams'])
+    strengths = {team: rng.gauss(0, profile['spread']) for team in teams}
+    step = (end - start) / max(count, 1)
+
+    games = []
+    for index in range(count):
+        home, away = rng.sample(teams, 2)
+        event_date = (start + step * index).replace(second=0, microsecond=0)
+        home_probability = min(max(0.5 + profile['home_edge'] + strengths[home] - strengths[away], 0.05), 0.95)
+        home_moneyline, away_moneyline = quote_moneylines(home_probability)
+        completed = event_date < now - timedelta(hours=3)
+        game = {
+            'game_id': f"{sport_key}-slate-{seed}-{index:06d}",
+            'sport_key': sport_key,
+            'sport': profile['name'],
+            'event_date': event_date,
+            'home_team': home,
+            'away_team': away,
+            'home_moneyline': home_moneyline,
+            'away_moneyline': away_moneyline,
+            'completed': completed,
+            'home_score': None,
+            'away_score': None,
+            'winner': None,
+        }
+        if completed:
+            home_score, away_score = rng.randint(1, 120), rng.randint(1, 120)
+            if home_score == away_score:
+                home_score += 1
+            game['home_score'], game['away_score'] = home_score, away_score
+            game['winner'] = home if home_score > away_score else away
+        games.append(game)
+    return games
+
+# --------------------- Output Formats ---------------------
+def to_document(game, last_updated=None):
+    """Shapes a synthetic game like a document written by fetch_moneylines/update_game_results."""
+    return {
+        'game_id': game['game_id'],
+        'sport': game['sport'],
+        'league': game['sport'],
+        'event_date': game['event_date'],
+        'teams': {
+            'home': {'name': game['home_team'], 'moneyline': game['home_moneyline']},
+            'away': {'name': game['away_team'], 'moneyline': game['away_moneyline']},
+        },
+        'status': 'Completed' if game['completed'] else 'Scheduled',
+        'result': {
+            'home_score': game['home_score'],
+            'away_score': game['away_score'],
+            'winner': game['winner'],
+        },
+        'last_updated': last_updated or game['event_date'],
+    }
+
+BOOKMAKERS = (('draftkings', 'DraftKings', 0), ('fanduel', 'FanDuel', 5), ('betmgm', 'BetMGM', -5), ('caesars', 'Caesars', 10))
+
+def shade(price, offset):
+    """Moves a price by offset, as books quoting slightly different lines do."""
+    shaded = price + offset
+    return price if -100 < shaded < 100 else shaded
+
+def to_odds_event(game, bookmakers=BOOKMAKERS):
+    """
+    Shapes a synthetic game like one element of the Odds API /odds response,
+    quoted by several books around the same line.
+    :param bookmakers: (key, title, price offset) for each book.
+    """
+    return {
+        'id': game['game_id'],
+        'sport_key': game['sport_key'],
+        'sport_title': game['sport'],
+        'commence_time': game['event_date'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'home_team': game['home_team'],
+        'away_team': game['away_team'],
+        'bookmakers': [{
+            'key': key,
+            'title': title,
+            'markets': [{
+                'key': 'h2h',
+                'outcomes': [
+                    {'name': game['home_team'], 'price': shade(game['home_moneyline'], offset)},
+                    {'name': game['away_team'], 'price': shade(game['away_moneyline'], -offset)},
+                ],
+            }],
+        } for key, title, offset in bookmakers],
+    }
+
+def to_score_event(game):
+    """Shapes a synthetic game like one element of the Odds API /scores response."""
+    scores = None
+    if game['completed']:
+        scores = [
+            {'name': game['home_team'], 'score': str(game['home_score'])},
+            {'name': game['away_team'], 'score': str(game['away_score'])},
+        ]
+    return {
+        'id': game['game_id'],
+        'sport_key': game['sport_key'],
+        'sport_title': game['sport'],
+        'commence_time': game['event_date'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'completed': game['completed'],
+        'home_team': game['home_team'],
+        'away_team': game['away_team'],
+        'scores': scores,
+        'last_update': None,
+    }
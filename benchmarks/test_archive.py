@@ -0,0 +1,128 @@
+"""
+Tests for the hot/cold router in archive.py: date bounds, merging across
+tiers, lookups, game writes and archiving, against mongomock.
+
+    pytest benchmarks/test_archive.py
+"""
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+import pytest
+
+pytest.importorskip('mongomock')
+
+from benchmarks.loader import connect
+
+@pytest.fixture
+def archive():
+    connect()
+    import archive
+    database = archive.get_database()
+    for name in database.list_collection_names():
+        database.drop_collection(name)
+    archive.get_catalog(refresh=True)
+    yield archive
+    for name in database.list_collection_names():
+        database.drop_collection(name)
+    archive.get_catalog(refresh=True)
+
+def add_archive(archive, season):
+    name = f"{archive.ARCHIVE_PREFIX}{season}"
+    start, end = archive.season_range(season)
+    archive.catalog_collection.insert_one({'_id': name, 'season': season, 'start': start, 'end': end, 'count': 0})
+    archive.get_catalog(refresh=True)
+    return archive.get_database()[name]
+
+def game(game_id, event_date, **fields):
+    return dict({'_id': game_id, 'game_id': game_id, 'event_date': event_date, 'sport': 'NBA'}, **fields)
+
+# --------------------- Date Bounds ---------------------
+def test_date_bounds_top_level_and_nested_and(archive):
+    start, end = datetime(2023, 1, 1), datetime(2023, 2, 1)
+    assert archive.date_bounds({'event_date': {'$gte': start, '$lt': end}}) == (start, end)
+    assert archive.date_bounds({'$and': [
+        {'event_date': {'$gt': start}},
+        {'$and': [{'event_date': {'$lte': end}}, {'sport': 'NBA'}]}
+    ]}) == (start, end)
+
+def test_date_bounds_takes_the_tightest_bounds(archive):
+    query = {'event_date': {'$gte': datetime(2023, 1, 1)},
+             '$and': [{'event_date': {'$gte': datetime(2023, 1, 5), '$lte': datetime(2023, 3, 1)}},
+                      {'event_date': {'$lt': datetime(2023, 2, 1)}}]}
+    assert archive.date_bounds(query) == (datetime(2023, 1, 5), datetime(2023, 2, 1))
+
+def test_date_bounds_exact_aware_and_unbounded(archive):
+    moment = datetime(2023, 1, 1, 12, tzinfo=timezone(timedelta(hours=-5)))
+    assert archive.date_bounds({'event_date': moment}) == (datetime(2023, 1, 1, 17), datetime(2023, 1, 1, 17))
+    assert archive.date_bounds({'teams.home.name': 'Boston Celtics'}) == (None, None)
+    assert archive.date_bounds(None) == (None, None)
+
+# --------------------- Merging ---------------------
+def test_merge_sorted_descending_multi_key_drops_duplicates(archive):
+    sort = [('event_date', pymongo.DESCENDING), ('game_id', pymongo.ASCENDING)]
+    day1, day2, day3 = datetime(2023, 1, 1), datetime(2023, 1, 2), datetime(2023, 1, 3)
+    hot = [game('c', day3), game('a', day2), game('b', day2)]
+    cold = [game('d', day3), game('a', day2), game('e', day1)]  # 'a' is mid-archive, in both tiers
+    merged = list(archive.merge_sorted([iter(hot), iter(cold)], sort))
+    assert [document['game_id'] for document in merged] == ['c', 'd', 'a', 'b', 'e']
+
+def test_merge_sorted_missing_values_sort_first(archive):
+    sort = [('result.winner', pymongo.ASCENDING)]
+    hot = [game('a', None, result={}), game('b', None, result={'winner': 'Y'})]
+    cold = [game('c', None, result={'winner': 'X'})]
+    merged = list(archive.merge_sorted([iter(hot), iter(cold)], sort))
+    assert [document['game_id'] for document in merged] == ['a', 'c', 'b']
+
+# --------------------- Router ---------------------
+def test_sorted_limit_across_tiers(archive):
+    routed = archive.RoutedCollection()
+    cold = add_archive(archive, 2022)
+    base = datetime(2023, 1, 1)
+    cold.insert_many([game(f'old{i}', base - timedelta(days=i)) for i in range(1, 6)])
+    routed.hot.insert_many([game(f'new{i}', base + timedelta(days=i)) for i in range(1, 4)])
+    routed.hot.insert_one(cold.find_one({'_id': 'old1'}))  # Copied, not yet deleted from hot
+
+    newest = list(routed.find({}).sort('event_date', pymongo.DESCENDING).limit(5))
+    assert [document['game_id'] for document in newest] == ['new3', 'new2', 'new1', 'old1', 'old2']
+    oldest = list(routed.find({'event_date': {'$lt': base}}).sort('event_date', pymongo.ASCENDING).limit(2))
+    assert [document['game_id'] for document in oldest] == ['old5', 'old4']
+
+def test_unsorted_find_across_tiers_drops_duplicates(archive):
+    routed = archive.RoutedCollection()
+    cold = add_archive(archive, 2022)
+    cold.insert_many([game('a', datetime(2022, 12, 1)), game('b', datetime(2022, 12, 2))])
+    routed.hot.insert_many([game('b', datetime(2022, 12, 2)), game('c', datetime(2023, 1, 2))])
+    assert sorted(document['game_id'] for document in routed.find({})) == ['a', 'b', 'c']
+
+def test_write_games_updates_archived_games_in_place(archive):
+    routed = archive.RoutedCollection()
+    cold = add_archive(archive, 2022)
+    cold.insert_one(game('archived', datetime(2022, 12, 1), status='In Progress'))
+
+    def upsert(doc):
+        return pymongo.UpdateOne({'game_id': doc['game_id']}, {'$set': doc}, upsert=True)
+
+    docs = [{'game_id': 'archived', 'event_date': datetime(2022, 12, 1), 'status': 'Completed'},
+            {'game_id': 'new', 'event_date': datetime(2023, 1, 5), 'status': 'Scheduled'}]
+    assert archive.write_games(docs, upsert, routed.hot) == (1, 1)
+    assert routed.hot.count_documents({'game_id': 'archived'}) == 0
+    assert cold.find_one({'game_id': 'archived'})['status'] == 'Completed'
+    assert routed.count_documents({}) == 2
+
+def test_find_one_by_game_id_falls_back_to_archives(archive):
+    cold = add_archive(archive, 2022)
+    cold.insert_one(game('archived', datetime(2022, 12, 1)))
+    assert archive.moneylines.find_one({'game_id': 'archived'})['game_id'] == 'archived'
+    assert archive.moneylines.find_one({'event_date': datetime(2022, 12, 1)}) is None  # Not a game_id lookup
+    assert archive.moneylines.find_one({'game_id': 'missing'}) is None
+
+def test_archive_seasons_moves_every_finished_game(archive):
+    hot = archive.moneylines.hot
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    old = datetime(archive.season_of('NBA', now) - 1, 12, 1)
+    add_archive(archive, archive.season_of('NBA', old))  # mongomock can't create compressed collections
+    hot.insert_many([game('completed', old, status='Completed'), game('no-result', old, status='No Result'),
+                     game('current', now, status='Scheduled')])
+    assert archive.archive_seasons() == 2
+    assert [document['game_id'] for document in hot.find()] == ['current']
+    assert archive.moneylines.count_documents({}) == 3
@@ -0,0 +1,65 @@
+"""
+pytest-benchmark cases for the hot paths, sharing data and cases with
+`python -m benchmarks`. Compare against a saved run with e.g.
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:25%
+
+BENCH_SEASONS, BENCH_SCALE and BENCH_MONGO_URI size the dataset and pick the
+backend (mongomock when unset).
+"""
+import logging
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from benchmarks.loader import connect, load_seasons
+from benchmarks.metrics import measure
+
+SEASONS = int(os.getenv('BENCH_SEASONS', 1))
+SCALE = float(os.getenv('BENCH_SCALE', 0.1))
+CASE_NAMES = [
+    'fetch_games',
+    'fetch_team_games',
+    'calculate_win_stats',
+    'get_unique_teams',
+    'update_game_status',
+    'process_and_store_odds',
+    'render_slate',
+    'render_slate_cached',
+    'render_team_history',
+    'render_team_history_cached',
+]
+
+@pytest.fixture(scope='module')
+def context():
+    mongo_uri = os.getenv('BENCH_MONGO_URI')
+    if not mongo_uri:
+        pytest.importorskip('mongomock')
+    client = connect(mongo_uri)
+    load_seasons(client, seasons=SEASONS, scale=SCALE)
+
+    from benchmarks.cases import BenchmarkContext
+    context = BenchmarkContext(seasons=SEASONS, scale=SCALE)
+    context.app.ensure_indexes()
+
+    logging.disable(logging.INFO)
+    yield context
+    logging.disable(logging.NOTSET)
+
+@pytest.mark.parametrize('case_name', CASE_NAMES)
+def test_hot_path(benchmark, context, case_name):
+    cases = {name: (func, setup) for name, func, setup in context.cases()}
+    func, setup = cases[case_name]
+
+    # Round trips and peak memory come from one traced run outside the timer
+    traced = measure(case_name, func, setup=setup, rounds=1, warmup=0)
+    benchmark.extra_info['round_trips'] = traced['round_trips']
+    benchmark.extra_info['peak_kib'] = traced['peak_kib']
+
+    if setup:
+        benchmark.pedantic(func, setup=setup, rounds=5, iterations=1)
+    else:
+        benchmark.pedantic(func, rounds=5, iterations=1)
@@ -0,0 +1,152 @@
+"""
+Per-bookmaker moneylines, stored compactly, with the lines pages and stats
+use computed once at write time.
+
+Each bookmaker gets a small, permanent index in the `bookmakers` collection
+({'_id': 'draftkings', 'index': 0, 'title': 'DraftKings'}). A game stores each
+side's prices as one array in that order (`teams.home.prices[i]` is book i's
+price, None where it has none), rather than a nested document per book.
+Indexes are only ever appended, so older games' arrays stay valid.
+
+Alongside the prices, each side stores:
+- `moneyline`: DraftKings' price, the line cards have always shown and the
+  calibration report measures. Left out when DraftKings doesn't price the side.
+- `consensus_moneyline`: the median of every book's vig-free probability
+  converted back to American odds. Favored/underdog stats, matchups and form
+  read it through normalize.consensus_moneyline.
+- `fair_probability`: that median vig-free probability.
+- `best`: the best available price and the book offering it.
+"""
+import logging
+import statistics
+import threading
+
+import pymongo
+
+from db import get_collection
+from normalize import parse_moneyline
+from calibration import implied_probability, vig_free_probabilities
+
+logger = logging.getLogger('Bookmakers')
+
+bookmakers_collection = get_collection('bookmakers')
+
+REFERENCE_BOOK = 'draftkings'  # Its prices are the stored `moneyline`
+
+# --------------------- Id Table ---------------------
+_table = {}  # key -> {'index', 'title'}
+_table_lock = threading.Lock()
+
+def load_table():
+    """:return: Dict of bookmaker key -> {'index', 'title'}, refreshed from the database."""
+    with _table_lock:
+        for doc in bookmakers_collection.find():
+            _table[doc['_id']] = {'index': doc['index'], 'title': doc.get('title')}
+        return dict(_table)
+
+def book_index(key, title=None):
+    """
+    :return: The bookmaker's permanent index, assigning the next free one the
+             first time a book is seen.
+    """
+    entry = _table.get(key)
+    if entry is not None:
+        return entry['index']
+    load_table()
+    if key in _table:
+        return _table[key]['index']
+
+    bookmakers_collection.create_index([('index', pymongo.ASCENDING)], unique=True)
+    while True:
+        last = bookmakers_collection.find_one({}, {'index': 1}, sort=[('index', pymongo.DESCENDING)])
+        index = last['index'] + 1 if last else 0
+        try:
+            bookmakers_collection.insert_one({'_id': key, 'index': index, 'title': title or key})
+            logger.info(f"Registered bookmaker {key} as index {index}")
+            break
+        except pymongo.errors.DuplicateKeyError:
+            # Another ingest registered this book, or took this index first
+            if bookmakers_collection.find_one({'_id': key}):
+                break
+    return load_table()[key]['index']
+
+def known_index(key):
+    """:return: The bookmaker's index, or None if it has never been registered."""
+    entry = _table.get(key) or load_table().get(key)
+    return entry['index'] if entry else None
+
+# --------------------- Odds Math ---------------------
+def probability_to_american(probability):
+    """Fair American moneyline for a win probability, rounded to a whole number."""
+    if probability >= 0.5:
+        return int(round(-100 * probability / (1 - probability)))
+    return int(round(100 * (1 - probability) / probability))
+
+def decimal_odds(moneyline):
+    """Total payout per unit staked; higher is better for the bettor."""
+    return 1 + (moneyline / 100 if moneyline > 0 else 100 / -moneyline)
+
+# --------------------- Lines ---------------------
+def collect_prices(event_bookmakers, home_team, away_team):
+    """
+    Reads every book's h2h prices from an Odds API event.
+    :return: List of (bookmaker key, title, home price, away price); a price is
+             None when the book doesn't offer a usable one for that side.
+    """
+    quotes = []
+    for bookmaker in event_bookmakers or []:
+        key = bookmaker.get('key')
+        if not key:
+            continue
+        home_price = away_price = None
+        for market in bookmaker.get('markets', []):
+            if market.get('key') != 'h2h':
+                continue
+            for outcome in market.get('outcomes', []):
+                price = parse_moneyline(outcome.get('price'))
+                if price is None or implied_probability(price) is None:
+                    continue
+                if outcome.get('name') == home_team:
+                    home_price = price
+                elif outcome.get('name') == away_team:
+                    away_price = price
+        if home_price is not None or away_price is not None:
+            quotes.append((key, bookmaker.get('title') or key, home_price, away_price))
+    return quotes
+
+def build_lines(quotes):
+    """
+    Packs collected prices into the stored per-side fields (see the module docstring).
+    :return: {'home': {...}, 'away': {...}, 'books': count}, or None if no book
+             prices both sides.
+    """
+    fair = [
+        vig_free_probabilities(home_price, away_price)[0]
+        for _, _, home_price, away_price in quotes
+        if home_price is not None and away_price is not None
+    ]
+    if not fair:
+        return None
+    home_probability = statistics.median(fair)
+
+    indexes = [book_index(key, title) for key, title, _, _ in quotes]
+    width = max(indexes) + 1
+    lines = {'books': len(fair)}
+    for side, position, probability in (('home', 2, home_probability), ('away', 3, 1 - home_probability)):
+        prices = [None] * width
+        best = None
+        for index, quote in zip(indexes, quotes):
+            price = quote[position]
+            prices[index] = price
+            if price is not None and (best is None or decimal_odds(price) > decimal_odds(best['price'])):
+                best = {'price': price, 'book': quote[1]}
+        lines[side] = {
+            'consensus_moneyline': probability_to_american(probability),
+            'fair_probability': round(probability, 4),
+            'prices': prices,
+            'best': best
+        }
+        reference = next((quote[position] for quote in quotes if quote[0] == REFERENCE_BOOK), None)
+        if reference is not None:
+            lines[side]['moneyline'] = reference
+    return lines
@@ -0,0 +1,228 @@
+"""
+How well DraftKings' moneylines predict results: vig-free implied win
+probability against actual win rate, bucketed into probability bands per
+sport and season. Games DraftKings didn't price are left out, so the report
+stays one book's calibration as other books' prices are stored alongside.
+
+Only bucket sums are stored (games, implied probability, wins and squared
+error per band), so the report page reads a few hundred small documents and
+never touches `moneylines`. update_game_results adds newly completed games;
+each bucket lists the game_ids it has counted (as matchups does), so a game
+completed a second time is not counted again. `python calibration.py
+--rebuild` recomputes everything in one pass.
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+
+import pymongo
+
+from db import get_collection, close_client
+from archive import moneylines as moneylines_collection
+from normalize import parse_moneyline, season_of
+
+logger = logging.getLogger('Calibration')
+
+calibration_collection = get_collection('calibration')
+
+BAND_WIDTH = 0.05  # 20 bands across [0, 1]
+SUM_FIELDS = ('games', 'implied_sum', 'wins', 'squared_error')
+
+# --------------------- Odds Math ---------------------
+def implied_probability(moneyline):
+    """Raw (vig-inclusive) implied probability of an American moneyline."""
+    if moneyline is None or moneyline == 0:
+        return None
+    if moneyline < 0:
+        return -moneyline / (-moneyline + 100)
+    return 100 / (moneyline + 100)
+
+def vig_free_probabilities(home_moneyline, away_moneyline):
+    """
+    Removes the bookmaker margin by normalizing both sides' implied
+    probabilities to sum to 1.
+    :return: (home, away) probabilities, or None if either line is unusable.
+    """
+    home = implied_probability(parse_moneyline(home_moneyline))
+    away = implied_probability(parse_moneyline(away_moneyline))
+    if home is None or away is None:
+        return None
+    total = home + away
+    return home / total, away / total
+
+def band_of(probability):
+    """Lower edge of the probability band, e.g. 0.55 for 0.5731."""
+    index = min(int(probability / BAND_WIDTH), int(round(1 / BAND_WIDTH)) - 1)
+    return round(index * BAND_WIDTH, 2)
+
+def draftkings_moneylines(teams):
+    """
+    DraftKings' price for each side: its entry in the per-book prices arrays
+    (see bookmakers.py), or the single stored moneyline on games ingested when
+    DraftKings was the only book.
+    :return: (home, away); either is None when DraftKings has no price.
+    """
+    from bookmakers import REFERENCE_BOOK, known_index  # Imported late: bookmakers uses this module's odds math
+
+    home, away = teams.get('home', {}), teams.get('away', {})
+    if 'prices' not in home and 'prices' not in away:
+        return home.get('moneyline'), away.get('moneyline')
+    index = known_index(REFERENCE_BOOK)
+    if index is None:
+        return None, None
+    return tuple(
+        prices[index] if index < len(prices) else None
+        for prices in (home.get('prices') or [], away.get('prices') or [])
+    )
+
+def game_sides(game):
+    """
+    Both sides of a completed game as calibration observations.
+    :return: List of (sport, season, band, probability, won); empty if the
+             game has no usable DraftKings lines, date or winner.
+    """
+    teams = game.get('teams', {})
+    winner = (game.get('result') or {}).get('winner')
+    event_date = game.get('event_date')
+    probabilities = vig_free_probabilities(*draftkings_moneylines(teams))
+    if not probabilities or not winner or not isinstance(event_date, datetime):
+        return []
+
+    sport = game.get('sport')
+    season = season_of(sport, event_date)
+    sides = []
+    for side, probability in zip(('home', 'away'), probabilities):
+        won = int(teams.get(side, {}).get('name') == winner)
+        sides.append((sport, season, band_of(probability), probability, won))
+    return sides
+
+def bucket_id(sport, season, band):
+    return f"{sport}|{season}|{band:.2f}"
+
+def add_sides(buckets, sides, game_id=None):
+    """Accumulates observations into a dict of bucket id -> sums (and counted game_ids)."""
+    for sport, season, band, probability, won in sides:
+        key = bucket_id(sport, season, band)
+        bucket = buckets.setdefault(key, {'sport': sport, 'season': season, 'band': band, 'games': 0,
+                                          'implied_sum': 0.0, 'wins': 0, 'squared_error': 0.0, 'game_ids': []})
+        if game_id is not None and game_id not in bucket['game_ids']:
+            bucket['game_ids'].append(game_id)
+        bucket['games'] += 1
+        bucket['implied_sum'] += probability
+        bucket['wins'] += won
+        bucket['squared_error'] += (probability - won) ** 2
+    return buckets
+
+# --------------------- Writes ---------------------
+def record_results(completed):
+    """
+    Adds newly completed games to the stored buckets with one bulk write.
+    Per game and bucket, the first write creates the bucket if needed and the
+    second only matches while the game isn't yet in its game_ids, so a game
+    completed again (or a replay after a partial failure) is never counted twice.
+    :param completed: Iterable of (game document, winner name); the winner
+                      passed in overrides the document's stale result.
+    :return: Number of bucket increments applied.
+    """
+    now = datetime.now(timezone.utc)
+    operations = []
+    for game, winner in completed:
+        game_id = game.get('game_id')
+        if not game_id:
+            continue
+        game = dict(game, result=dict(game.get('result') or {}, winner=winner))
+        for key, bucket in add_sides({}, game_sides(game)).items():
+            operations.append(pymongo.UpdateOne(
+                {'_id': key},
+                {'$setOnInsert': {'sport': bucket['sport'], 'season': bucket['season'], 'band': bucket['band'],
+                                  'game_ids': [], **{field: 0 for field in SUM_FIELDS}}},
+                upsert=True
+            ))
+            operations.append(pymongo.UpdateOne(
+                {'_id': key, 'game_ids': {'$ne': game_id}},
+                {
+                    '$inc': {field: bucket[field] for field in SUM_FIELDS},
+                    '$push': {'game_ids': game_id},
+                    '$set': {'updated': now}
+                }
+            ))
+    if not operations:
+        return 0
+    # Ordered: each bucket's upsert must land before its increment
+    result = calibration_collection.bulk_write(operations, ordered=True)
+    return result.modified_count
+
+def rebuild_calibration(batch_size=2000):
+    """
+    Recomputes every bucket in one projected pass over completed games and
+    replaces the stored report.
+    """
+    buckets = {}
+    cursor = moneylines_collection.find(
+        {'status': 'Completed', 'result.winner': {'$nin': [None, '']}},
+        {'game_id': 1, 'sport': 1, 'event_date': 1, 'teams.home.name': 1, 'teams.home.moneyline': 1,
+         'teams.home.prices': 1, 'teams.away.name': 1, 'teams.away.moneyline': 1, 'teams.away.prices': 1,
+         'result.winner': 1, '_id': 0}
+    ).batch_size(batch_size)
+    for game in cursor:
+        add_sides(buckets, game_sides(game), game.get('game_id'))
+
+    now = datetime.now(timezone.utc)
+    operations = [pymongo.ReplaceOne({'_id': key}, dict(bucket, updated=now), upsert=True) for key, bucket in buckets.items()]
+    for start in range(0, len(operations), batch_size):
+        calibration_collection.bulk_write(operations[start:start + batch_size], ordered=False)
+    calibration_collection.delete_many({'_id': {'$nin': list(buckets)}})
+    logger.info(f"Rebuilt {len(buckets)} calibration buckets")
+    return len(buckets)
+
+# --------------------- Reads ---------------------
+def get_report(sport=None, season=None):
+    """
+    Folds the stored buckets into one row per band for the selected sport and
+    season (all when None).
+    :return: Dict with 'bands' (band, games, implied, actual), overall 'games'
+             and 'brier' score, and the 'sports' and 'seasons' available.
+    """
+    docs = list(calibration_collection.find({}, {'updated': 0, 'game_ids': 0}))
+    sports = sorted({doc['sport'] for doc in docs if doc.get('sport')})
+    seasons = sorted({doc['season'] for doc in docs if doc.get('season') is not None}, reverse=True)
+
+    totals = {}
+    for doc in docs:
+        if (sport and doc.get('sport') != sport) or (season is not None and doc.get('season') != season):
+            continue
+        band = totals.setdefault(doc['band'], {field: 0 for field in SUM_FIELDS})
+        for field in SUM_FIELDS:
+            band[field] += doc.get(field, 0)
+
+    bands = []
+    for band, sums in sorted(totals.items()):
+        if not sums['games']:
+            continue
+        bands.append({
+            'band': band,
+            'label': f"{band * 100:.0f}-{(band + BAND_WIDTH) * 100:.0f}%",
+            'games': sums['games'],
+            'implied': sums['implied_sum'] / sums['games'],
+            'actual': sums['wins'] / sums['games']
+        })
+    games = sum(sums['games'] for sums in totals.values())
+    brier = sum(sums['squared_error'] for sums in totals.values()) / games if games else None
+    return {'bands': bands, 'games': games, 'brier': brier, 'sports': sports, 'seasons': seasons}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the moneyline calibration report")
+    parser.add_argument('--rebuild', action='store_true', help="Recompute every bucket from completed games")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        if args.rebuild:
+            rebuild_calibration()
+        else:
+            parser.print_help()
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
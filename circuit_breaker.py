@@ -0,0 +1,146 @@
+"""
+Circuit breaker and last-good results for the web app's data layer.
+
+The web worker's MongoClient uses short server selection and socket timeouts
+(WEB_MONGO_* in config.py), so a slow or unreachable database costs a request
+about a second rather than the driver defaults. After DB_BREAKER_FAILURES of
+those failures in a row the breaker opens and calls fail immediately with
+CircuitOpenError. Once DB_BREAKER_COOLDOWN seconds have passed, one trial
+call is let through (half-open): if it succeeds the breaker closes, otherwise
+it opens for another cooldown.
+
+While the breaker is not closed, pages are served from LastGoodCache, which
+keeps the last result each page loaded successfully. Unlike the invalidated
+caches, invalidation events never empty it, so it still has data to show
+when the database is the thing that's down.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import pymongo
+
+from config import DB_BREAKER_FAILURES, DB_BREAKER_COOLDOWN, LAST_GOOD_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the breaker is open."""
+
+# Errors that mean the database could not answer, as opposed to a bad query
+DATABASE_ERRORS = (pymongo.errors.ConnectionFailure, pymongo.errors.ExecutionTimeout)
+DATABASE_UNAVAILABLE = DATABASE_ERRORS + (CircuitOpenError,)
+
+# --------------------- Breaker ---------------------
+class CircuitBreaker:
+    """
+    Thread-safe breaker; see the module docstring. Calls nested inside a call
+    run straight through, so one page load counts once. Nesting is tracked in
+    a context variable, so it follows calls parallel.gather() moves onto pool
+    threads.
+    """
+
+    def __init__(self, name, failure_threshold=DB_BREAKER_FAILURES, cooldown=DB_BREAKER_COOLDOWN):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = self.rejected = 0
+        self._lock = threading.Lock()
+        self._depth = contextvars.ContextVar(f'{name}_breaker_depth', default=0)
+
+    @property
+    def closed(self):
+        return self.state == CLOSED
+
+    def ready_for_trial(self):
+        """True when the breaker is open and its cooldown has passed."""
+        return self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown
+
+    def acquire(self):
+        """:return: True if a call may go ahead (taking the trial when half-opening)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.ready_for_trial():
+                self.state = HALF_OPEN
+                logger.info(f"{self.name} breaker half-open; sending a trial call")
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"{self.name} breaker closed")
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                logger.warning(f"{self.name} breaker open after {self.failures} failures; retrying in {self.cooldown}s")
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Runs fn through the breaker.
+        :raises CircuitOpenError: While the breaker is open.
+        """
+        if self._depth.get():
+            return fn(*args, **kwargs)
+        if not self.acquire():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        token = self._depth.set(1)
+        try:
+            result = fn(*args, **kwargs)
+        except DATABASE_ERRORS:
+            self.record_failure()
+            raise
+        except CircuitOpenError:
+            raise  # A nested call was refused; the database hasn't answered
+        except Exception:
+            self.record_success()  # The database answered; the caller's error is its own
+            raise
+        finally:
+            self._depth.reset(token)
+        self.record_success()
+        return result
+
+# --------------------- Last Good Results ---------------------
+class LastGoodCache:
+    """Bounded LRU of key -> (value, as_of), kept regardless of invalidation."""
+
+    def __init__(self, max_entries=LAST_GOOD_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """:return: (value, as_of UTC datetime), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, as_of):
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+            self._entries[key] = (value, as_of)
+
+    def __len__(self):
+        return len(self._entries)
@@ -10,6 +10,61 @@ MONGO_URI = os.getenv('MONGO_URI')
 if not MONGO_URI:
     raise EnvironmentError("MONGO_URI not found in environment variables.")
 
+# Database names; overridable so benchmarks and tooling can use scratch databases
+MONGO_ODDS_DB = os.getenv('MONGO_ODDS_DB', 'sports_odds')
+MONGO_USERS_DB = os.getenv('MONGO_USERS_DB', 'users')
+
+# Shared MongoDB connection pool settings (see db.py)
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 20))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 20000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primaryPreferred')
+# The web app fails fast instead, so its circuit breaker trips during a database blip (see circuit_breaker.py)
+WEB_MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('WEB_MONGO_SERVER_SELECTION_TIMEOUT_MS', 1500))
+WEB_MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('WEB_MONGO_SOCKET_TIMEOUT_MS', 3000))
+DB_BREAKER_FAILURES = int(os.getenv('DB_BREAKER_FAILURES', 3))     # Consecutive failures before it opens
+DB_BREAKER_COOLDOWN = float(os.getenv('DB_BREAKER_COOLDOWN', 15))  # Seconds open before a trial call
+LAST_GOOD_MAX_ENTRIES = int(os.getenv('LAST_GOOD_MAX_ENTRIES', 2000))  # Page results kept to serve while open
+
+# Commands slower than this are logged to slow_queries (0 disables; see query_log.py)
+SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 100))
+SLOW_QUERY_LOG_BYTES = int(os.getenv('SLOW_QUERY_LOG_BYTES', 16 * 1024 * 1024))  # Capped collection size
+
+# Comma-separated usernames treated as admins in addition to users flagged is_admin
+ADMIN_USERNAMES = {name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()}
+
+# Where ?_profile=1 request profiles are written (see profiling.py)
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+# Seconds a loaded User stays in the per-process cache (see models.py)
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
+
+# Threads per worker running a request's independent MongoDB reads at the same
+# time (see parallel.py); 0 runs them one after another
+DATA_LOAD_WORKERS = int(os.getenv('DATA_LOAD_WORKERS', 8))
+
+# Rendered game cards kept per worker (see fragments.py); 0 disables
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', 5000))
+
+# Per-worker caches of slates, stats and the team list, dropped early by the
+# invalidation watcher when games change (see invalidation.py)
+DATA_CACHE_TTL = int(os.getenv('DATA_CACHE_TTL', 3600))  # Seconds; 0 disables
+INVALIDATION_MODE = os.getenv('INVALIDATION_MODE', 'auto')  # 'auto' (change stream, else polling), 'poll' or 'off'
+INVALIDATION_POLL_SECONDS = float(os.getenv('INVALIDATION_POLL_SECONDS', 5))
+
+# Disk tier behind those caches, shared by the workers on a host and kept
+# across restarts; entries are tied to the data watermark (see disk_cache.py)
+DISK_CACHE_PATH = os.getenv('DISK_CACHE_PATH', 'cache/data_cache.sqlite3')
+DISK_CACHE_TTL = int(os.getenv('DISK_CACHE_TTL', 86400))  # Seconds; 0 disables
+DISK_CACHE_MAX_ENTRIES = int(os.getenv('DISK_CACHE_MAX_ENTRIES', 50000))
+DISK_CACHE_WATERMARK_SECONDS = float(os.getenv('DISK_CACHE_WATERMARK_SECONDS', 5))  # Longest a watermark is trusted without an event
+# Timezones whose default slates (NBA, yesterday through the next 5 days) are computed at boot
+WARM_UP_TIMEZONES = [name.strip() for name in os.getenv('WARM_UP_TIMEZONES', 'UTC').split(',') if name.strip()]
+
 # The Odds API configuration
 ODDS_API_KEY = os.getenv('ODDS_API_KEY')
 
@@ -23,7 +78,8 @@ if not GEMINI_API_KEY:
     raise EnvironmentError("GEMINI_API_KEY not found in environment variables.")
 
 # The Odds API endpoints and parameters
-API_BASE_URL = 'https://api.the-odds-api.com/v4/sports/'
+# ODDS_API_BASE_URL lets ingest run against a local stand-in (see benchmarks/fake_odds_api.py)
+API_BASE_URL = os.getenv('ODDS_API_BASE_URL', 'https://api.the-odds-api.com/v4/sports/')
 SPORTS = {
     'basketball_nba': 'NBA',
     'americanfootball_nfl': 'NFL',
@@ -32,9 +88,36 @@ SPORTS = {
     'icehockey_nhl': 'NHL',  # Changed from hockey_nhl
     'baseball_mlb': 'MLB'  # Add MLB support
 }
+# Month each league's season starts; games before it belong to the previous season
+SEASON_START_MONTHS = {
+    'NBA': 10,
+    'NFL': 9,
+    'NCAAB': 11,
+    'NCAAF': 8,
+    'NHL': 10,
+    'MLB': 3
+}
+# Elo parameters per league (see ratings.py): k is the update size per game,
+# home the rating points added to the home side when predicting
+ELO_PARAMETERS = {
+    'NBA': {'k': 20, 'home': 100},
+    'NFL': {'k': 20, 'home': 48},
+    'NCAAB': {'k': 20, 'home': 90},
+    'NCAAF': {'k': 25, 'home': 55},
+    'NHL': {'k': 6, 'home': 50},
+    'MLB': {'k': 4, 'home': 24}
+}
 REGION = 'us'         # Can be 'us', 'uk', 'eu', 'au'
 MARKET = 'h2h'        # Moneyline
 ODDS_FORMAT = 'american'  # or 'decimal'
 DATE_FORMAT = 'iso'        # or 'unix'
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 500))  # Upserts per bulk_write
+
+# Odds API quota planning (see quota_planner.py)
+ODDS_CACHE_DIR = os.getenv('ODDS_CACHE_DIR', 'odds_cache')
+ODDS_CACHE_TTL_ODDS = int(os.getenv('ODDS_CACHE_TTL_ODDS', 600))      # Seconds; 0 disables
+ODDS_CACHE_TTL_SCORES = int(os.getenv('ODDS_CACHE_TTL_SCORES', 300))
+QUOTA_RESERVE = int(os.getenv('QUOTA_RESERVE', 50))  # Requests always left unspent
+SEASON_WINDOW_DAYS = int(os.getenv('SEASON_WINDOW_DAYS', 10))  # Days either side of today checked against past seasons
 
 # Remove LEAGUES mapping as it's redundant
@@ -0,0 +1,131 @@
+import os
+import logging
+import threading
+
+from pymongo import MongoClient
+
+from config import (
+    MONGO_URI,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_READ_PREFERENCE,
+    MONGO_ODDS_DB,
+    MONGO_USERS_DB
+)
+
+logger = logging.getLogger(__name__)
+
+ODDS_DB = MONGO_ODDS_DB
+USERS_DB = MONGO_USERS_DB
+
+# --------------------- Shared Client ---------------------
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_client_options = {}
+
+def get_client():
+    """
+    Returns the process-wide MongoClient, creating it on first use.
+    A client inherited across fork() is never reused: the child builds its own
+    pool the first time it touches the database.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            from query_log import get_event_listeners  # Imported late: query_log writes through this module
+            options = dict(
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                readPreference=MONGO_READ_PREFERENCE,
+                retryWrites=True,
+                event_listeners=get_event_listeners(),
+                connect=False
+            )
+            options.update(_client_options)
+            _client = MongoClient(MONGO_URI, **options)
+            _client_pid = pid
+            logger.info(f"Created MongoDB client (pid {pid}, maxPoolSize {MONGO_MAX_POOL_SIZE}).")
+    return _client
+
+def set_client_options(**options):
+    """
+    Overrides MongoClient keyword arguments (e.g. shorter timeouts for the web
+    app) for clients created from now on in this process and its children.
+    """
+    if _client is not None and _client_pid == os.getpid():
+        logger.warning("MongoDB client already created; new options apply after the next fork or close_client().")
+    _client_options.update(options)
+
+def set_client(client):
+    """
+    Installs an already-built client (e.g. a local mongod or mongomock client
+    for benchmarks) as this process's shared client.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        _client = client
+        _client_pid = os.getpid()
+
+def close_client():
+    """Closes the shared client if this process owns one."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+def _forget_client_after_fork():
+    # The parent's sockets must not be shared; drop the reference without closing it.
+    global _client, _client_pid
+    _client = None
+    _client_pid = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+# --------------------- Lazy Collections ---------------------
+class LazyCollection:
+    """
+    Module-level stand-in for a pymongo Collection.
+    Every attribute access resolves against the current process's client, so
+    modules can keep `moneylines_collection = ...` globals without opening a
+    connection at import time or carrying one across a fork.
+    """
+
+    def __init__(self, database_name, collection_name):
+        self.database_name = database_name
+        self.collection_name = collection_name
+
+    def resolve(self):
+        return get_client()[self.database_name][self.collection_name]
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __getitem__(self, name):
+        return self.resolve()[name]
+
+    def __repr__(self):
+        return f"LazyCollection({self.database_name}.{self.collection_name})"
+
+def get_collection(collection_name, database_name=ODDS_DB):
+    return LazyCollection(database_name, collection_name)
+
+def get_database(database_name=ODDS_DB):
+    return get_client()[database_name]
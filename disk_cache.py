@@ -0,0 +1,160 @@
+"""
+SQLite-backed second tier for the in-process data caches, so computed slates,
+stats and team lists survive a worker restart.
+
+Every entry is stored with the data watermark (the newest `last_updated` in
+`moneylines`) it was computed at: the watermark current when the lookup
+missed, so a value that was being computed while an ingest landed is filed
+under the older watermark. Entries from any other watermark are stale and are
+ignored on load. The watermark is re-read on every invalidation event and at
+least every DISK_CACHE_WATERMARK_SECONDS, so nothing written before the last
+ingest is served for longer than that after it, even with invalidation off.
+All workers on a host share one database file.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from config import DISK_CACHE_PATH, DISK_CACHE_TTL, DISK_CACHE_MAX_ENTRIES, DISK_CACHE_WATERMARK_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 500  # Writes between prunes
+MAX_PENDING = 1000  # Misses remembered per thread awaiting their set()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key_text TEXT NOT NULL,
+    key BLOB NOT NULL,
+    value BLOB NOT NULL,
+    tags BLOB NOT NULL,
+    watermark TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key_text)
+)
+"""
+
+class DiskCache:
+    """
+    :param watermark_fn: Returns the current data watermark (a datetime or None).
+                         Called again after mark_stale() or once
+                         `watermark_seconds` have passed.
+    """
+
+    def __init__(self, watermark_fn, path=DISK_CACHE_PATH, ttl=DISK_CACHE_TTL, max_entries=DISK_CACHE_MAX_ENTRIES,
+                 watermark_seconds=DISK_CACHE_WATERMARK_SECONDS):
+        self.watermark_fn = watermark_fn
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._watermark = None
+        self._watermark_stale = True
+        self._watermark_read_at = 0.0
+        self.watermark_seconds = watermark_seconds
+        self._writes = 0
+        self.hits = self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and bool(self.path)
+
+    def connection(self):
+        # sqlite3 connections can't cross threads or forks
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def mark_stale(self, *_):
+        """Called on data changes; the watermark is re-read on next use."""
+        self._watermark_stale = True
+
+    def watermark(self):
+        if self._watermark_stale or time.monotonic() - self._watermark_read_at >= self.watermark_seconds:
+            self._watermark_stale = False
+            value = self.watermark_fn()
+            self._watermark = value.isoformat() if value else 'none'
+            self._watermark_read_at = time.monotonic()
+        return self._watermark
+
+    def pending(self):
+        """:return: This thread's (namespace, key text) -> watermark at the miss, awaiting set()."""
+        pending = getattr(self._local, 'pending', None)
+        if pending is None or len(pending) > MAX_PENDING:  # Misses whose computation failed are never popped
+            pending = self._local.pending = {}
+        return pending
+
+    def get(self, namespace, key):
+        """:return: (value, tags), or None when missing, expired or from another watermark."""
+        if not self.enabled:
+            return None
+        watermark = self.watermark()
+        try:
+            row = self.connection().execute(
+                'SELECT value, tags FROM entries WHERE namespace = ? AND key_text = ? AND watermark = ? AND stored_at > ?',
+                (namespace, repr(key), watermark, time.time() - self.ttl)
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Disk cache read failed: {e}")
+            return None
+        if row is None:
+            self.misses += 1
+            self.pending()[(namespace, repr(key))] = watermark
+            return None
+        self.hits += 1
+        return pickle.loads(row[0]), pickle.loads(row[1])
+
+    def set(self, namespace, key, value, tags=()):
+        """Stores a value under the watermark current when this thread's get() missed it."""
+        if not self.enabled:
+            return
+        watermark = self.pending().pop((namespace, repr(key)), None) or self.watermark()
+        try:
+            self.connection().execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (namespace, repr(key), pickle.dumps(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 pickle.dumps(tuple(tags)), watermark, time.time())
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self.prune()
+        except (sqlite3.Error, OSError, pickle.PicklingError) as e:
+            logger.warning(f"Disk cache write failed: {e}")
+
+    def entries(self, namespace):
+        """Yields (key, value, tags) for every current entry in a namespace."""
+        if not self.enabled:
+            return
+        rows = self.connection().execute(
+            'SELECT key, value, tags FROM entries WHERE namespace = ? AND watermark = ? AND stored_at > ?',
+            (namespace, self.watermark(), time.time() - self.ttl)
+        )
+        for key, value, tags in rows:
+            yield pickle.loads(key), pickle.loads(value), pickle.loads(tags)
+
+    def prune(self):
+        """Deletes stale entries, then the oldest beyond max_entries."""
+        if not self.enabled:
+            return 0
+        conn = self.connection()
+        deleted = conn.execute(
+            'DELETE FROM entries WHERE watermark != ? OR stored_at <= ?',
+            (self.watermark(), time.time() - self.ttl)
+        ).rowcount
+        deleted += conn.execute(
+            'DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        return deleted
@@ -4,18 +4,24 @@ from datetime import datetime, timezone, timedelta
 import time
 
 import pymongo
-import requests
 
 from config import (
-    MONGO_URI,
     ODDS_API_KEY,
     API_BASE_URL,
     SPORTS,
     REGION,
     MARKET,
     ODDS_FORMAT,
-    DATE_FORMAT
+    DATE_FORMAT,
+    INGEST_BATCH_SIZE
 )
+from db import get_collection, close_client
+from normalize import team_key
+from bookmakers import collect_prices, build_lines
+from archive import write_games
+import ratings
+import quota_planner
+import slates
 
 # --------------------- Logging Configuration ---------------------
 logger = logging.getLogger('FetchMoneylines')
@@ -33,20 +39,14 @@ ch.setFormatter(formatter)
 logger.addHandler(ch)
 
 # --------------------- MongoDB Setup ---------------------
-try:
-    client = pymongo.MongoClient(MONGO_URI)
-    db = client.sports_odds  # Your database name
-    moneylines_collection = db.moneylines  # Your collection name
-    logger.info("Connected to MongoDB successfully.")
-except pymongo.errors.ConnectionError as ce:
-    logger.error(f"Failed to connect to MongoDB: {ce}")
-    raise ce
+moneylines_collection = get_collection('moneylines')
 
 # --------------------- Fetching Odds Data ---------------------
 def fetch_moneyline_odds(sport_key):
     """
     Fetches moneyline odds for a specific sport from The Odds API.
-    Now includes all available future games.
+    Now includes all available future games, priced by every bookmaker in the
+    region (one call either way).
     """
     url = f"{API_BASE_URL}{sport_key}/odds"
     params = {
@@ -55,15 +55,12 @@ def fetch_moneyline_odds(sport_key):
         'markets': MARKET,
         'oddsFormat': ODDS_FORMAT,
         'dateFormat': DATE_FORMAT,
-        'bookmakers': 'draftkings',  # Add a major bookmaker for consistency
         'eventIds': None  # This tells the API to return all available events
     }
 
     try:
         logger.info(f"Fetching odds for {SPORTS.get(sport_key)} including future games")
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        odds_data = response.json()
+        odds_data = quota_planner.cached_get(url, params, quota_planner.cache_ttl('odds'))
 
         # Log the full API response
         logger.info(f"Full API response for {sport_key}: {odds_data}")
@@ -78,107 +75,110 @@ def fetch_moneyline_odds(sport_key):
         return []
 
 # --------------------- Processing and Storing Data ---------------------
-def process_and_store_odds(odds_data, sport_key):
+def build_moneyline_doc(event, sport_key, current_time):
     """
-    Processes odds data and stores it in MongoDB.
-    Modified to handle future games better.
+    Validates one Odds API event and normalizes it into a moneylines document.
+    Shared by the live fetch and the historical backfill.
+    :return: The document, or None if the event is incomplete or malformed.
     """
-    operations = []
-    current_time = datetime.now(timezone.utc)
-
-    for event in odds_data:
-        try:
-            # Basic validation
-            game_id = event.get('id')
-            commence_time_str = event.get('commence_time')
-            
-            if not all([game_id, commence_time_str]):
-                continue
-                
-            # Parse the commence time
-            commence_time = datetime.strptime(
-                commence_time_str, 
-                '%Y-%m-%dT%H:%M:%SZ'
-            ).replace(tzinfo=timezone.utc)
+    try:
+        # Basic validation
+        game_id = event.get('id')
+        commence_time_str = event.get('commence_time')
+        
+        if not all([game_id, commence_time_str]):
+            return None
             
-            home_team = event.get('home_team')
-            away_team = event.get('away_team')
-            bookmakers = event.get('bookmakers', [])
-
-            if not all([home_team, away_team, bookmakers]):
-                logger.warning(f"Incomplete data for event ID {game_id}. Skipping. Full event data: {event}")
-                continue
-
-            # Initialize moneyline variables
-            home_moneyline = None
-            away_moneyline = None
-
-            # Iterate through bookmakers to find moneyline odds
-            for bookmaker in bookmakers:
-                markets = bookmaker.get('markets', [])
-                for market in markets:
-                    if market.get('key') == 'h2h':
-                        outcomes = market.get('outcomes', [])
-                        for outcome in outcomes:
-                            team = outcome.get('name')
-                            price = outcome.get('price')
-                            if team == home_team:
-                                home_moneyline = price
-                            elif team == away_team:
-                                away_moneyline = price
-
-            if home_moneyline is None or away_moneyline is None:
-                logger.warning(f"Missing moneyline odds for event ID {game_id}. Skipping.")
-                continue
-
-            # Prepare the document with status field
-            moneyline_doc = {
-                'game_id': game_id,
-                'sport': SPORTS[sport_key],
-                'league': get_league_name(sport_key),
-                'event_date': commence_time,
-                'teams': {
-                    'home': {
-                        'name': home_team,
-                        'moneyline': home_moneyline
-                    },
-                    'away': {
-                        'name': away_team,
-                        'moneyline': away_moneyline
-                    }
-                },
-                'status': 'Scheduled' if commence_time > current_time else 'In Progress',
-                'result': {
-                    'home_score': None,  # To be updated after the game
-                    'away_score': None,  # To be updated after the game
-                    'winner': None        # Can be null if game hasn't been played yet
+        # Parse the commence time
+        commence_time = datetime.strptime(
+            commence_time_str, 
+            '%Y-%m-%dT%H:%M:%SZ'
+        ).replace(tzinfo=timezone.utc)
+        
+        home_team = event.get('home_team')
+        away_team = event.get('away_team')
+        bookmakers = event.get('bookmakers', [])
+
+        if not all([home_team, away_team, bookmakers]):
+            logger.warning(f"Incomplete data for event ID {game_id}. Skipping. Full event data: {event}")
+            return None
+
+        # Every book's prices, reduced to the consensus and best lines (see bookmakers.py)
+        lines = build_lines(collect_prices(bookmakers, home_team, away_team))
+        if lines is None:
+            logger.warning(f"Missing moneyline odds for event ID {game_id}. Skipping.")
+            return None
+
+        # Prepare the document with status field
+        moneyline_doc = {
+            'game_id': game_id,
+            'sport': SPORTS[sport_key],
+            'league': get_league_name(sport_key),
+            'event_date': commence_time,
+            'teams': {
+                'home': {
+                    'name': home_team,
+                    'key': team_key(home_team),
+                    **lines['home']
                 },
-                'last_updated': current_time
-            }
+                'away': {
+                    'name': away_team,
+                    'key': team_key(away_team),
+                    **lines['away']
+                }
+            },
+            'books': lines['books'],
+            'status': 'Scheduled' if commence_time > current_time else 'In Progress',
+            'result': {
+                'home_score': None,  # To be updated after the game
+                'away_score': None,  # To be updated after the game
+                'winner': None        # Can be null if game hasn't been played yet
+            },
+            'last_updated': current_time
+        }
+
+        logger.info(f"Processed game: {home_team} vs {away_team} on {commence_time}")
+        return moneyline_doc
+
+    except Exception as e:
+        logger.error(f"Error processing event {event.get('id', 'Unknown')}: {e}")
+        return None
 
-            # Create an upsert operation
-            operations.append(
-                pymongo.UpdateOne(
-                    {'game_id': game_id},
-                    {'$set': moneyline_doc},
-                    upsert=True
-                )
-            )
+def process_and_store_odds(odds_data, sport_key, batch_size=INGEST_BATCH_SIZE):
+    """
+    Processes odds data and stores it in MongoDB.
+    Modified to handle future games better.
+    :param batch_size: Upserts sent per bulk_write.
+    :return: Number of games written.
+    """
+    current_time = datetime.now(timezone.utc)
 
-            logger.info(f"Processed game: {home_team} vs {away_team} on {commence_time}")
+    moneyline_docs = [build_moneyline_doc(event, sport_key, current_time) for event in odds_data]
+    moneyline_docs = [doc for doc in moneyline_docs if doc is not None]
+    try:
+        # Current ratings going into each game, for the cards (see ratings.py)
+        ratings.stamp_games(moneyline_docs)
+    except Exception as e:
+        logger.error(f"Error stamping ratings: {e}")
 
-        except Exception as e:
-            logger.error(f"Error processing event {event.get('id', 'Unknown')}: {e}")
-            continue
+    def upsert(moneyline_doc):
+        return pymongo.UpdateOne({'game_id': moneyline_doc['game_id']}, {'$set': moneyline_doc}, upsert=True)
 
-    # Execute bulk operations if any
-    if operations:
+    # Execute bulk writes in batches; each upsert targets its own game_id, so order doesn't matter
+    written = 0
+    for start in range(0, len(moneyline_docs), max(1, batch_size)):
+        batch = moneyline_docs[start:start + max(1, batch_size)]
         try:
-            result = moneylines_collection.bulk_write(operations)
-            logger.info(f"Processed {len(operations)} games for {SPORTS[sport_key]}")
-            logger.info(f"Updated: {result.modified_count}, Inserted: {result.upserted_count}")
+            # Games of archived seasons are updated in their archive (see archive.py)
+            inserted, modified = write_games(batch, upsert, moneylines_collection)
+            written += len(batch)
+            logger.info(f"Updated: {modified}, Inserted: {inserted}")
         except Exception as e:
             logger.error(f"Bulk write error: {e}")
+    if moneyline_docs:
+        logger.info(f"Processed {written} of {len(moneyline_docs)} games for {SPORTS[sport_key]}")
+
+    return written
 
 def get_league_name(sport_key):
     """
@@ -188,18 +188,25 @@ def get_league_name(sport_key):
 
 # --------------------- Main Execution Flow ---------------------
 def main():
-    # Get all configured sports, including MLB
-    sports_to_fetch = list(SPORTS.keys())  # Now includes 'baseball_mlb'
+    # Only in-season sports, most valuable first, within the remaining quota
+    plan = quota_planner.plan_calls('odds', log=logger)
+    sports_to_fetch = [call['sport_key'] for call in plan['calls']]
 
+    updated_sports = []
     for sport_key in sports_to_fetch:
         logger.info(f"Fetching odds for {SPORTS[sport_key]}")
         odds_data = fetch_moneyline_odds(sport_key)
         if odds_data:
-            process_and_store_odds(odds_data, sport_key)
+            if process_and_store_odds(odds_data, sport_key):
+                updated_sports.append(SPORTS[sport_key])
         else:
             logger.warning(f"No odds data fetched for sport: {SPORTS[sport_key]}")
 
-    client.close()
+    # Post-ingest: rebuild the day slates the new odds appear on
+    if updated_sports:
+        slates.refresh_slates(sports=updated_sports)
+
+    close_client()
     logger.info("MongoDB connection closed.")
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+"""
+Fragment cache for rendered game cards.
+
+A game card (game_view.html) comes out the same for every viewer in a
+timezone until the data behind it changes, so pages render each card once and
+reuse the HTML. Templates call `{{ game_card(game) }}` instead of including
+game_view.html. Cards are keyed by (game_id, last_updated, timezone), where
+last_updated is the data watermark the page was validated at (`data_version`
+in the template context). Using the page's watermark rather than the game's
+own last_updated matters because a card also shows as-of stats, form and
+head-to-head records that change when *other* games complete; for days that
+have ended, the watermark includes the newest completed game for that reason
+(see app.get_slate_last_updated). Pages rendered
+without a watermark (e.g. from last good data during an outage) render their
+cards directly.
+
+Each response carries a Server-Timing header with the request's fragment hits,
+misses and time saved. /admin/slow_queries shows the process totals.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, session
+from jinja2 import pass_context
+from markupsafe import Markup
+
+from config import FRAGMENT_CACHE_MAX_ENTRIES
+
+class FragmentCache:
+    """Bounded LRU of rendered HTML, with render-time accounting."""
+
+    def __init__(self, max_entries=FRAGMENT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.render_seconds = 0.0  # Spent rendering misses
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+            self._entries[key] = html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def average_render_seconds(self):
+        return self.render_seconds / self.misses if self.misses else 0.0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups * 100 if lookups else 0,
+            'average_render_ms': self.average_render_seconds() * 1000,
+            'saved_ms': self.hits * self.average_render_seconds() * 1000
+        }
+
+fragment_cache = FragmentCache()
+
+# --------------------- Rendering ---------------------
+def render_fragment(context, template_name, key, **variables):
+    """
+    Renders a template with the calling template's context plus `variables`,
+    as {% include %} would, reusing the HTML rendered for the same key.
+    :param key: Cache key, or None to render without caching.
+    """
+    counts = g.setdefault('fragments', {'hits': 0, 'misses': 0, 'render_seconds': 0.0})
+    if key is not None:
+        html = fragment_cache.get(key)
+        if html is not None:
+            fragment_cache.hits += 1
+            counts['hits'] += 1
+            return html
+
+    started = time.perf_counter()
+    template = context.environment.get_template(template_name)
+    html = Markup(template.render(dict(context.get_all(), **variables)))
+    elapsed = time.perf_counter() - started
+    counts['misses'] += 1
+    counts['render_seconds'] += elapsed
+    if key is not None:
+        fragment_cache.misses += 1
+        fragment_cache.render_seconds += elapsed
+        fragment_cache.set(key, html)
+    return html
+
+@pass_context
+def game_card(context, game):
+    """`{{ game_card(game) }}`: game_view.html for one game, cached as described above."""
+    version = context.get('data_version')
+    key = None
+    if version is not None and not context.get('data_as_of') and game.get('game_id'):
+        timezone = context.get('timezone') or session.get('timezone', 'UTC')
+        key = ('game_view.html', game['game_id'], version.isoformat(), timezone)
+    return render_fragment(context, 'game_view.html', key, game=game)
+
+def init_fragments(app):
+    app.jinja_env.globals['game_card'] = game_card
+
+    @app.after_request
+    def _add_fragment_timing(response):
+        counts = g.get('fragments')
+        if counts:
+            saved = counts['hits'] * fragment_cache.average_render_seconds() * 1000
+            response.headers.add(
+                'Server-Timing',
+                f'fragments;dur={counts["render_seconds"] * 1000:.1f};'
+                f'desc="{counts["hits"]} hits, {counts["misses"]} misses, ~{saved:.0f}ms saved"'
+            )
+        return response
@@ -0,0 +1,327 @@
+"""
+Cross-worker cache invalidation.
+
+Each web worker runs one background thread that follows changes to
+`moneylines` and publishes typed events to the in-process caches subscribed
+to them, so those caches can keep long TTLs and still drop entries as soon as
+`fetch_moneylines` or `update_game_results` (in another process) write.
+
+- GAME_CHANGED: any game was inserted, updated or deleted.
+- TEAM_STATS_CHANGED: a completed game changed (or a game's result did), so
+  its teams' stats did too.
+- TEAM_LIST_CHANGED: a game was inserted or deleted; the team list may differ.
+
+Changes come from a change stream where the server supports one (replica sets
+and Atlas). A standalone mongod has none, so the thread falls back to polling
+for documents whose `last_updated` reached the newest one it has seen
+(skipping the ones already published at that timestamp).
+An event with `teams=None` means "unknown teams": subscribers drop everything.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+import pymongo
+
+from config import INVALIDATION_MODE, INVALIDATION_POLL_SECONDS, DATA_CACHE_TTL
+from db import get_collection
+
+logger = logging.getLogger(__name__)
+
+GAME_CHANGED = 'game_changed'
+TEAM_STATS_CHANGED = 'team_stats_changed'
+TEAM_LIST_CHANGED = 'team_list_changed'
+EVENT_KINDS = (GAME_CHANGED, TEAM_STATS_CHANGED, TEAM_LIST_CHANGED)
+
+InvalidationEvent = namedtuple('InvalidationEvent', ['kind', 'game_id', 'sport', 'teams'])
+
+RETRY_SECONDS = 5
+POLL_BATCH = 1000
+WATCH_FIELDS = ['game_id', 'sport', 'status', 'teams.home.name', 'teams.away.name', 'last_updated']
+STATS_FIELDS = {'status', 'result'}
+
+moneylines_collection = get_collection('moneylines')
+
+# --------------------- Bus ---------------------
+class InvalidationBus:
+    """In-process publish/subscribe for invalidation events."""
+
+    def __init__(self):
+        self.subscribers = {kind: [] for kind in EVENT_KINDS}
+        self.published = {kind: 0 for kind in EVENT_KINDS}
+
+    def subscribe(self, kind, handler):
+        """:param handler: Called with each InvalidationEvent of this kind."""
+        self.subscribers[kind].append(handler)
+
+    def publish(self, event):
+        self.published[event.kind] += 1
+        for handler in self.subscribers[event.kind]:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Invalidation handler failed for {event.kind}: {e}")
+
+    def publish_all(self):
+        """Tells every subscriber to drop everything (used after missing changes)."""
+        for kind in EVENT_KINDS:
+            self.publish(InvalidationEvent(kind, None, None, None))
+
+bus = InvalidationBus()
+
+def events_for_game(operation, game, updated_fields=None):
+    """
+    Maps one changed game to the events it implies.
+    :param operation: Change stream operationType, or 'poll' when the kind of change is unknown.
+    :param game: The game document (or the fields of it that are known).
+    :param updated_fields: Field paths an 'update' changed, when known.
+    """
+    game = game or {}
+    teams = game.get('teams', {})
+    names = tuple(
+        name for name in (teams.get('home', {}).get('name'), teams.get('away', {}).get('name')) if name
+    ) or None
+    game_id, sport = game.get('game_id'), game.get('sport')
+
+    events = [InvalidationEvent(GAME_CHANGED, game_id, sport, names)]
+    # Stats only count completed games, but a game can also stop being one
+    result_changed = any(field.split('.')[0] in STATS_FIELDS for field in updated_fields or ())
+    if operation in ('delete', 'poll') or game.get('status') == 'Completed' or result_changed:
+        events.append(InvalidationEvent(TEAM_STATS_CHANGED, game_id, sport, names))
+    # Polling can't tell inserts from updates; team list subscribers check names themselves
+    if operation in ('insert', 'replace', 'delete', 'poll'):
+        events.append(InvalidationEvent(TEAM_LIST_CHANGED, game_id, sport, names))
+    return events
+
+# --------------------- Watcher ---------------------
+class ChangeStreamsUnsupported(Exception):
+    pass
+
+class InvalidationWatcher:
+    """Background thread following moneylines changes; one per process."""
+
+    def __init__(self, mode=INVALIDATION_MODE, poll_seconds=INVALIDATION_POLL_SECONDS):
+        self.mode = mode
+        self.poll_seconds = poll_seconds
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.source = None  # 'change_stream' or 'poll' once running
+        self.resume_token = None
+
+    def start(self):
+        if self.mode == 'off':
+            return
+        pid = os.getpid()
+        if self.pid == pid and self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.pid != pid or not (self.thread and self.thread.is_alive()):
+                self.pid = pid
+                self.thread = threading.Thread(target=self.run, name='cache-invalidation', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        first = True
+        while True:
+            if not first:
+                # Changes may have been missed while reconnecting
+                bus.publish_all()
+            first = False
+            try:
+                if self.mode == 'poll':
+                    self.poll()
+                else:
+                    self.watch()
+            except ChangeStreamsUnsupported:
+                logger.info("Change streams unavailable; polling last_updated for invalidation.")
+                self.mode = 'poll'
+            except pymongo.errors.PyMongoError as e:
+                logger.warning(f"Invalidation watcher lost its connection: {e}")
+                time.sleep(RETRY_SECONDS)
+            except Exception as e:
+                logger.error(f"Invalidation watcher failed: {e}")
+                time.sleep(RETRY_SECONDS)
+
+    def watch(self):
+        """Follows the change stream, resuming after the last change seen, until it errors."""
+        pipeline = [{'$project': {
+            'operationType': 1, 'documentKey': 1, 'updateDescription.updatedFields': 1,
+            **{f'fullDocument.{field}': 1 for field in WATCH_FIELDS}
+        }}]
+        try:
+            stream = moneylines_collection.watch(pipeline, full_document='updateLookup', resume_after=self.resume_token)
+        except pymongo.errors.OperationFailure as e:
+            # 40573: "The $changeStream stage is only supported on replica sets"
+            if e.code in (40573, 40324) or 'replica set' in str(e):
+                raise ChangeStreamsUnsupported() from e
+            if self.resume_token is not None:  # Token fell off the oplog; start over from now
+                self.resume_token = None
+                return
+            raise
+
+        self.source = 'change_stream'
+        with stream:
+            for change in stream:
+                updated_fields = change.get('updateDescription', {}).get('updatedFields', {})
+                for event in events_for_game(change.get('operationType'), change.get('fullDocument'), updated_fields):
+                    bus.publish(event)
+                self.resume_token = stream.resume_token
+
+    def poll(self):
+        """
+        Publishes events for games whose last_updated reaches the newest seen.
+        A writer stamps a whole run with one timestamp and writes it in
+        batches, so a poll can land between two batches sharing the boundary
+        timestamp. The poll therefore matches that timestamp too and skips the
+        games already seen at it.
+        """
+        self.source = 'poll'
+        latest = moneylines_collection.find_one({}, {'last_updated': 1}, sort=[('last_updated', pymongo.DESCENDING)])
+        watermark = (latest or {}).get('last_updated') or datetime.min
+        seen = set()  # _ids already published at the watermark
+        if latest and latest.get('last_updated'):
+            seen = {game['_id'] for game in moneylines_collection.find({'last_updated': watermark}, {'_id': 1})}
+        while True:
+            time.sleep(self.poll_seconds)
+            changed = list(moneylines_collection.find(
+                {'last_updated': {'$gte': watermark}, '_id': {'$nin': list(seen)}},
+                {field: 1 for field in WATCH_FIELDS}
+            ).sort([('last_updated', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)]).limit(POLL_BATCH))
+            for game in changed:
+                if game['last_updated'] > watermark:
+                    watermark = game['last_updated']
+                    seen = set()
+                seen.add(game['_id'])
+            if len(changed) == POLL_BATCH:
+                # A bulk ingest; cheaper to drop everything than to publish each game
+                bus.publish_all()
+                continue
+            for game in changed:
+                for event in events_for_game('poll', game):
+                    bus.publish(event)
+
+watcher = InvalidationWatcher()
+
+def init_invalidation(app):
+    """Starts this worker's watcher on its first request (after any fork)."""
+    @app.before_request
+    def _start_invalidation_watcher():
+        watcher.start()
+
+# --------------------- Caches ---------------------
+class InvalidatedCache:
+    """
+    Bounded LRU cache whose entries carry tags (e.g. lower-cased team names)
+    and are dropped by invalidation events instead of waiting out their TTL.
+    A TTL of 0 disables the cache.
+    :param backing: Optional second tier (a disk_cache.DiskCache) that misses
+                    fall through to and every set writes through to.
+    """
+
+    def __init__(self, name, ttl=DATA_CACHE_TTL, max_entries=10000, backing=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backing = backing
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tagged = {}               # tag -> set of keys
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+        if self.backing is None or self.ttl <= 0:
+            return None
+        stored = self.backing.get(self.name, key)
+        if stored is None:
+            return None
+        value, tags = stored
+        self._store(key, value, tags)
+        return value
+
+    def set(self, key, value, tags=()):
+        if self.ttl <= 0:
+            return
+        self._store(key, value, tags)
+        if self.backing is not None:
+            self.backing.set(self.name, key, value, tags)
+
+    def load(self, predicate=None):
+        """
+        Fills the cache from its backing tier (used to warm up at boot).
+        :param predicate: Optional filter on keys.
+        :return: Number of entries loaded.
+        """
+        if self.backing is None or self.ttl <= 0:
+            return 0
+        loaded = 0
+        for key, value, tags in self.backing.entries(self.name):
+            if predicate is None or predicate(key):
+                self._store(key, value, tags)
+                loaded += 1
+        return loaded
+
+    def _store(self, key, value, tags):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            elif len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = (time.monotonic() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tagged.clear()
+
+    def subscribe(self, kind, tags_for=None):
+        """
+        Drops entries when an event of `kind` is published.
+        :param tags_for: Maps an event to the tags to drop; without it, or when
+                         the event's teams are unknown, the whole cache is cleared.
+        """
+        def handler(event):
+            if tags_for is None or event.teams is None:
+                self.clear()
+            else:
+                self.invalidate_tags(tags_for(event))
+        bus.subscribe(kind, handler)
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+def team_tags(event):
+    """Tags for the teams in an event, matching how the stats functions key teams."""
+    return [name.strip().lower() for name in event.teams]
@@ -0,0 +1,213 @@
+"""
+Head-to-head records for every pair of teams that has met.
+
+Each pair is one document keyed by the sorted pair of team keys, so a whole
+slate's matchups are a single $in lookup on _id. update_game_results adds each
+game as it completes; `python matchups.py --rebuild` recomputes everything from
+completed games.
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+
+import pymongo
+
+from db import get_collection, close_client
+from archive import moneylines as moneylines_collection
+from normalize import team_key, favorite_side, consensus_moneyline
+
+logger = logging.getLogger('Matchups')
+
+matchups_collection = get_collection('matchups')
+
+RECORD_FIELDS = ('wins', 'favored_games', 'favored_wins', 'underdog_games', 'underdog_wins')
+
+# --------------------- Keys ---------------------
+def pair_key(team_a, team_b):
+    """
+    Order-independent key for a pair of teams.
+    :return: 'key_a|key_b' with the team keys sorted, or None if either is missing.
+    """
+    key_a, key_b = team_key(team_a), team_key(team_b)
+    if not key_a or not key_b:
+        return None
+    return '|'.join(sorted([key_a, key_b]))
+
+def pair_slots(home_team, away_team):
+    """
+    Maps each side of a game to its slot in the pair document: 'a' holds the
+    team whose key sorts first, 'b' the other.
+    """
+    if team_key(home_team) <= team_key(away_team):
+        return {'home': 'a', 'away': 'b'}
+    return {'home': 'b', 'away': 'a'}
+
+def empty_record():
+    return {field: 0 for field in RECORD_FIELDS}
+
+# --------------------- Writes ---------------------
+def game_increments(game, winner):
+    """
+    Returns the $inc document a completed game contributes to its pair.
+    :param game: Moneylines document (teams and moneylines are read from it).
+    :param winner: Name of the winning team.
+    """
+    teams = game.get('teams', {})
+    home_team = teams.get('home', {}).get('name')
+    away_team = teams.get('away', {}).get('name')
+    slots = pair_slots(home_team, away_team)
+    favorite = favorite_side(consensus_moneyline(teams.get('home', {})), consensus_moneyline(teams.get('away', {})))
+
+    increments = {'games': 1}
+    for side, team in (('home', home_team), ('away', away_team)):
+        slot = slots[side]
+        won = team_key(winner) == team_key(team)
+        increments[f'{slot}.wins'] = int(won)
+        if favorite:
+            role = 'favored' if favorite == side else 'underdog'
+            increments[f'{slot}.{role}_games'] = 1
+            increments[f'{slot}.{role}_wins'] = int(won)
+    return increments
+
+def matchup_operations(game, winner):
+    """
+    Builds the writes that add one completed game to its pair's record.
+    The first creates the pair document if needed; the second only matches
+    while the game isn't yet listed in game_ids, so replaying a result after a
+    partial failure never counts it twice.
+    """
+    teams = game.get('teams', {})
+    home_team = teams.get('home', {}).get('name')
+    away_team = teams.get('away', {}).get('name')
+    key = pair_key(home_team, away_team)
+    if not key or not game.get('game_id') or not winner:
+        return []
+
+    slots = pair_slots(home_team, away_team)
+    names = {slots['home']: home_team, slots['away']: away_team}
+    created = {'games': 0, 'game_ids': [], 'sport': game.get('sport')}
+    for slot in ('a', 'b'):
+        created[slot] = dict(empty_record(), key=team_key(names[slot]), name=names[slot])
+
+    return [
+        pymongo.UpdateOne({'_id': key}, {'$setOnInsert': created}, upsert=True),
+        pymongo.UpdateOne(
+            {'_id': key, 'game_ids': {'$ne': game['game_id']}},
+            {
+                '$inc': game_increments(game, winner),
+                '$push': {'game_ids': game['game_id']},
+                '$max': {'last_game_date': game.get('event_date')},
+                '$set': {'last_updated': datetime.now(timezone.utc)},
+            }
+        ),
+    ]
+
+def record_results(completed):
+    """
+    Adds completed games to the head-to-head store in one bulk write.
+    :param completed: Iterable of (game document, winner name).
+    :return: Number of pair records updated.
+    """
+    operations = []
+    for game, winner in completed:
+        operations.extend(matchup_operations(game, winner))
+    if not operations:
+        return 0
+    # Ordered: each pair's upsert must land before its increment
+    result = matchups_collection.bulk_write(operations, ordered=True)
+    return result.modified_count
+
+# --------------------- Reads ---------------------
+def get_matchups(pairs):
+    """
+    Looks up head-to-head records for many pairs in one query.
+    :param pairs: Iterable of (team_a, team_b).
+    :return: Dict of pair_key -> pair document (pairs that never met are absent).
+    """
+    keys = {pair_key(team_a, team_b) for team_a, team_b in pairs}
+    keys.discard(None)
+    if not keys:
+        return {}
+    return {doc['_id']: doc for doc in matchups_collection.find({'_id': {'$in': list(keys)}}, {'game_ids': 0})}
+
+def team_record(matchup, team):
+    """
+    One team's side of a pair document, with losses derived from the game count.
+    :return: Dict of games, wins, losses and favored/underdog splits (zeros if
+             the teams haven't met).
+    """
+    record = empty_record()
+    games = 0
+    if matchup:
+        games = matchup.get('games', 0)
+        slot = 'a' if matchup.get('a', {}).get('key') == team_key(team) else 'b'
+        record.update({field: matchup.get(slot, {}).get(field, 0) for field in RECORD_FIELDS})
+    record['games'] = games
+    record['losses'] = games - record['wins']
+    return record
+
+# --------------------- Rebuild ---------------------
+def rebuild_matchups(batch_size=1000):
+    """
+    Recomputes every pair from completed games and replaces the stored records.
+    Pairs are accumulated in memory; there are at most a few thousand per sport.
+    """
+    pairs = {}
+    cursor = moneylines_collection.find(
+        {'status': 'Completed', 'result.winner': {'$nin': [None, '']}},
+        {'game_id': 1, 'sport': 1, 'event_date': 1, 'teams': 1, 'result.winner': 1}
+    ).batch_size(batch_size)
+
+    for game in cursor:
+        teams = game.get('teams', {})
+        home_team = teams.get('home', {}).get('name')
+        away_team = teams.get('away', {}).get('name')
+        key = pair_key(home_team, away_team)
+        if not key or not game.get('game_id'):
+            continue
+
+        if key not in pairs:
+            slots = pair_slots(home_team, away_team)
+            names = {slots['home']: home_team, slots['away']: away_team}
+            pairs[key] = {'_id': key, 'games': 0, 'game_ids': [], 'sport': game.get('sport'), 'last_game_date': None}
+            for slot in ('a', 'b'):
+                pairs[key][slot] = dict(empty_record(), key=team_key(names[slot]), name=names[slot])
+
+        pair = pairs[key]
+        if game['game_id'] in pair['game_ids']:
+            continue
+        for field, amount in game_increments(game, game['result']['winner']).items():
+            if '.' in field:
+                slot, name = field.split('.')
+                pair[slot][name] += amount
+            else:
+                pair[field] += amount
+        pair['game_ids'].append(game['game_id'])
+        event_date = game.get('event_date')
+        if event_date and (pair['last_game_date'] is None or event_date > pair['last_game_date']):
+            pair['last_game_date'] = event_date
+
+    now = datetime.now(timezone.utc)
+    operations = [pymongo.ReplaceOne({'_id': key}, dict(pair, last_updated=now), upsert=True) for key, pair in pairs.items()]
+    for start in range(0, len(operations), batch_size):
+        matchups_collection.bulk_write(operations[start:start + batch_size], ordered=False)
+    matchups_collection.delete_many({'_id': {'$nin': list(pairs)}})
+    logger.info(f"Rebuilt {len(pairs)} head-to-head records")
+    return len(pairs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain head-to-head records")
+    parser.add_argument('--rebuild', action='store_true', help="Recompute every pair from completed games")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        if args.rebuild:
+            rebuild_matchups()
+        else:
+            parser.print_help()
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Applies pending data migrations (see the migrations package) in order.
+
+    python migrate.py --status
+    python migrate.py --dry-run
+    python migrate.py --batch-size 1000 --throttle-ms 100
+    python migrate.py --only 0001 --force
+"""
+import argparse
+import logging
+import sys
+
+from migrations import MIGRATIONS, get_migration
+from migrations.runner import list_states, run_migration
+from db import close_client
+
+# --------------------- Logging Configuration ---------------------
+logger = logging.getLogger('Migrations')
+logger.setLevel(logging.INFO)
+
+ch = logging.StreamHandler()
+ch.setLevel(logging.INFO)
+
+formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+ch.setFormatter(formatter)
+
+logger.addHandler(ch)
+
+# --------------------- Commands ---------------------
+def print_status():
+    states = list_states()
+    for migration in MIGRATIONS:
+        state = states.get(migration.id, {})
+        status = state.get('status', 'pending')
+        detail = f"scanned {state.get('scanned', 0)}, modified {state.get('modified', 0)}" if state else ''
+        print(f"{migration.id:<32}{status:<10}{detail}")
+
+def migrate(only=None, batch_size=500, throttle_ms=50, dry_run=False, force=False):
+    """
+    Runs every pending migration, or just `only`, stopping at the first failure
+    so later migrations never run against half-migrated data.
+    :return: True if everything requested completed.
+    """
+    migrations = MIGRATIONS
+    if only:
+        migration = get_migration(only)
+        if migration is None:
+            logger.error(f"Unknown migration: {only}")
+            return False
+        migrations = [migration]
+
+    for migration in migrations:
+        logger.info(f"{'[dry run] ' if dry_run else ''}{migration.id}: {migration.description}")
+        try:
+            run_migration(migration, batch_size=batch_size, throttle_ms=throttle_ms, dry_run=dry_run, force=force)
+        except Exception as e:
+            logger.error(f"Migration {migration.id} failed: {e}. Rerun to resume from its last batch.")
+            return False
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply PickRecorder data migrations")
+    parser.add_argument('--status', action='store_true', help="Show applied/pending migrations and exit")
+    parser.add_argument('--dry-run', action='store_true', help="Count documents that would change without writing")
+    parser.add_argument('--only', help="Run a single migration by id or number")
+    parser.add_argument('--force', action='store_true', help="Rerun migrations already recorded as applied")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--throttle-ms', type=int, default=50, help="Pause between batches")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.status:
+            print_status()
+            return 0
+        ok = migrate(only=args.only, batch_size=args.batch_size, throttle_ms=args.throttle_ms,
+                     dry_run=args.dry_run, force=args.force)
+        return 0 if ok else 1
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    sys.exit(main())
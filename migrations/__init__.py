@@ -0,0 +1,22 @@
+"""
+Versioned data migrations, applied in order by migrate.py.
+Add a new migration as the next numbered module and append it to MIGRATIONS;
+never renumber or edit one that has shipped.
+"""
+from migrations.m0001_normalize_sport_names import NormalizeSportNames
+from migrations.m0002_clean_up_fields import CleanUpFields
+from migrations.m0003_backfill_team_keys import BackfillTeamKeys
+from migrations.m0004_mark_unresolved_games import MarkUnresolvedGames
+
+MIGRATIONS = [
+    NormalizeSportNames(),
+    CleanUpFields(),
+    BackfillTeamKeys(),
+    MarkUnresolvedGames(),
+]
+
+def get_migration(migration_id):
+    for migration in MIGRATIONS:
+        if migration.id == migration_id or migration.id.split('_', 1)[0] == migration_id:
+            return migration
+    return None
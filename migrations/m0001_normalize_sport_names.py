@@ -0,0 +1,26 @@
+from config import SPORTS
+from normalize import canonical_sport
+from migrations.runner import Migration
+
+class NormalizeSportNames(Migration):
+    """
+    Rewrites sport and league spellings ("nba", "basketball_nba", ...) to the
+    config.SPORTS display name. Only documents whose sport isn't already
+    canonical are scanned.
+    """
+    id = '0001_normalize_sport_names'
+    description = 'Normalize sport/league names to config.SPORTS values'
+    filter = {'$or': [
+        {'sport': {'$nin': list(SPORTS.values())}},
+        {'league': {'$exists': True, '$nin': list(SPORTS.values())}},
+    ]}
+    projection = {'sport': 1, 'league': 1}
+
+    def transform(self, doc):
+        changes = {}
+        for field in ('sport', 'league'):
+            value = doc.get(field)
+            canonical = canonical_sport(value)
+            if canonical and canonical != value:
+                changes[field] = canonical
+        return {'$set': changes} if changes else None
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+from normalize import parse_moneyline
+from migrations.runner import Migration
+
+def _parse_datetime(value):
+    for fmt in ('%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%d %H:%M:%S'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+            return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+class CleanUpFields(Migration):
+    """
+    Fixes legacy field shapes the read paths otherwise coerce on every request:
+    string event_date / last_updated, string moneylines, and team and winner
+    names with stray whitespace.
+    """
+    id = '0002_clean_up_fields'
+    description = 'Coerce string dates/moneylines and strip team names'
+    projection = {'event_date': 1, 'last_updated': 1, 'teams': 1, 'result.winner': 1}
+
+    def transform(self, doc):
+        changes = {}
+        for field in ('event_date', 'last_updated'):
+            value = doc.get(field)
+            if isinstance(value, str):
+                parsed = _parse_datetime(value)
+                if parsed:
+                    changes[field] = parsed
+
+        for side in ('home', 'away'):
+            team = (doc.get('teams') or {}).get(side) or {}
+            name = team.get('name')
+            if isinstance(name, str) and name != name.strip():
+                changes[f'teams.{side}.name'] = name.strip()
+            moneyline = team.get('moneyline')
+            if isinstance(moneyline, str):
+                parsed = parse_moneyline(moneyline)
+                if parsed is not None:
+                    changes[f'teams.{side}.moneyline'] = parsed
+
+        winner = (doc.get('result') or {}).get('winner')
+        if isinstance(winner, str) and winner != winner.strip():
+            changes['result.winner'] = winner.strip()
+
+        return {'$set': changes} if changes else None
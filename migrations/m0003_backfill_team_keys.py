@@ -0,0 +1,24 @@
+from normalize import team_key
+from migrations.runner import Migration
+
+class BackfillTeamKeys(Migration):
+    """
+    Adds teams.home.key / teams.away.key (see normalize.team_key) to games
+    written before fetch_moneylines started storing them.
+    """
+    id = '0003_backfill_team_keys'
+    description = 'Backfill normalized team keys'
+    filter = {'$or': [
+        {'teams.home.key': {'$exists': False}},
+        {'teams.away.key': {'$exists': False}},
+    ]}
+    projection = {'teams': 1}
+
+    def transform(self, doc):
+        changes = {}
+        for side in ('home', 'away'):
+            team = (doc.get('teams') or {}).get(side) or {}
+            key = team_key(team.get('name'))
+            if key and team.get('key') != key:
+                changes[f'teams.{side}.key'] = key
+        return {'$set': changes} if changes else None
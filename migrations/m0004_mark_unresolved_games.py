@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta, timezone
+
+from quota_planner import MAX_DAYS_FROM
+from migrations.runner import Migration
+
+class MarkUnresolvedGames(Migration):
+    """
+    Marks games backfilled without scores, and now too old for the scores
+    endpoint, as 'No Result' so update_game_results stops looking for them.
+    """
+    id = '0004_mark_unresolved_games'
+    description = "Mark past games without scores as 'No Result'"
+    filter = {'result.winner': None, 'status': {'$nin': ['Completed', 'No Result']}}
+    projection = {'event_date': 1}
+
+    def transform(self, doc):
+        event_date = doc.get('event_date')
+        if not isinstance(event_date, datetime):
+            return None
+        if event_date.tzinfo is None:
+            event_date = event_date.replace(tzinfo=timezone.utc)
+        if event_date >= datetime.now(timezone.utc) - timedelta(days=MAX_DAYS_FROM):
+            return None  # Still within reach of the scores endpoint
+        return {'$set': {'status': 'No Result'}}
@@ -0,0 +1,113 @@
+import logging
+import time
+from datetime import datetime, timezone
+
+import pymongo
+
+from db import get_collection
+
+logger = logging.getLogger('Migrations')
+
+migrations_collection = get_collection('migrations')
+
+# --------------------- Migration Base ---------------------
+class Migration:
+    """
+    A versioned, idempotent document migration.
+    Subclasses set `id`, `description`, and optionally `collection`, `filter`
+    and `projection`, and implement `transform`. The runner walks matching
+    documents in _id order, so a run can stop anywhere and resume from the
+    last _id it recorded.
+    """
+    id = None
+    description = ''
+    collection = 'moneylines'
+    filter = {}
+    projection = None
+
+    def transform(self, doc):
+        """
+        :return: A MongoDB update document for this doc, or None if it is
+                 already in the desired state. Must be safe to re-apply.
+        """
+        raise NotImplementedError
+
+# --------------------- State ---------------------
+def get_state(migration_id):
+    return migrations_collection.find_one({'_id': migration_id})
+
+def save_state(migration, **fields):
+    migrations_collection.update_one(
+        {'_id': migration.id},
+        {'$set': dict(fields, description=migration.description, updated_at=datetime.now(timezone.utc))},
+        upsert=True
+    )
+
+def list_states():
+    return {state['_id']: state for state in migrations_collection.find()}
+
+# --------------------- Runner ---------------------
+def run_migration(migration, batch_size=500, throttle_ms=50, dry_run=False, force=False):
+    """
+    Applies a migration in _id-range batches, pausing throttle_ms between
+    batches to leave room for live traffic.
+
+    :param dry_run: Count documents scanned and documents that would change,
+                    without writing data or recording state.
+    :param force: Run again even if the migration is recorded as applied.
+    :return: Dict with scanned and modified (or would_modify) counts.
+    """
+    state = get_state(migration.id) or {}
+    if state.get('status') == 'applied' and not force:
+        logger.info(f"{migration.id} already applied; skipping.")
+        return {'scanned': 0, 'modified': 0, 'skipped': True}
+
+    collection = get_collection(migration.collection)
+    resuming = state.get('status') == 'running' and not force
+    last_id = state.get('last_id') if resuming else None
+    scanned = state.get('scanned', 0) if resuming else 0
+    modified = state.get('modified', 0) if resuming else 0
+    if last_id is not None:
+        logger.info(f"Resuming {migration.id} after _id {last_id}")
+    if not dry_run:
+        save_state(migration, status='running', last_id=last_id, scanned=scanned, modified=modified,
+                   started_at=state.get('started_at') if resuming else datetime.now(timezone.utc))
+
+    while True:
+        query = dict(migration.filter)
+        if last_id is not None:
+            query = {'$and': [migration.filter, {'_id': {'$gt': last_id}}]}
+        batch = list(collection.find(query, migration.projection).sort('_id', pymongo.ASCENDING).limit(batch_size))
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            update = migration.transform(doc)
+            if update:
+                operations.append(pymongo.UpdateOne({'_id': doc['_id']}, update))
+        scanned += len(batch)
+        last_id = batch[-1]['_id']
+
+        if dry_run:
+            modified += len(operations)
+        else:
+            if operations:
+                result = collection.bulk_write(operations, ordered=False)
+                modified += result.modified_count
+            save_state(migration, status='running', last_id=last_id, scanned=scanned, modified=modified)
+
+        logger.info(f"{migration.id}: scanned {scanned}, {'would modify' if dry_run else 'modified'} {modified}")
+        if len(batch) < batch_size:
+            break
+        if throttle_ms:
+            time.sleep(throttle_ms / 1000)
+
+    if dry_run:
+        logger.info(f"[dry run] {migration.id}: {scanned} documents scanned, {modified} would change")
+        return {'scanned': scanned, 'would_modify': modified}
+
+    save_state(migration, status='applied', last_id=None, scanned=scanned, modified=modified,
+               applied_at=datetime.now(timezone.utc))
+    logger.info(f"{migration.id} applied: {scanned} documents scanned, {modified} modified")
+    return {'scanned': scanned, 'modified': modified}
@@ -1,17 +1,76 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from pymongo import MongoClient
-import os
+from pymongo import ASCENDING
+import logging
+import threading
+import time
 
-client = MongoClient(os.getenv('MONGO_URI'))
-db = client.users
-users = db.user_info
+from config import USER_CACHE_TTL, ADMIN_USERNAMES
+from db import get_collection, USERS_DB
+
+logger = logging.getLogger(__name__)
+
+users = get_collection('user_info', database_name=USERS_DB)
+
+def ensure_user_indexes():
+    """
+    Usernames are the login key and the Flask-Login id, so they must be unique.
+    """
+    try:
+        users.create_index([('username', ASCENDING)], unique=True)
+    except Exception as e:
+        logger.error(f"Error creating user indexes: {e}")
+
+class UserCache:
+    """
+    Small in-process TTL cache of loaded users so the per-request user_loader
+    doesn't hit MongoDB on every page view.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return None
+            return user
+
+    def set(self, username, user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries and username not in self._entries:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                del self._entries[oldest]
+            self._entries[username] = (time.monotonic() + self.ttl, user)
+
+    def invalidate(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache()
 
 class User(UserMixin):
-    def __init__(self, username, email, password_hash=None):
+    def __init__(self, username, email, password_hash=None, is_admin=False):
         self.username = username
         self.email = email
         self.password_hash = password_hash
+        # Admins see diagnostics pages; set is_admin on the user document or list them in ADMIN_USERNAMES
+        self.is_admin = is_admin or username in ADMIN_USERNAMES
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -25,17 +84,25 @@ class User(UserMixin):
             'email': self.email,
             'password_hash': self.password_hash
         })
+        user_cache.invalidate(self.username)
 
     @staticmethod
     def get(username):
+        cached = user_cache.get(username)
+        if cached is not None:
+            return cached
+
         user_data = users.find_one({'username': username})
         if user_data:
-            return User(
+            user = User(
                 username=user_data['username'],
                 email=user_data['email'],
-                password_hash=user_data['password_hash']
+                password_hash=user_data['password_hash'],
+                is_admin=user_data.get('is_admin', False)
             )
+            user_cache.set(username, user)
+            return user
         return None
 
     def get_id(self):
-        return self.username
\ No newline at end of file
+        return self.username
@@ -0,0 +1,68 @@
+import re
+
+from config import SPORTS, SEASON_START_MONTHS
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+def _compact(value):
+    return _NON_ALNUM.sub('', str(value).lower())
+
+# Every spelling seen in the wild, compacted: "NBA", "basketball_nba", "Basketball NBA", ...
+_SPORT_ALIASES = {}
+for _sport_key, _sport_name in SPORTS.items():
+    _SPORT_ALIASES[_compact(_sport_name)] = _sport_name
+    _SPORT_ALIASES[_compact(_sport_key)] = _sport_name
+
+def canonical_sport(value):
+    """
+    Maps any known spelling of a sport to its config.SPORTS display name.
+    :return: The canonical name, or None if the value isn't recognized.
+    """
+    if not value:
+        return None
+    return _SPORT_ALIASES.get(_compact(value))
+
+def team_key(name):
+    """
+    Case- and whitespace-insensitive lookup key for a team name, so team
+    queries can use an equality match on an index instead of an ^name$ regex.
+    """
+    if not name:
+        return None
+    return ' '.join(str(name).split()).lower()
+
+def parse_moneyline(value):
+    """
+    :return: The moneyline as a number, or None if it's missing or not numeric.
+    """
+    try:
+        number = float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+def consensus_moneyline(side):
+    """
+    The line favored/underdog splits use for one `teams.<side>` subdocument:
+    the multi-book consensus, or the stored moneyline on games ingested before
+    there was one.
+    """
+    return side.get('consensus_moneyline', side.get('moneyline'))
+
+def favorite_side(home_moneyline, away_moneyline):
+    """
+    :return: 'home' or 'away' for the side with the lower moneyline, or None
+             if the lines are equal or either is missing.
+    """
+    home_moneyline, away_moneyline = parse_moneyline(home_moneyline), parse_moneyline(away_moneyline)
+    if home_moneyline is None or away_moneyline is None or home_moneyline == away_moneyline:
+        return None
+    return 'home' if home_moneyline < away_moneyline else 'away'
+
+def season_of(sport, event_date):
+    """
+    Labels the season a game belongs to by the year it started, e.g. an NBA
+    game in March 2024 is in the 2023 season.
+    """
+    start_month = SEASON_START_MONTHS.get(canonical_sport(sport), 1)
+    return event_date.year if event_date.month >= start_month else event_date.year - 1
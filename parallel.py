@@ -0,0 +1,52 @@
+"""
+Concurrent loading of a request's independent MongoDB reads.
+
+Pages need several reads that don't depend on each other: each game's as-of
+win stats for both teams, the head-to-head records, current form, the team
+list. pymongo releases the GIL while it waits on the server, so running them
+on a small per-worker thread pool (DATA_LOAD_WORKERS threads) makes a request
+take about as long as its slowest read instead of the sum of them all.
+
+`gather(*calls)` runs zero-argument calls on that pool and returns their
+results in order. Each call runs in a copy of the caller's context, so
+`session`, `g` and the slow query log's route attribution work as they do on
+the request thread. The calling thread runs the first call itself, and takes
+back any call no pool thread has started by the time it gets to it, so nested
+gathers (a gathered loader that gathers its own reads) never wait on a queue
+that can't drain. If a call raises, calls not yet started are dropped, running
+ones are waited for and the first error is raised; DATABASE_UNAVAILABLE errors
+therefore reach the circuit breaker around the page's loader as before.
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import DATA_LOAD_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=DATA_LOAD_WORKERS, thread_name_prefix='data-load') if DATA_LOAD_WORKERS > 0 else None
+
+def gather(*calls):
+    """
+    Runs zero-argument calls concurrently (see the module docstring).
+    :return: List of their results, in the order given.
+    """
+    if _executor is None or len(calls) < 2:
+        return [call() for call in calls]
+
+    futures = [_executor.submit(contextvars.copy_context().run, call) for call in calls[1:]]
+    try:
+        results = [calls[0]()]
+        for call, future in zip(calls[1:], futures):
+            results.append(call() if future.cancel() else future.result())
+        return results
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        raise
+
+def gather_each(function, items):
+    """gather() over function(item) for each item. :return: List of results in item order."""
+    return gather(*(lambda item=item: function(item) for item in items))
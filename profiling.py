@@ -0,0 +1,136 @@
+"""
+On-demand profiling of a single live request, for admins.
+
+Add `?_profile=1` to any URL (or send `X-Profile: 1`) while logged in as an
+admin. The whole request is profiled, view code and Jinja rendering included,
+and the page is replaced by the report:
+
+- with pyinstrument installed, its interactive HTML call tree (sampling);
+- otherwise a cProfile summary, with the raw `.prof` saved to PROFILE_DIR
+  for snakeviz/pstats and linked from the report.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request, render_template, send_from_directory, abort
+
+from config import PROFILE_DIR
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # Fall back to the stdlib deterministic profiler
+    SamplingProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+
+# cProfile can only run one profile per process at a time
+_cprofile_lock = threading.Lock()
+
+def profile_requested():
+    return request.args.get(PROFILE_PARAM) not in (None, '', '0') or request.headers.get(PROFILE_HEADER) == '1'
+
+def artifact_name():
+    endpoint = (request.endpoint or 'request').replace('.', '_')
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{endpoint}"
+
+def start_profile():
+    """Starts a profiler for this request and keeps it on flask.g."""
+    if SamplingProfiler and request.args.get(PROFILE_PARAM) != 'cprofile':
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        g.profile = ('pyinstrument', profiler, time.perf_counter())
+        return
+    if not _cprofile_lock.acquire(blocking=False):
+        logger.warning("Another request is being profiled; skipping.")
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    g.profile = ('cprofile', profiler, time.perf_counter())
+
+def finish_profile(response):
+    """Stops the request's profiler and swaps the response for its report."""
+    kind, profiler, started = g.pop('profile')
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    name = artifact_name()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    if kind == 'pyinstrument':
+        profiler.stop()
+        html = profiler.output_html()
+        with open(os.path.join(PROFILE_DIR, f"{name}.html"), 'w') as f:
+            f.write(html)
+        logger.info(f"Profiled {request.path} in {elapsed_ms:.1f}ms -> {name}.html")
+        return html, 200, {'Content-Type': 'text/html; charset=utf-8', 'Cache-Control': 'no-store'}
+
+    try:
+        profiler.disable()
+    finally:
+        _cprofile_lock.release()
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name}.prof"))
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(40)
+    logger.info(f"Profiled {request.path} in {elapsed_ms:.1f}ms -> {name}.prof")
+    return render_template(
+        'profile_report.html',
+        path=request.full_path.rstrip('?'),
+        status=response.status,
+        elapsed_ms=elapsed_ms,
+        artifact=f"{name}.prof",
+        summary=summary.getvalue()
+    ), 200, {'Cache-Control': 'no-store'}
+
+def init_profiling(app, is_allowed):
+    """
+    Registers the profiling hooks on an app.
+    :param is_allowed: Callable returning True when the current user may profile.
+    """
+    @app.before_request
+    def _start_profile():
+        if profile_requested() and is_allowed():
+            start_profile()
+
+    # after_request hooks run in reverse order of registration: those
+    # registered after this one (e.g. fragments) run first and are inside the
+    # profile; Flask-Login's, registered earlier by login_manager.init_app, runs
+    # after it and is not
+    @app.after_request
+    def _finish_profile(response):
+        if 'profile' not in g:
+            return response
+        if response.status_code == 304:
+            # Nothing was rendered; keep the 304 rather than profile an empty request
+            stop_profile()
+            return response
+        return app.make_response(finish_profile(response))
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        # A request that raised never reaches after_request; release cProfile
+        stop_profile()
+
+def stop_profile():
+    """Discards this request's profile, if one is running."""
+    if 'profile' in g:
+        kind, profiler, _ = g.pop('profile')
+        if kind == 'cprofile':
+            profiler.disable()
+            _cprofile_lock.release()
+        else:
+            profiler.stop()
+
+def send_profile(filename):
+    """Serves a saved profile artifact by name."""
+    if os.path.basename(filename) != filename or not filename.endswith(('.prof', '.html')):
+        abort(404)
+    return send_from_directory(os.path.abspath(PROFILE_DIR), filename, as_attachment=filename.endswith('.prof'))
@@ -0,0 +1,276 @@
+"""
+Slow-query log built on pymongo command monitoring.
+
+Every command slower than SLOW_QUERY_MS is appended to the capped
+`slow_queries` collection with the Flask route (or script) that issued it,
+and rolled up per query shape in `query_shapes`. A shape is the command's
+filter with every value replaced by '?', so `{'teams.home.name': {'$regex':
+'^celtics$'}}` and the same query for another team share one fingerprint.
+The first time a shape is seen, its read command is re-run under
+explain("executionStats") and the plan summary stored with it.
+
+The listener runs inline with every command, so it only timestamps and hands
+slow commands to a background thread; all writes happen there.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+
+import pymongo
+from pymongo import monitoring
+
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG_BYTES
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = 'slow_queries'
+QUERY_SHAPES = 'query_shapes'
+IGNORED_COLLECTIONS = {SLOW_QUERIES, QUERY_SHAPES}
+IGNORED_COMMANDS = {
+    'hello', 'ismaster', 'isMaster', 'ping', 'buildInfo', 'endSessions', 'saslStart',
+    'saslContinue', 'getMore', 'killCursors', 'explain', 'create', 'listCollections'
+}
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct'}
+FILTER_FIELDS = {'find': 'filter', 'count': 'query', 'distinct': 'query', 'findAndModify': 'query', 'delete': 'deletes', 'update': 'updates'}
+MAX_PENDING = 10000  # Started-but-unfinished commands tracked at once
+QUEUE_SIZE = 1000    # Slow commands awaiting the writer; extras are dropped
+
+# --------------------- Shapes ---------------------
+def normalize(value):
+    """Replaces literal values with '?' while keeping field names and operators."""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = normalize(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if isinstance(value, re.Pattern) or type(value).__name__ == 'Regex':
+        return '/regex/'
+    return '?'
+
+def command_filter(command_name, command):
+    """Extracts the part of a command that determines its plan."""
+    if command_name == 'aggregate':
+        return command.get('pipeline', [])
+    field = FILTER_FIELDS.get(command_name)
+    value = command.get(field) if field else None
+    if command_name == 'update' and value:
+        return [update.get('q', {}) for update in value]
+    if command_name == 'delete' and value:
+        return [delete.get('q', {}) for delete in value]
+    return value or {}
+
+def fingerprint(command_name, collection, command):
+    """
+    :return: (shape id, shape string) for a command.
+    """
+    shape = {'filter': normalize(command_filter(command_name, command))}
+    if command.get('sort'):
+        shape['sort'] = list(command['sort'].items()) if isinstance(command['sort'], dict) else command['sort']
+    shape_text = f"{collection}.{command_name} {json.dumps(shape, sort_keys=True, default=str)}"
+    return hashlib.sha1(shape_text.encode('utf-8')).hexdigest()[:16], shape_text
+
+def explain_command(command):
+    """Copies a read command without session/transport fields so it can be explained."""
+    return {key: value for key, value in command.items()
+            if not key.startswith('$') and key not in ('lsid', 'txnNumber', 'readConcern')}
+
+def summarize_explain(result):
+    """Keeps the parts of explain("executionStats") that show whether an index was used."""
+    planner = result.get('queryPlanner')
+    if planner is None:  # Aggregations nest the plan under their first $cursor stage
+        planner = (result.get('stages') or [{}])[0].get('$cursor', {}).get('queryPlanner', {})
+    stats = result.get('executionStats', {})
+
+    stages, indexes = [], []
+    plan = planner.get('winningPlan', {})
+    plan = plan.get('queryPlan', plan)
+    while plan:
+        stages.append(plan.get('stage', '?'))
+        if plan.get('indexName'):
+            indexes.append(plan['indexName'])
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    return {
+        'stages': stages,
+        'indexes': indexes,
+        'n_returned': stats.get('nReturned'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'docs_examined': stats.get('totalDocsExamined'),
+        'execution_ms': stats.get('executionTimeMillis'),
+    }
+
+# --------------------- Writer ---------------------
+class SlowQueryWriter:
+    """Background thread that records slow commands; one per process."""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.seen_shapes = set()
+        self.ready = False
+
+    def submit(self, entry):
+        self.start()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            pass  # Never slow the caller down to log
+
+    def start(self):
+        pid = os.getpid()
+        if self.pid == pid and self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.pid != pid or not (self.thread and self.thread.is_alive()):
+                if self.pid != pid:
+                    # A forked child inherits the parent's queue but not its thread
+                    self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+                    self.seen_shapes = set()
+                    self.ready = False
+                self.pid = pid
+                self.thread = threading.Thread(target=self.run, name='slow-query-writer', daemon=True)
+                self.thread.start()
+
+    def flush(self, timeout=2.0):
+        """Waits briefly for queued entries to be written (used at exit)."""
+        if self.thread is None or self.pid != os.getpid():
+            return
+        with self.queue.all_tasks_done:
+            self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def run(self):
+        while True:
+            entry = self.queue.get()
+            try:
+                self.record(entry)
+            except Exception as e:
+                logger.warning(f"Could not record slow query: {e}")
+            finally:
+                self.queue.task_done()
+
+    def ensure_collections(self, database):
+        if self.ready:
+            return
+        if SLOW_QUERIES not in database.list_collection_names():
+            try:
+                database.create_collection(SLOW_QUERIES, capped=True, size=SLOW_QUERY_LOG_BYTES)
+            except pymongo.errors.CollectionInvalid:
+                pass  # Another process created it first
+        database[QUERY_SHAPES].create_index([('total_ms', pymongo.DESCENDING)])
+        self.ready = True
+
+    def record(self, entry):
+        from db import get_database, ODDS_DB
+
+        log_database = get_database(ODDS_DB)
+        self.ensure_collections(log_database)
+        command, command_name = entry.pop('command'), entry['command_name']
+        shape_id, shape = fingerprint(command_name, entry['collection'], command)
+        entry.update(shape_id=shape_id, shape=shape)
+        log_database[SLOW_QUERIES].insert_one(dict(entry, filter=json.dumps(command_filter(command_name, command), default=str)[:2000]))
+
+        result = log_database[QUERY_SHAPES].update_one(
+            {'_id': shape_id},
+            {
+                '$setOnInsert': {
+                    'shape': shape, 'command_name': command_name, 'database': entry['database'],
+                    'collection': entry['collection'], 'first_seen': entry['at']
+                },
+                '$inc': {'count': 1, 'total_ms': entry['duration_ms']},
+                '$max': {'max_ms': entry['duration_ms']},
+                '$set': {'last_seen': entry['at']},
+                '$addToSet': {'routes': entry['route']}
+            },
+            upsert=True
+        )
+        if result.upserted_id is not None and shape_id not in self.seen_shapes and command_name in EXPLAINABLE:
+            self.seen_shapes.add(shape_id)
+            try:
+                explained = get_database(entry['database']).command(
+                    'explain', explain_command(command), verbosity='executionStats'
+                )
+                log_database[QUERY_SHAPES].update_one({'_id': shape_id}, {'$set': {'explain': summarize_explain(explained)}})
+            except Exception as e:
+                log_database[QUERY_SHAPES].update_one({'_id': shape_id}, {'$set': {'explain_error': str(e)}})
+
+writer = SlowQueryWriter()
+atexit.register(writer.flush)
+
+# --------------------- Listener ---------------------
+def current_route():
+    """Names the Flask endpoint handling this thread's request, or the running script."""
+    try:
+        from flask import has_request_context, request
+        if has_request_context():
+            return f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+    except ImportError:
+        pass
+    return os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'unknown'
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Times every command and hands those over the threshold to the writer.
+    :param threshold_ms: Minimum duration to record.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS):
+        self.threshold_us = threshold_ms * 1000
+        self.pending = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str) or collection in IGNORED_COLLECTIONS:
+            return
+        if len(self.pending) >= MAX_PENDING:
+            self.pending.clear()  # Lost events (e.g. closed sockets); start over rather than grow
+        # The route must be read here, on the thread that issued the command
+        self.pending[event.request_id] = (event.command, collection, current_route())
+
+    def succeeded(self, event):
+        self.finish(event, None)
+
+    def failed(self, event):
+        self.finish(event, str(event.failure)[:500])
+
+    def finish(self, event, error):
+        started = self.pending.pop(event.request_id, None)
+        if started is None or event.duration_micros < self.threshold_us:
+            return
+        command, collection, route = started
+        writer.submit({
+            'at': datetime.now(timezone.utc),
+            'command': command,
+            'command_name': event.command_name,
+            'database': event.database_name,
+            'collection': collection,
+            'duration_ms': round(event.duration_micros / 1000, 2),
+            'route': route,
+            'error': error
+        })
+
+def get_event_listeners():
+    """Listeners for the shared client; empty when SLOW_QUERY_MS is 0."""
+    return [SlowQueryListener()] if SLOW_QUERY_MS > 0 else []
+
+# --------------------- Reads ---------------------
+def top_shapes(limit=50):
+    from db import get_collection
+    return list(get_collection(QUERY_SHAPES).find().sort('total_ms', pymongo.DESCENDING).limit(limit))
+
+def recent_slow_queries(limit=50):
+    from db import get_collection
+    return list(get_collection(SLOW_QUERIES).find().sort('$natural', pymongo.DESCENDING).limit(limit))
@@ -0,0 +1,282 @@
+"""
+Decides which Odds API calls each ingest run makes, so quota isn't spent on
+sports that are out of season or have nothing to resolve.
+
+- Odds calls are planned for sports in season by their stored schedule: the
+  historical games-per-day around today's date, or games already scheduled
+  in the next few days. Sports with no history yet are always included.
+- Score calls are planned only for sports with started games still missing a
+  result, with daysFrom just wide enough to cover the oldest one.
+- Calls are ordered by value (games covered) and cut off once the quota last
+  reported by the API, less QUOTA_RESERVE, is used up.
+
+Responses are kept in an on-disk cache, so rerunning a script within the
+cache window re-spends nothing.
+
+    python quota_planner.py            # log both plans without calling the API
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+import requests
+
+from config import (
+    SPORTS,
+    ODDS_CACHE_DIR,
+    ODDS_CACHE_TTL_ODDS,
+    ODDS_CACHE_TTL_SCORES,
+    QUOTA_RESERVE,
+    SEASON_WINDOW_DAYS
+)
+from db import get_collection, close_client
+from archive import moneylines as moneylines_collection
+
+logger = logging.getLogger('QuotaPlanner')
+
+quota_collection = get_collection('api_quota')
+
+ODDS_COST = 1            # One market, one region
+SCORES_HISTORY_COST = 2  # Scores with any daysFrom
+MAX_DAYS_FROM = 3        # The scores endpoint only looks back three days
+UPCOMING_DAYS = 7
+MIN_EXPECTED_GAMES = 0.5
+
+# --------------------- Inputs ---------------------
+def count_calendar_days(start, end):
+    """
+    Games per (sport, year, day-of-year) with event_date in (start, end]; an
+    unbounded start counts all history.
+    :return: List of {'sport', 'year', 'day', 'games'}.
+    """
+    match = {'$lte': end} if start is None else {'$gt': start, '$lte': end}
+    pipeline = [
+        {'$match': {'event_date': match}},
+        {'$group': {
+            '_id': {'sport': '$sport', 'year': {'$year': '$event_date'}, 'day': {'$dayOfYear': '$event_date'}},
+            'games': {'$sum': 1}
+        }}
+    ]
+    return [dict(row['_id'], games=row['games']) for row in moneylines_collection.aggregate(pipeline)]
+
+def load_season_calendars(now=None):
+    """
+    Average games per day-of-year for each sport, from every game played so far.
+    The per-sport day counts are kept in api_quota ('season_calendars') with
+    the date they run through, and each call only counts the games played
+    since then, so history (archives included) is read once. A concurrent run
+    that extended them first wins; this one then uses the stored counts.
+    :return: Dict of sport name -> {day_of_year: average games on that day per season}.
+    """
+    now = naive_utc(now or datetime.now(timezone.utc))
+    stored = quota_collection.find_one({'_id': 'season_calendars'}) or {'sports': {}, 'through': None}
+    through = stored.get('through')
+    if through is None or through < now:
+        rows = count_calendar_days(through, now)
+        sports = stored.get('sports', {})
+        for row in rows:
+            calendar = sports.setdefault(row['sport'], {'days': {}, 'years': []})
+            day = str(row['day'])
+            calendar['days'][day] = calendar['days'].get(day, 0) + row['games']
+            if row['year'] not in calendar['years']:
+                calendar['years'].append(row['year'])
+        try:
+            quota_collection.update_one(
+                {'_id': 'season_calendars', 'through': through},
+                {'$set': {'sports': sports, 'through': now}},
+                upsert=True
+            )
+        except pymongo.errors.DuplicateKeyError:
+            pass  # Another run stored its counts first
+        stored['sports'] = sports
+    return {
+        sport: {int(day): games / len(calendar['years']) for day, games in calendar['days'].items()}
+        for sport, calendar in stored['sports'].items() if calendar['years']
+    }
+
+def reset_season_calendars():
+    """Drops the stored calendars, so the next plan recounts all history (after a backfill)."""
+    quota_collection.delete_one({'_id': 'season_calendars'})
+
+def expected_games(calendar, now, window_days=SEASON_WINDOW_DAYS):
+    """Games a sport historically plays within window_days either side of now."""
+    today = now.timetuple().tm_yday
+    return sum(
+        calendar.get((today + offset - 1) % 366 + 1, 0)
+        for offset in range(-window_days, window_days + 1)
+    )
+
+def count_by_sport(query):
+    """Per-sport counts of upcoming or recently started games, which are never archived."""
+    pipeline = [{'$match': query}, {'$group': {'_id': '$sport', 'games': {'$sum': 1}, 'oldest': {'$min': '$event_date'}}}]
+    return {row['_id']: row for row in moneylines_collection.hot.aggregate(pipeline)}
+
+def get_remaining_quota():
+    """:return: Requests remaining as last reported by the API, or None if unknown."""
+    doc = quota_collection.find_one({'_id': 'odds_api'})
+    return doc.get('remaining') if doc else None
+
+def record_quota(headers):
+    """Stores the x-requests-remaining/used headers from an API response."""
+    remaining = headers.get('x-requests-remaining')
+    if remaining is None:
+        return
+    try:
+        quota_collection.update_one(
+            {'_id': 'odds_api'},
+            {'$set': {
+                'remaining': int(float(remaining)),
+                'used': int(float(headers.get('x-requests-used', 0))),
+                'at': datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+    except (TypeError, ValueError):
+        logger.warning(f"Unreadable quota headers: {remaining}")
+
+# --------------------- Planning ---------------------
+def naive_utc(value):
+    # Stored dates come back naive (UTC)
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def plan_odds_calls(now=None, calendars=None):
+    """
+    :return: List of {'sport_key', 'sport', 'cost', 'value', 'reason'} for every
+             configured sport, with 'skip' set on the ones not worth calling.
+    """
+    now = naive_utc(now or datetime.now(timezone.utc))
+    calendars = load_season_calendars(now) if calendars is None else calendars
+    upcoming = count_by_sport({'event_date': {'$gte': now, '$lt': now + timedelta(days=UPCOMING_DAYS)}})
+
+    calls = []
+    for sport_key, sport in SPORTS.items():
+        scheduled = upcoming.get(sport, {}).get('games', 0)
+        call = {'sport_key': sport_key, 'sport': sport, 'endpoint': 'odds', 'params': {}, 'cost': ODDS_COST}
+        if sport not in calendars:
+            call.update(value=scheduled, reason='no history yet')
+        else:
+            expected = expected_games(calendars[sport], now)
+            call['value'] = max(scheduled, expected)
+            if scheduled:
+                call['reason'] = f"{scheduled} games scheduled in the next {UPCOMING_DAYS} days"
+            elif expected >= MIN_EXPECTED_GAMES:
+                call['reason'] = f"in season (~{expected:.0f} games within {SEASON_WINDOW_DAYS} days historically)"
+            else:
+                call.update(skip=True, reason='off season')
+        calls.append(call)
+    return calls
+
+def plan_score_calls(now=None):
+    """
+    :return: List of score calls as in plan_odds_calls, with daysFrom sized to
+             the oldest started game still missing a result.
+    """
+    now = naive_utc(now or datetime.now(timezone.utc))
+    window_start = now - timedelta(days=MAX_DAYS_FROM)
+    pending = count_by_sport({'result.winner': None, 'status': {'$ne': 'No Result'}, 'event_date': {'$gte': window_start, '$lte': now}})
+
+    calls = []
+    for sport_key, sport in SPORTS.items():
+        waiting = pending.get(sport)
+        call = {'sport_key': sport_key, 'sport': sport, 'endpoint': 'scores', 'params': {}}
+        if not waiting:
+            call.update(skip=True, value=0, cost=0, reason='no pending games')
+        else:
+            days_from = min(MAX_DAYS_FROM, max(1, math.ceil((now - waiting['oldest']).total_seconds() / 86400)))
+            call.update(
+                params={'daysFrom': days_from}, value=waiting['games'], cost=SCORES_HISTORY_COST,
+                reason=f"{waiting['games']} games awaiting results, oldest {waiting['oldest']:%Y-%m-%d %H:%M}"
+            )
+        calls.append(call)
+    return calls
+
+def apply_budget(calls, remaining=None, reserve=QUOTA_RESERVE):
+    """
+    Orders wanted calls by value and skips those the remaining quota can't cover.
+    :return: Plan dict with 'calls' (to make, in order), 'skipped', 'cost' and 'budget'.
+    """
+    budget = None if remaining is None else max(0, remaining - reserve)
+    wanted = sorted((call for call in calls if not call.get('skip')), key=lambda call: call['value'], reverse=True)
+    skipped = [call for call in calls if call.get('skip')]
+
+    planned, cost = [], 0
+    for call in wanted:
+        if budget is not None and cost + call['cost'] > budget:
+            skipped.append(dict(call, skip=True, reason=f"over budget ({call['reason']})"))
+            continue
+        planned.append(call)
+        cost += call['cost']
+    return {'calls': planned, 'skipped': skipped, 'cost': cost, 'budget': budget}
+
+def plan_calls(kind, now=None, log=None):
+    """
+    Builds and logs the plan for 'odds' or 'scores'.
+    :param log: Logger to write the plan to; defaults to this module's.
+    """
+    calls = plan_odds_calls(now) if kind == 'odds' else plan_score_calls(now)
+    plan = apply_budget(calls, get_remaining_quota())
+    log_plan(kind, plan, log or logger)
+    return plan
+
+def log_plan(kind, plan, log):
+    budget = 'unknown' if plan['budget'] is None else plan['budget']
+    log.info(f"{kind} plan: {len(plan['calls'])} calls costing {plan['cost']} (budget {budget})")
+    for call in plan['calls']:
+        log.info(f"  call {call['sport']:<6} {call['params'] or ''} value {call['value']:.0f}: {call['reason']}")
+    for call in plan['skipped']:
+        log.info(f"  skip {call['sport']:<6} {call['reason']}")
+
+# --------------------- Response Cache ---------------------
+def cache_path(url, params):
+    key_params = sorted((key, str(value)) for key, value in params.items() if key != 'apiKey' and value is not None)
+    key = hashlib.sha1(json.dumps([url, key_params]).encode('utf-8')).hexdigest()
+    return os.path.join(ODDS_CACHE_DIR, f"{key}.json")
+
+def cached_get(url, params, ttl):
+    """
+    GETs a JSON API response, reusing one cached on disk within `ttl` seconds.
+    Live responses update the stored quota.
+    :raises requests.exceptions.RequestException: On HTTP errors, as requests.get.
+    """
+    path = cache_path(url, params)
+    if ttl > 0 and os.path.exists(path) and time.time() - os.path.getmtime(path) < ttl:
+        with open(path) as f:
+            logger.info(f"Using cached response for {url}")
+            return json.load(f)
+
+    response = requests.get(url, params=params, timeout=30)
+    response.raise_for_status()
+    record_quota(response.headers)
+    data = response.json()
+
+    if ttl > 0:
+        os.makedirs(ODDS_CACHE_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    return data
+
+def cache_ttl(endpoint):
+    return ODDS_CACHE_TTL_ODDS if endpoint == 'odds' else ODDS_CACHE_TTL_SCORES
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the Odds API call plan without spending quota")
+    parser.add_argument('--kind', choices=['odds', 'scores', 'all'], default='all')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        for kind in (['odds', 'scores'] if args.kind == 'all' else [args.kind]):
+            plan_calls(kind)
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Elo power ratings for every team, kept current as results land.
+
+Each team's document in `team_ratings` holds its current rating. When
+update_game_results marks games Completed, both teams' ratings move by
+k * (result - expected) with the league's k-factor and home advantage
+(config.ELO_PARAMETERS): one read and one write per batch, O(1) per game.
+The first game of a new season pulls a rating SEASON_REVERT of the way back
+to the mean.
+
+Every game also carries an `elo` snapshot of the ratings going into it:
+{'home', 'away', 'home_probability'}. Completed games keep the ratings they
+were played at, marked `final`: a game with a final snapshot is never applied
+to the ratings again (the odds ingest can re-open a finished game that is
+still listed) and is never restamped. Games yet to start are restamped
+whenever a team's rating moves, so game cards read ratings and the
+rating-implied probability straight from the game document.
+`python ratings.py --rebuild` replays all history in one sorted pass.
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+
+import pymongo
+
+from config import ELO_PARAMETERS
+from db import get_collection, get_database, close_client
+from archive import moneylines as moneylines_collection
+from normalize import team_key, season_of, canonical_sport
+from calibration import vig_free_probabilities
+
+logger = logging.getLogger('Ratings')
+
+ratings_collection = get_collection('team_ratings')
+
+INITIAL_RATING = 1500.0
+SEASON_REVERT = 0.25  # Share of the distance to the mean given back between seasons
+DEFAULT_PARAMETERS = {'k': 20, 'home': 50}
+
+# --------------------- Elo ---------------------
+def parameters_for(sport):
+    return ELO_PARAMETERS.get(canonical_sport(sport), DEFAULT_PARAMETERS)
+
+def expected_home(home_rating, away_rating, home_advantage):
+    """Probability the home side wins, from the rating gap plus home advantage."""
+    return 1 / (1 + 10 ** ((away_rating - home_rating - home_advantage) / 400))
+
+def new_rating(team, sport):
+    return {
+        '_id': team_key(team),
+        'name': team,
+        'sport': sport,
+        'rating': INITIAL_RATING,
+        'games': 0,
+        'season': None,
+        'last_game_date': None,
+        'version': 0
+    }
+
+def current_rating(entry, season):
+    """A team's rating going into a game of `season`, reverted if the season is new."""
+    if entry['season'] is not None and season is not None and season != entry['season']:
+        return INITIAL_RATING + (entry['rating'] - INITIAL_RATING) * (1 - SEASON_REVERT)
+    return entry['rating']
+
+def snapshot(game, ratings):
+    """
+    The pre-game `elo` field for a game, from the ratings dict (team key -> entry).
+    Teams not rated yet start at INITIAL_RATING.
+    """
+    teams = game.get('teams', {})
+    event_date = game.get('event_date')
+    season = season_of(game.get('sport'), event_date) if isinstance(event_date, datetime) else None
+    values = {}
+    for side in ('home', 'away'):
+        entry = ratings.get(team_key(teams.get(side, {}).get('name')))
+        values[side] = current_rating(entry, season) if entry else INITIAL_RATING
+    probability = expected_home(values['home'], values['away'], parameters_for(game.get('sport'))['home'])
+    return {'home': round(values['home'], 1), 'away': round(values['away'], 1), 'home_probability': round(probability, 4)}
+
+def apply_game(ratings, game, winner):
+    """
+    Applies one completed game to both teams' ratings, creating entries in
+    `ratings` (a dict of team key -> entry) as needed.
+    :return: (pre-game snapshot, keys of the entries that changed).
+    """
+    teams = game.get('teams', {})
+    names = {side: teams.get(side, {}).get('name') for side in ('home', 'away')}
+    keys = {side: team_key(name) for side, name in names.items()}
+    if not keys['home'] or not keys['away']:
+        return None, []
+
+    event_date = game.get('event_date')
+    season = season_of(game.get('sport'), event_date) if isinstance(event_date, datetime) else None
+    for side in ('home', 'away'):
+        ratings.setdefault(keys[side], new_rating(names[side], game.get('sport')))
+    pre_game = snapshot(game, ratings)
+
+    home_won = 1.0 if team_key(winner) == keys['home'] else 0.0
+    shift = parameters_for(game.get('sport'))['k'] * (home_won - pre_game['home_probability'])
+    for side, sign in (('home', 1), ('away', -1)):
+        entry = ratings[keys[side]]
+        entry['rating'] = current_rating(entry, season) + sign * shift
+        entry['games'] += 1
+        entry['season'] = season if season is not None else entry['season']
+        if event_date and (entry['last_game_date'] is None or event_date > entry['last_game_date']):
+            entry['last_game_date'] = event_date
+    return pre_game, [keys['home'], keys['away']]
+
+# --------------------- Storage ---------------------
+def load_ratings(keys):
+    """:return: Stored entries for the given team keys, by key."""
+    keys = [key for key in set(keys) if key]
+    if not keys:
+        return {}
+    return {entry['_id']: entry for entry in ratings_collection.find({'_id': {'$in': keys}})}
+
+def final_game_ids(game_ids):
+    """:return: The subset of game_ids whose stored game is completed or has a final snapshot."""
+    game_ids = [game_id for game_id in game_ids if game_id]
+    if not game_ids:
+        return set()
+    return {game['game_id'] for game in moneylines_collection.hot.find(
+        {'game_id': {'$in': game_ids}, '$or': [{'status': 'Completed'}, {'elo.final': True}]},
+        {'game_id': 1}
+    )}
+
+def stamp_games(games):
+    """
+    Sets the `elo` snapshot on game documents about to be written, with one
+    ratings read. Games already finished keep their stored snapshot.
+    """
+    final = final_game_ids(game.get('game_id') for game in games)
+    games_to_stamp = [game for game in games if game.get('game_id') not in final]
+    ratings = load_ratings(
+        team_key(game.get('teams', {}).get(side, {}).get('name')) for game in games_to_stamp for side in ('home', 'away')
+    )
+    for game in games_to_stamp:
+        game['elo'] = snapshot(game, ratings)
+    return games
+
+def write_ratings(ratings, keys, versions):
+    """
+    Writes changed ratings, each guarded by the version it was read at.
+    :return: Number of ratings written.
+    """
+    operations = []
+    for key in keys:
+        entry = dict(ratings[key], version=versions.get(key, 0) + 1, updated=datetime.now(timezone.utc))
+        if key in versions:
+            operations.append(pymongo.ReplaceOne({'_id': key, 'version': versions[key]}, entry))
+        else:
+            operations.append(pymongo.ReplaceOne({'_id': key}, entry, upsert=True))
+    if not operations:
+        return 0
+    result = ratings_collection.bulk_write(operations, ordered=False)
+    written = result.modified_count + result.upserted_count
+    if written < len(operations):
+        logger.warning(f"{len(operations) - written} team ratings changed concurrently; run ratings.py --rebuild")
+    return written
+
+def stamp_upcoming(keys, ratings=None):
+    """
+    Restamps the `elo` snapshot of every game yet to start that involves one
+    of the given teams. Each $or branch seeks the (teams.<side>.key,
+    event_date) index created by app.ensure_indexes.
+    :param ratings: Current entries by team key, if already loaded.
+    :return: Number of games restamped.
+    """
+    keys = list(keys)
+    if not keys:
+        return 0
+    games = list(moneylines_collection.hot.find(
+        {'event_date': {'$gte': datetime.now(timezone.utc)}, 'status': {'$ne': 'Completed'}, 'elo.final': {'$ne': True},
+         '$or': [{'teams.home.key': {'$in': keys}}, {'teams.away.key': {'$in': keys}}]},
+        {'sport': 1, 'event_date': 1, 'teams.home.name': 1, 'teams.away.name': 1}
+    ))
+    if not games:
+        return 0
+    needed = {team_key(game.get('teams', {}).get(side, {}).get('name')) for game in games for side in ('home', 'away')}
+    ratings = dict(ratings or {})
+    ratings.update(load_ratings(key for key in needed if key not in ratings))
+    now = datetime.now(timezone.utc)
+    operations = [
+        pymongo.UpdateOne({'_id': game['_id']}, {'$set': {'elo': snapshot(game, ratings), 'last_updated': now}})
+        for game in games
+    ]
+    moneylines_collection.hot.bulk_write(operations, ordered=False)
+    return len(operations)
+
+def record_results(completed):
+    """
+    Applies completed games to their teams' ratings with one read and one bulk
+    write, stores each game's pre-game snapshot and restamps the teams'
+    upcoming games. Games are applied oldest first; games that already have a
+    final snapshot were applied before and are skipped.
+    :param completed: Iterable of (game document, winner name).
+    :return: Number of team ratings updated.
+    """
+    completed = sorted(
+        (pair for pair in completed if pair[1] and not (pair[0].get('elo') or {}).get('final')),
+        key=lambda pair: pair[0].get('event_date') or datetime.min
+    )
+    if not completed:
+        return 0
+
+    ratings = load_ratings(
+        team_key(game.get('teams', {}).get(side, {}).get('name')) for game, _ in completed for side in ('home', 'away')
+    )
+    versions = {key: entry.get('version', 0) for key, entry in ratings.items()}
+
+    changed = set()
+    snapshots = []
+    now = datetime.now(timezone.utc)
+    for game, winner in completed:
+        pre_game, keys_changed = apply_game(ratings, game, winner)
+        if pre_game is not None:
+            snapshots.append(pymongo.UpdateOne(
+                {'game_id': game.get('game_id'), 'elo.final': {'$ne': True}},
+                {'$set': {'elo': dict(pre_game, final=True), 'last_updated': now}}
+            ))
+            changed.update(keys_changed)
+    if snapshots:
+        moneylines_collection.hot.bulk_write(snapshots, ordered=False)
+    written = write_ratings(ratings, changed, versions)
+    stamp_upcoming(changed, ratings)
+    return written
+
+# --------------------- Reads ---------------------
+def card_view(game):
+    """
+    Ratings and win probabilities for game_view.html, from the game document
+    alone: rating-implied vs the moneyline's vig-free probability.
+    :return: Dict, or None if the game has no snapshot yet.
+    """
+    elo = game.get('elo')
+    if not elo:
+        return None
+    teams = game.get('teams', {})
+    market_home = teams.get('home', {}).get('fair_probability')
+    if market_home is None:
+        market = vig_free_probabilities(teams.get('home', {}).get('moneyline'), teams.get('away', {}).get('moneyline'))
+        market_home = market[0] if market else None
+    return {
+        'home_rating': elo['home'],
+        'away_rating': elo['away'],
+        'home_probability': elo['home_probability'],
+        'away_probability': 1 - elo['home_probability'],
+        'home_market': market_home,
+        'away_market': None if market_home is None else 1 - market_home
+    }
+
+# --------------------- Rebuild ---------------------
+def rebuild_ratings(batch_size=1000):
+    """
+    Replays every completed game in playing order from initial ratings,
+    rewriting each game's snapshot (in whichever tier holds it) and replacing
+    the stored ratings.
+    """
+    ratings = {}
+    database = get_database()
+    pending = {}  # collection name -> operations
+    now = datetime.now(timezone.utc)
+
+    def flush(name):
+        if pending.get(name):
+            database[name].bulk_write(pending.pop(name), ordered=False)
+
+    cursor = moneylines_collection.find(
+        {'status': 'Completed', 'result.winner': {'$nin': [None, '']}},
+        {'game_id': 1, 'sport': 1, 'event_date': 1, 'teams.home.name': 1, 'teams.away.name': 1, 'result.winner': 1}
+    ).sort('event_date', pymongo.ASCENDING).batch_size(batch_size)
+    games = 0
+    for game in cursor:
+        pre_game, _ = apply_game(ratings, game, game['result']['winner'])
+        if pre_game is None:
+            continue
+        games += 1
+        # Updates by _id are no-ops in tiers that don't hold the game
+        for collection in moneylines_collection.collections_for({'event_date': game['event_date']}):
+            operations = pending.setdefault(collection.name, [])
+            operations.append(pymongo.UpdateOne({'_id': game['_id']}, {'$set': {'elo': dict(pre_game, final=True), 'last_updated': now}}))
+            if len(operations) >= batch_size:
+                flush(collection.name)
+    for name in list(pending):
+        flush(name)
+
+    operations = [pymongo.ReplaceOne({'_id': key}, dict(entry, updated=now), upsert=True) for key, entry in ratings.items()]
+    for start in range(0, len(operations), batch_size):
+        ratings_collection.bulk_write(operations[start:start + batch_size], ordered=False)
+    ratings_collection.delete_many({'_id': {'$nin': list(ratings)}})
+    stamp_upcoming(ratings, ratings)
+    logger.info(f"Replayed {games} games into ratings for {len(ratings)} teams")
+    return len(ratings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain Elo team ratings")
+    parser.add_argument('--rebuild', action='store_true', help="Replay every completed game from initial ratings")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        if args.rebuild:
+            rebuild_ratings()
+        else:
+            parser.print_help()
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Precomputed day slates for `/`, `/tomorrow` and `/yesterday`.
+
+fetch_moneylines and update_game_results call refresh_slates() after a
+successful run, so the work of building a slate (games, win stats as of each
+game's start, and the current head-to-head records and form) happens once per
+ingest, not once per request. Head-to-head and form come from running totals,
+so a past game's card shows them as they stand now; game_view.html labels
+them that way.
+
+Slates are timezone independent. The document for calendar date D holds every
+game from D 00:00 UTC - 14h to D+1 00:00 UTC + 12h, which covers local day D in
+every timezone from UTC-12 to UTC+14. The web app reads one document, keeps the
+games inside the viewer's local day and converts their times. There is one
+document per date for each single sport and one for all sports together;
+other sport combinations filter the all-sports document.
+
+    python slates.py          # rebuild the whole window now
+"""
+import argparse
+import bisect
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+
+from config import SPORTS
+from db import get_collection, close_client
+from archive import moneylines as moneylines_collection
+from matchups import get_matchups, pair_key, team_record
+from team_form import get_forms
+from normalize import team_key, consensus_moneyline
+from ratings import card_view
+
+logger = logging.getLogger('Slates')
+
+slates_collection = get_collection('slates')
+
+ALL_SPORTS = 'ALL'
+WINDOW_DAYS = 2                          # Dates either side of today (UTC) kept current
+EARLIEST_OFFSET = timedelta(hours=14)    # UTC+14
+LATEST_OFFSET = timedelta(hours=12)      # UTC-12
+RETAIN_DAYS = 7
+
+# --------------------- Keys ---------------------
+def sports_key(sports):
+    """Documents exist for single sports and all sports; anything else reads ALL."""
+    sports = sorted(set(sports or []))
+    if len(sports) == 1:
+        return sports[0]
+    return ALL_SPORTS
+
+def slate_id(date, sports):
+    return f"{date.isoformat()}|{sports_key(sports)}"
+
+def slate_bounds(date):
+    """UTC range covered by the slate for a calendar date, as naive datetimes."""
+    start = datetime.combine(date, datetime.min.time())
+    return start - EARLIEST_OFFSET, start + timedelta(days=1) + LATEST_OFFSET
+
+def window_dates(today=None):
+    today = today or datetime.now(timezone.utc).date()
+    return [today + timedelta(days=offset) for offset in range(-WINDOW_DAYS, WINDOW_DAYS + 1)]
+
+# --------------------- Stats ---------------------
+def float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def win_stats_as_of(requests):
+    """
+    Win stats for many (team, as-of date) pairs from one query, matching
+    app.calculate_win_stats: completed games up to and including the date,
+    split by whether the team was favored.
+    :param requests: Iterable of (team name, naive UTC datetime).
+    :return: Dict of (lower-cased team, as-of) -> stats dict.
+    """
+    requests = list(requests)
+    if not requests:
+        return {}
+    teams = {team.strip().lower() for team, _ in requests}
+    latest = max(as_of for _, as_of in requests)
+    patterns = [re.compile(f'^{re.escape(team)}$', re.IGNORECASE) for team in teams]
+
+    # team -> (dates, running [favored_games, favored_wins, underdog_games, underdog_wins])
+    history = {team: ([], [(0, 0, 0, 0)]) for team in teams}
+    cursor = moneylines_collection.find(
+        {
+            '$or': [{'teams.home.name': {'$in': patterns}}, {'teams.away.name': {'$in': patterns}}],
+            'status': 'Completed',
+            'event_date': {'$lte': latest}
+        },
+        {'event_date': 1, 'teams': 1, 'result.winner': 1}
+    ).sort('event_date', pymongo.ASCENDING)
+    for game in cursor:
+        home, away = game.get('teams', {}).get('home', {}), game.get('teams', {}).get('away', {})
+        home_ml, away_ml = float_or_none(consensus_moneyline(home)), float_or_none(consensus_moneyline(away))
+        if home_ml is None or away_ml is None or home_ml == away_ml:
+            continue
+        winner = (game.get('result', {}).get('winner') or '').strip().lower()
+        for name, team_ml, opp_ml in ((home.get('name', ''), home_ml, away_ml), (away.get('name', ''), away_ml, home_ml)):
+            team = name.strip().lower()
+            if team in history:
+                dates, totals = history[team]
+                favored_games, favored_wins, underdog_games, underdog_wins = totals[-1]
+                won = int(winner == team)
+                if team_ml < opp_ml:
+                    favored_games, favored_wins = favored_games + 1, favored_wins + won
+                else:
+                    underdog_games, underdog_wins = underdog_games + 1, underdog_wins + won
+                dates.append(game['event_date'])
+                totals.append((favored_games, favored_wins, underdog_games, underdog_wins))
+
+    stats = {}
+    for team, as_of in requests:
+        team = team.strip().lower()
+        dates, totals = history[team]
+        favored_games, favored_wins, underdog_games, underdog_wins = totals[bisect.bisect_right(dates, as_of)]
+        stats[(team, as_of)] = {
+            'underdog_win_rate': (underdog_wins / underdog_games * 100) if underdog_games > 0 else 0,
+            'favored_win_rate': (favored_wins / favored_games * 100) if favored_games > 0 else 0,
+            'underdog_wins': underdog_wins,
+            'favored_wins': favored_wins,
+            'total_completed_underdog_games': underdog_games,
+            'total_completed_favored_games': favored_games,
+            'total_underdog_games': underdog_games,
+            'total_favored_games': favored_games
+        }
+    return stats
+
+# --------------------- Building ---------------------
+def build_payloads(date):
+    """
+    Every game in a date's slate window, shaped like app.format_game's views
+    but with event_date left in UTC.
+    """
+    start, end = slate_bounds(date)
+    games = list(moneylines_collection.find({'event_date': {'$gte': start, '$lt': end}}).sort('event_date', pymongo.ASCENDING))
+
+    def as_of(game):
+        event_date = game['event_date']
+        return event_date.astimezone(timezone.utc).replace(tzinfo=None) if event_date.tzinfo else event_date
+
+    def name(game, side):
+        return game.get('teams', {}).get(side, {}).get('name', 'Unknown')
+
+    stats = win_stats_as_of((name(game, side), as_of(game)) for game in games for side in ('home', 'away'))
+    matchups = get_matchups((name(game, 'home'), name(game, 'away')) for game in games)
+    forms = get_forms(name(game, side) for game in games for side in ('home', 'away'))
+
+    payloads = []
+    for game in games:
+        home_team, away_team = name(game, 'home'), name(game, 'away')
+        matchup = matchups.get(pair_key(home_team, away_team))
+        payloads.append({
+            'game_id': game.get('game_id'),
+            'sport': game.get('sport'),
+            'event_date': as_of(game),
+            'home_team': home_team,
+            'home_moneyline': game.get('teams', {}).get('home', {}).get('moneyline', 'N/A'),
+            'away_team': away_team,
+            'away_moneyline': game.get('teams', {}).get('away', {}).get('moneyline', 'N/A'),
+            'home_best': game.get('teams', {}).get('home', {}).get('best'),
+            'away_best': game.get('teams', {}).get('away', {}).get('best'),
+            'elo': card_view(game),
+            'winner': game.get('result', {}).get('winner', 'N/A'),
+            'status': game.get('status', 'In Progress'),
+            'result': {
+                'home_score': game.get('result', {}).get('home_score', 'N/A'),
+                'away_score': game.get('result', {}).get('away_score', 'N/A')
+            },
+            'home_team_stats': stats[(home_team.strip().lower(), as_of(game))],
+            'away_team_stats': stats[(away_team.strip().lower(), as_of(game))],
+            'head_to_head': {
+                'games': matchup.get('games', 0) if matchup else 0,
+                'home': team_record(matchup, home_team),
+                'away': team_record(matchup, away_team)
+            },
+            'home_form': forms.get(team_key(home_team)),
+            'away_form': forms.get(team_key(away_team))
+        })
+    return payloads
+
+def get_watermark():
+    latest = moneylines_collection.find_one({}, {'last_updated': 1}, sort=[('last_updated', pymongo.DESCENDING)])
+    return (latest or {}).get('last_updated')
+
+def refresh_slates(sports=None):
+    """
+    Rebuilds the stored slates a write may have changed: every date in the
+    window, since each card shows current form and head-to-head records.
+    :param sports: Sport names whose single-sport slates to rebuild (all-sports
+                   slates are always rebuilt); defaults to every sport.
+    :return: Number of slate documents written.
+    """
+    try:
+        # Read before the games, so a write racing the build leaves the slate looking stale
+        watermark = get_watermark()
+        now = datetime.now(timezone.utc)
+        sports = set(sports or SPORTS.values())
+        dates = window_dates(now.date())
+
+        operations = []
+        for date in dates:
+            payloads = build_payloads(date)
+            for key in [ALL_SPORTS] + sorted(sports):
+                games = payloads if key == ALL_SPORTS else [game for game in payloads if game['sport'] == key]
+                operations.append(pymongo.ReplaceOne(
+                    {'_id': f"{date.isoformat()}|{key}"},
+                    {'date': date.isoformat(), 'sports': key, 'games': games, 'watermark': watermark, 'computed_at': now},
+                    upsert=True
+                ))
+        if operations:
+            slates_collection.bulk_write(operations, ordered=False)
+        retain_from = (now.date() - timedelta(days=RETAIN_DAYS)).isoformat()
+        slates_collection.delete_many({'date': {'$lt': retain_from}})
+        logger.info(f"Refreshed {len(operations)} slates for {len(dates)} dates.")
+        return len(operations)
+    except Exception as e:
+        # Pages fall back to live queries when a slate is missing or stale
+        logger.error(f"Error refreshing slates: {e}")
+        return 0
+
+def get_slate(date, sports):
+    """:return: The stored slate document covering a local date and sport selection, or None."""
+    return slates_collection.find_one({'_id': slate_id(date, sports)})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the precomputed day slates")
+    parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        refresh_slates()
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Recent form for every team: last-10 and last-20 records, season-to-date
+record and current streak, each split into favored/underdog games.
+
+Each team's document holds its last FORM_WINDOW results in a fixed-size ring
+buffer alongside running totals for every window. Adding a result touches
+only the slot being overwritten and the slot leaving the last-10 window, so
+updates are O(1) per completed game and reads never scan history. A result
+that arrives after a later game's is inserted by date (re-sorting the
+FORM_WINDOW slots), and one from an earlier season leaves the season totals
+alone.
+update_game_results feeds completed games in; `python team_form.py --rebuild`
+replays history from scratch.
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+
+import pymongo
+
+from db import get_collection, close_client
+from archive import moneylines as moneylines_collection
+from normalize import team_key, favorite_side, consensus_moneyline, season_of
+
+logger = logging.getLogger('TeamForm')
+
+team_form_collection = get_collection('team_form')
+
+FORM_WINDOW = 20   # Ring buffer size; also the long window
+SHORT_WINDOW = 10
+WINDOWS = ('last10', 'last20', 'season')
+TOTAL_FIELDS = ('games', 'wins', 'favored_games', 'favored_wins', 'underdog_games', 'underdog_wins')
+
+# --------------------- Ring Buffer ---------------------
+def empty_totals():
+    return {field: 0 for field in TOTAL_FIELDS}
+
+def new_form(team, sport):
+    return {
+        '_id': team_key(team),
+        'name': team,
+        'sport': sport,
+        'slots': [None] * FORM_WINDOW,
+        'pos': 0,        # Next slot to write
+        'count': 0,      # Filled slots, capped at FORM_WINDOW
+        'last10': empty_totals(),
+        'last20': empty_totals(),
+        'season': dict(empty_totals(), label=None),
+        'streak': {'type': None, 'length': 0},
+        'last_game_date': None,
+        'version': 0
+    }
+
+def apply_entry(totals, entry, sign):
+    totals['games'] += sign
+    totals['wins'] += sign * entry['w']
+    if entry['r'] == 'F':
+        totals['favored_games'] += sign
+        totals['favored_wins'] += sign * entry['w']
+    elif entry['r'] == 'U':
+        totals['underdog_games'] += sign
+        totals['underdog_wins'] += sign * entry['w']
+
+def totals_of(entries):
+    totals = empty_totals()
+    for entry in entries:
+        apply_entry(totals, entry, 1)
+    return totals
+
+def result_type(entry):
+    return 'W' if entry['w'] else 'L'
+
+def push_result(form, game_id, won, role, season, event_date):
+    """
+    Adds one result to a team's form in place.
+    :param role: 'F' (favored), 'U' (underdog) or None (pick'em / no lines).
+    :return: False if the game was already applied (nothing changed).
+    """
+    if any(slot and slot['g'] == game_id for slot in form['slots']):
+        return False
+    pos = form['pos']
+    # Once the buffer is full, anything older than its oldest slot was applied
+    # and has already rolled out of the windows
+    oldest = form['slots'][pos] if form['count'] >= FORM_WINDOW else None
+    if oldest and oldest.get('d') and event_date and event_date < oldest['d']:
+        return False
+
+    entry = {'g': game_id, 'd': event_date, 'w': int(won), 'r': role}
+    newest = form['slots'][(pos - 1) % FORM_WINDOW] if form['count'] else None
+    if newest and newest.get('d') and event_date and event_date < newest['d']:
+        insert_result(form, entry)
+    else:
+        append_result(form, entry)
+
+    add_to_season(form, entry, season)
+    if event_date and (form['last_game_date'] is None or event_date > form['last_game_date']):
+        form['last_game_date'] = event_date
+    return True
+
+def append_result(form, entry):
+    """Adds the newest result, touching only the slots that leave each window."""
+    pos = form['pos']
+    # The result SHORT_WINDOW places back leaves the last-10 window...
+    if form['count'] >= SHORT_WINDOW:
+        apply_entry(form['last10'], form['slots'][(pos - SHORT_WINDOW) % FORM_WINDOW], -1)
+    # ...and the one being overwritten leaves the last-20 window
+    if form['count'] >= FORM_WINDOW:
+        apply_entry(form['last20'], form['slots'][pos], -1)
+
+    apply_entry(form['last10'], entry, 1)
+    apply_entry(form['last20'], entry, 1)
+
+    if form['streak']['type'] == result_type(entry):
+        form['streak']['length'] += 1
+    else:
+        form['streak'] = {'type': result_type(entry), 'length': 1}
+
+    form['slots'][pos] = entry
+    form['pos'] = (pos + 1) % FORM_WINDOW
+    form['count'] = min(form['count'] + 1, FORM_WINDOW)
+
+def insert_result(form, entry):
+    """
+    Adds a result that arrived after a later game's, re-sorting the buffer by
+    date and recomputing the windows and streak from it (at most FORM_WINDOW
+    entries, so still constant work).
+    """
+    count = form['count']
+    ordered = [form['slots'][(form['pos'] - count + i) % FORM_WINDOW] for i in range(count)] + [entry]
+    ordered.sort(key=lambda item: (item.get('d') is not None, item.get('d') or 0))
+
+    streak_type = result_type(ordered[-1])
+    length = 0
+    for item in reversed(ordered):
+        if result_type(item) != streak_type:
+            break
+        length += 1
+    if length == len(ordered) and form['streak']['type'] == streak_type:
+        # The run covers every result held, so it continues the stored streak
+        length = form['streak']['length'] + 1
+
+    kept = ordered[-FORM_WINDOW:]
+    form['slots'] = kept + [None] * (FORM_WINDOW - len(kept))
+    form['pos'] = len(kept) % FORM_WINDOW
+    form['count'] = len(kept)
+    form['last10'] = totals_of(kept[-SHORT_WINDOW:])
+    form['last20'] = totals_of(kept)
+    form['streak'] = {'type': streak_type, 'length': length}
+
+def add_to_season(form, entry, season):
+    """Counts a result in the season totals, starting a new season as needed."""
+    label = form['season'].get('label')
+    if season is not None and label is not None and season < label:
+        return  # A late result from a season that's already over
+    if season != label:
+        form['season'] = dict(empty_totals(), label=season)
+    apply_entry(form['season'], entry, 1)
+
+def push_game(forms, game, winner):
+    """
+    Adds a completed game to both teams' forms, creating them in `forms`
+    (a dict of team key -> form) as needed.
+    :return: Keys of the forms that changed.
+    """
+    teams = game.get('teams', {})
+    favorite = favorite_side(consensus_moneyline(teams.get('home', {})), consensus_moneyline(teams.get('away', {})))
+    event_date = game.get('event_date')
+    season = season_of(game.get('sport'), event_date) if isinstance(event_date, datetime) else None
+
+    changed = []
+    for side in ('home', 'away'):
+        name = teams.get(side, {}).get('name')
+        key = team_key(name)
+        if not key:
+            continue
+        form = forms.setdefault(key, new_form(name, game.get('sport')))
+        role = None if favorite is None else 'F' if favorite == side else 'U'
+        if push_result(form, game.get('game_id'), team_key(winner) == key, role, season, event_date):
+            changed.append(key)
+    return changed
+
+# --------------------- Storage ---------------------
+def write_forms(forms, keys, versions):
+    """
+    Writes changed forms, each guarded by the version it was read at so a
+    concurrent writer can't be silently overwritten.
+    :return: Number of forms written.
+    """
+    operations = []
+    for key in keys:
+        form = dict(forms[key], version=versions.get(key, 0) + 1, updated=datetime.now(timezone.utc))
+        if key in versions:
+            operations.append(pymongo.ReplaceOne({'_id': key, 'version': versions[key]}, form))
+        else:
+            operations.append(pymongo.ReplaceOne({'_id': key}, form, upsert=True))
+    if not operations:
+        return 0
+    result = team_form_collection.bulk_write(operations, ordered=False)
+    written = result.modified_count + result.upserted_count
+    if written < len(operations):
+        logger.warning(f"{len(operations) - written} team forms changed concurrently; run team_form.py --rebuild")
+    return written
+
+def record_results(completed):
+    """
+    Adds completed games to their teams' forms with one read and one bulk write.
+    Games are applied oldest first so the buffers stay in playing order.
+    :param completed: Iterable of (game document, winner name).
+    :return: Number of team forms updated.
+    """
+    completed = sorted(
+        (pair for pair in completed if pair[1]),
+        key=lambda pair: pair[0].get('event_date') or datetime.min
+    )
+    if not completed:
+        return 0
+
+    keys = {team_key(game.get('teams', {}).get(side, {}).get('name')) for game, _ in completed for side in ('home', 'away')}
+    keys.discard(None)
+    forms = {form['_id']: form for form in team_form_collection.find({'_id': {'$in': list(keys)}})}
+    versions = {key: form.get('version', 0) for key, form in forms.items()}
+
+    changed = set()
+    for game, winner in completed:
+        changed.update(push_game(forms, game, winner))
+    return write_forms(forms, changed, versions)
+
+# --------------------- Reads ---------------------
+def get_forms(teams):
+    """
+    Looks up the form of many teams in one query.
+    :return: Dict of team key -> form summary (see summarize).
+    """
+    keys = {team_key(team) for team in teams}
+    keys.discard(None)
+    if not keys:
+        return {}
+    return {
+        form['_id']: summarize(form)
+        for form in team_form_collection.find({'_id': {'$in': list(keys)}}, {'slots': 0})
+    }
+
+def get_form(team):
+    return get_forms([team]).get(team_key(team))
+
+def summarize(form):
+    """Shapes a stored form for templates and the API; losses are derived."""
+    summary = {'name': form.get('name'), 'streak': form.get('streak')}
+    for window in WINDOWS:
+        totals = dict(form.get(window) or empty_totals())
+        totals['losses'] = totals.get('games', 0) - totals.get('wins', 0)
+        summary[window] = totals
+    return summary
+
+# --------------------- Rebuild ---------------------
+def rebuild_forms(batch_size=1000):
+    """
+    Replays every completed game in playing order into fresh forms and
+    replaces the stored documents.
+    """
+    forms = {}
+    cursor = moneylines_collection.find(
+        {'status': 'Completed', 'result.winner': {'$nin': [None, '']}},
+        {'game_id': 1, 'sport': 1, 'event_date': 1, 'teams': 1, 'result.winner': 1}
+    ).sort('event_date', pymongo.ASCENDING).batch_size(batch_size)
+    for game in cursor:
+        push_game(forms, game, game['result']['winner'])
+
+    now = datetime.now(timezone.utc)
+    operations = [pymongo.ReplaceOne({'_id': key}, dict(form, updated=now), upsert=True) for key, form in forms.items()]
+    for start in range(0, len(operations), batch_size):
+        team_form_collection.bulk_write(operations[start:start + batch_size], ordered=False)
+    team_form_collection.delete_many({'_id': {'$nin': list(forms)}})
+    logger.info(f"Rebuilt form for {len(forms)} teams")
+    return len(forms)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain rolling team form")
+    parser.add_argument('--rebuild', action='store_true', help="Replay every completed game into fresh forms")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        if args.rebuild:
+            rebuild_forms()
+        else:
+            parser.print_help()
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    main()
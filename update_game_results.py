@@ -6,12 +6,18 @@ import pymongo
 import requests
 
 from config import (
-    MONGO_URI,
     ODDS_API_KEY,
     API_BASE_URL,
     SPORTS,
     DATE_FORMAT
 )
+from db import get_collection, close_client
+import matchups
+import team_form
+import calibration
+import ratings
+import quota_planner
+import slates
 
 # --------------------- Logging Configuration ---------------------
 logger = logging.getLogger('UpdateGameStatus')
@@ -29,33 +35,28 @@ ch.setFormatter(formatter)
 logger.addHandler(ch)
 
 # --------------------- MongoDB Setup ---------------------
-try:
-    client = pymongo.MongoClient(MONGO_URI)
-    db = client.sports_odds  # Your database name
-    moneylines_collection = db.moneylines  # Your collection name
-    logger.info("Connected to MongoDB successfully.")
-except pymongo.errors.ConnectionError as ce:
-    logger.error(f"Failed to connect to MongoDB: {ce}")
-    raise ce
+moneylines_collection = get_collection('moneylines')
+
+# Games still waiting for a result; 'No Result' games are past ones no score will arrive for
+AWAITING_RESULTS = {'result.winner': None, 'status': {'$ne': 'No Result'}}
 
 # --------------------- Updating Game Status ---------------------
-def fetch_scores(sport='basketball_nba'):
+def fetch_scores(sport='basketball_nba', days_from=3):
     """
     Fetches scores for specified sport from The Odds API.
     :param sport: Sport key (basketball_nba, americanfootball_nfl, basketball_ncaab, americanfootball_ncaaf, icehockey_nhl)
+    :param days_from: Days of completed games to include (1-3).
     :return: List of games with scores and statuses.
     """
     url = f"{API_BASE_URL}{sport}/scores/"
     params = {
         'apiKey': ODDS_API_KEY,
-        'daysFrom': 30,
+        'daysFrom': days_from,
         'dateFormat': DATE_FORMAT
     }
 
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        scores_data = response.json()
+        scores_data = quota_planner.cached_get(url, params, quota_planner.cache_ttl('scores'))
         logger.info(f"Fetched {sport} scores data successfully.")
         return scores_data
     except requests.exceptions.RequestException as req_err:
@@ -70,19 +71,18 @@ def update_game_status():
     Updates results for all configured sports games.
     """
     try:
-        games_to_update = moneylines_collection.find({
-            'result.winner': None
-        })
+        games_to_update = moneylines_collection.find(AWAITING_RESULTS)
 
-        if moneylines_collection.count_documents({'result.winner': None}) == 0:
+        if moneylines_collection.count_documents(AWAITING_RESULTS) == 0:
             logger.info("No games with null results to update.")
             return
 
-        # Fetch scores for all sports including MLB
+        # Only sports with started games awaiting results, looking back as far as the oldest
         all_scores = []
-        for sport_key in SPORTS.keys():
+        for call in quota_planner.plan_calls('scores', log=logger)['calls']:
+            sport_key = call['sport_key']
             logger.info(f"Fetching scores for {SPORTS[sport_key]}")
-            scores = fetch_scores(sport_key)
+            scores = fetch_scores(sport_key, days_from=call['params']['daysFrom'])
             if scores:
                 all_scores.extend(scores)
             else:
@@ -93,6 +93,7 @@ def update_game_status():
             return
 
         operations = []
+        completed = []
 
         for game in games_to_update:
             game_id = game.get('game_id')
@@ -102,7 +103,7 @@ def update_game_status():
                 continue
 
             # Find corresponding score data
-            score_data = next((item for item in all_scores if item['id'] == game_id), None)
+            score_data = next((item for item in all_scores if item.get('id') == game_id), None)
 
             if not score_data:
                 continue
@@ -128,6 +129,7 @@ def update_game_status():
                     operations.append(
                         pymongo.UpdateOne({'game_id': game_id}, update_doc)
                     )
+                    completed.append((game, winner))
 
         if operations:
             try:
@@ -135,20 +137,49 @@ def update_game_status():
                 logger.info(f"Updated {result.modified_count} games to 'Completed' status.")
             except pymongo.errors.BulkWriteError as bwe:
                 logger.error(f"Bulk write error: {bwe.details}")
+                return
             except Exception as e:
                 logger.error(f"Unexpected error during MongoDB operations: {e}")
+                return
+            record_completed(completed)
         else:
             logger.info("No games were updated.")
 
     except Exception as e:
         logger.error(f"Error updating game statuses: {e}")
 
+def record_completed(completed):
+    """
+    Adds newly completed games to every derived store. Each step runs on its
+    own, so one failing doesn't skip the rest; games are not picked up again
+    once their winner is set, so a failed step is repaired with its --rebuild.
+    :param completed: List of (game document, winner name).
+    """
+    steps = (
+        ('head-to-head records', matchups.record_results, 'matchups.py'),
+        ('team forms', team_form.record_results, 'team_form.py'),
+        ('calibration buckets', calibration.record_results, 'calibration.py'),
+        ('team ratings', ratings.record_results, 'ratings.py'),
+    )
+    for label, record, script in steps:
+        try:
+            logger.info(f"Updated {record(completed)} {label}.")
+        except Exception as e:
+            logger.error(f"Error updating {label}: {e}; run python {script} --rebuild")
+
+    try:
+        # Post-ingest: as-of stats change on every slate from the earliest result
+        # onwards, and current form and head-to-head on every slate in the window
+        slates.refresh_slates(sports={game['sport'] for game, _ in completed})
+    except Exception as e:
+        logger.error(f"Error refreshing slates: {e}")
+
 # --------------------- Main Execution Flow ---------------------
 def main():
     update_game_status()
 
     # Close MongoDB connection
-    client.close()
+    close_client()
     logger.info("MongoDB connection closed.")
 
 if __name__ == "__main__":
@@ -1,67 +1,26 @@
-import pymongo
+"""
+Kept for existing schedules; sport-name normalization is now migration
+0001_normalize_sport_names. Prefer `python migrate.py`.
+"""
 import logging
-import re
-from config import MONGO_URI, SPORTS
 
-# --------------------- Logging Configuration ---------------------
-logger = logging.getLogger('UpdateSportsNames')
-logger.setLevel(logging.INFO)
+from migrate import migrate
+from db import close_client
 
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-ch.setFormatter(formatter)
-
-logger.addHandler(ch)
-
-# --------------------- MongoDB Setup ---------------------
-try:
-    client = pymongo.MongoClient(MONGO_URI)
-    db = client.sports_odds  # Your database name
-    moneylines_collection = db.moneylines  # Your collection name
-    logger.info("Connected to MongoDB successfully.")
-except pymongo.errors.ConnectionError as ce:
-    logger.error(f"Failed to connect to MongoDB: {ce}")
-    raise ce
+logger = logging.getLogger('Migrations')
 
 # --------------------- Update Sports Names ---------------------
-def update_sports_names():
+def update_sports_names(dry_run=False):
     """
     Updates all sports names in the database to be consistent with config.SPORTS values.
+    Reruns the migration even if it was applied, since new ingests may have added variants.
     """
-    try:
-        # Get all distinct sport names currently in the database
-        current_sports = moneylines_collection.distinct('sport')
-        logger.info(f"Found sports in database: {current_sports}")
-        
-        for sport_key, correct_name in SPORTS.items():
-            # Create regex patterns for common variations
-            sport_parts = sport_key.replace('_', ' ').split()
-            patterns = [
-                re.compile(correct_name, re.IGNORECASE),  # e.g., "NBA", "nba"
-                re.compile(' '.join(sport_parts), re.IGNORECASE),  # e.g., "basketball nba"
-                re.compile(''.join(sport_parts), re.IGNORECASE),  # e.g., "basketballnba"
-            ]
-            
-            # Build the query to match any variation
-            query = {'sport': {'$in': patterns}}
-            
-            # Update all matching documents
-            result = moneylines_collection.update_many(
-                query,
-                {'$set': {'sport': correct_name}}
-            )
-            
-            logger.info(f"Updated {result.modified_count} documents for sport: {correct_name}")
-            
-    except Exception as e:
-        logger.error(f"Error updating sports names: {e}")
+    return migrate(only='0001', dry_run=dry_run, force=True)
 
 def main():
     update_sports_names()
-    client.close()
+    close_client()
     logger.info("MongoDB connection closed.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
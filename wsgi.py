@@ -1,5 +1,10 @@
+from app import app, ensure_indexes, ensure_user_indexes, warm_caches
 
-from app import app
+# Create indexes (a no-op once they exist) and fill this worker's caches before
+# it accepts requests; importing app alone never touches MongoDB
+ensure_indexes()
+ensure_user_indexes()
+warm_caches()
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    app.run()